@@ -0,0 +1,396 @@
+# backtest_engine.py
+import threading
+import weakref
+
+import numpy as np
+
+
+EXIT_TAKE_PROFIT = 0
+EXIT_TIME_STOP = 1
+EXIT_REASONS = ("Take Profit", "Time Stop")
+
+TRADE_DTYPE = np.dtype([
+    ("entry_idx", np.int64),
+    ("exit_idx", np.int64),
+    ("days_held", np.int64),
+    ("exit_reason", np.int8),
+    ("entry_price", np.float64),
+    ("exit_price", np.float64),
+    ("profit_pct", np.float64),
+])
+
+# Obergrenze für gecachte Zwischenergebnisse pro Ticker, danach wird der Cache geleert
+_MAX_CACHED_KEYS = 4096
+
+
+def pct_change(close, periods):
+    """
+    Entspricht Series.pct_change(periods=periods) auf einem float64-Array.
+    """
+    n = len(close)
+    shifted = np.full(n, np.nan)
+    if periods >= 0:
+        if periods < n:
+            shifted[periods:] = close[:n - periods]
+    elif -periods < n:
+        shifted[:periods] = close[-periods:]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return close / shifted - 1
+
+
+def find_signals(close, lookback_days, drop_threshold_pct):
+    """
+    Indizes aller Tage, an denen der Kurs über lookback_days um mehr als drop_threshold_pct gefallen ist.
+    """
+    threshold_decimal = -(drop_threshold_pct / 100)
+    change = pct_change(close, lookback_days)
+    return np.flatnonzero(change < threshold_decimal)
+
+
+def signal_entries(signal_indices, n):
+    """
+    Trade wird erst am nächsten Tag ausgeführt, Einstiege nach dem letzten Tag entfallen.
+    """
+    entries = np.asarray(signal_indices, dtype=np.int64) + 1
+    return entries[entries < n]
+
+
+class FirstHitTable:
+    """
+    Beantwortet "erster Tag ab entry, an dem High >= Ziel" für beliebig viele Einstiege auf einmal.
+
+    Grundlage ist die Kette der nächsthöheren Hochs (next greater element): Der erste Treffer liegt
+    immer auf einem neuen laufenden Maximum ab dem Einstieg. Mit Sprungtabellen (2^k Schritte entlang
+    der Kette) findet jede Abfrage den Treffer in O(log n), unabhängig von der Haltedauer.
+    Da der absolute Treffer-Index zurückgegeben wird, gilt das Ergebnis für alle Haltedauern gleichzeitig.
+    """
+
+    def __init__(self, high, jumps=None):
+        n = len(high)
+        self.n = n
+        # NaN-Hochs erreichen nie ein Ziel, Index n ist ein Wächter mit +inf
+        ext_high = np.full(n + 1, np.inf)
+        ext_high[:n] = np.where(np.isnan(high), -np.inf, high)
+        self.ext_high = ext_high
+
+        if jumps is not None:
+            # Vorberechnete Sprungtabellen (z.B. aus dem Feature-Cache, siehe feature_store.py)
+            self.jumps = list(jumps)
+            return
+
+        next_higher = np.full(n + 1, n, dtype=np.int64)
+        stack = []
+        values = ext_high[:n].tolist()
+        for i, value in enumerate(values):
+            while stack and values[stack[-1]] < value:
+                next_higher[stack.pop()] = i
+            stack.append(i)
+
+        jumps = [next_higher]
+        while (1 << len(jumps)) <= n:
+            previous = jumps[-1]
+            jumps.append(previous[previous])
+        self.jumps = jumps
+
+    def first_hits(self, entries, targets):
+        """
+        Absoluter Index des ersten Tages >= entry mit High >= target, bzw. n wenn es keinen gibt.
+        """
+        entries = np.asarray(entries, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.float64)
+        ext_high = self.ext_high
+
+        current = entries.copy()
+        for jump in reversed(self.jumps):
+            candidate = jump[current]
+            move = ext_high[candidate] < targets
+            current = np.where(move, candidate, current)
+
+        hits = np.where(ext_high[entries] >= targets, entries, self.jumps[0][current])
+        # NaN-Ziele (kein Einstiegskurs) werden nie erreicht
+        return np.where(np.isnan(targets), self.n, hits)
+
+
+def select_trades(entries, exit_idx, valid):
+    """
+    Positionen der tatsächlich ausgeführten Kandidaten nach der last_exit_index-Regel
+    (Einstieg erst nach dem letzten Exit). Für jeden gültigen Kandidaten wird vorab per
+    searchsorted der nächste mögliche Nachfolger bestimmt, die Schleife läuft dann nur
+    noch über die ausgeführten Trades statt über alle Signale.
+    """
+    candidates = np.flatnonzero(valid)
+    if len(candidates) == 0:
+        return candidates
+
+    # Einstiege sind aufsteigend sortiert, Exit >= Einstieg -> Nachfolger liegt immer weiter hinten
+    following = np.searchsorted(entries[candidates], exit_idx[candidates], side="right").tolist()
+    chosen = []
+    k = 0
+    m = len(candidates)
+    while k < m:
+        chosen.append(k)
+        k = following[k]
+    return candidates[chosen]
+
+
+def _taken_exits(open_, close, entries, targets, hit_indices, hold_days):
+    """
+    Exits aller Kandidaten aus den Treffer-Indizes, reduziert auf die ausgeführten Trades.
+    Gibt (Einstiege, Exit-Indizes, Haltetage, Take-Profit-Maske, Exit-Kurse) der Trades zurück.
+    """
+    n = len(close)
+    hit_offsets = hit_indices - entries
+    # Treffer-Index n bedeutet "Ziel nie erreicht"
+    take_profit = (hit_indices < n) & (hit_offsets < hold_days)
+    # Time Stop nur, wenn der letzte Haltetag noch in den Daten liegt
+    time_stop = ~take_profit & (entries + hold_days - 1 < n)
+
+    exit_offsets = np.where(take_profit, hit_offsets, hold_days - 1)
+    exit_idx = entries + exit_offsets
+
+    taken = select_trades(entries, exit_idx, take_profit | time_stop)
+    entries = entries[taken]
+    exit_idx = exit_idx[taken]
+    exit_offsets = exit_offsets[taken]
+    take_profit = take_profit[taken]
+    targets = targets[taken]
+
+    # Eröffnet der Kurs über dem Ziel (nicht am Einstiegstag), wird zum Open verkauft
+    exit_open = open_[exit_idx]
+    gap_up = (exit_offsets > 0) & (exit_open > targets)
+    raw_exit = np.where(take_profit, np.where(gap_up, exit_open, targets), close[exit_idx])
+    return entries, exit_idx, exit_offsets, take_profit, raw_exit
+
+
+def net_returns(entry_price, exit_price, fee_rate):
+    """
+    Netto-Rendite pro Trade nach Gebühren auf Ein- und Ausstieg.
+    Die Gebühr skaliert nur die Preise, die Exits selbst hängen nicht von ihr ab.
+    """
+    effective_entry = entry_price * (1 + fee_rate)
+    effective_exit = exit_price * (1 - fee_rate)
+    return (effective_exit - effective_entry) / effective_entry
+
+
+def resolve_exits(open_, close, entries, targets, hit_indices, hold_days, fee_rate):
+    """
+    Berechnet die Exits aller Kandidaten aus den Treffer-Indizes und löst überlappende Trades
+    über die last_exit_index-Regel auf. Gibt ein Array mit TRADE_DTYPE zurück.
+    """
+    if hold_days <= 0 or len(entries) == 0:
+        return np.empty(0, dtype=TRADE_DTYPE)
+
+    entries, exit_idx, exit_offsets, take_profit, raw_exit = _taken_exits(
+        open_, close, entries, targets, hit_indices, hold_days
+    )
+    trades = np.empty(len(entries), dtype=TRADE_DTYPE)
+    trades["entry_idx"] = entries
+    trades["exit_idx"] = exit_idx
+    trades["days_held"] = exit_offsets
+    trades["exit_reason"] = np.where(take_profit, EXIT_TAKE_PROFIT, EXIT_TIME_STOP)
+    trades["entry_price"] = open_[entries]
+    trades["exit_price"] = raw_exit
+    trades["profit_pct"] = net_returns(trades["entry_price"], trades["exit_price"], fee_rate)
+    return trades
+
+
+def simulate_trades(open_, high, close, signal_indices, hold_days, take_profit_pct, fee_rate, hit_table=None):
+    """
+    NumPy-Variante der Exit-Simulation aus MeanReversionStrategy.backtest.
+
+    Jeder Kandidat (Signal + 1 Tag) bekommt seinen Exit unabhängig berechnet, danach werden
+    überlappende Trades in einem Durchlauf über die last_exit_index-Regel aufgelöst.
+    Gibt ein strukturiertes Array mit TRADE_DTYPE zurück.
+    """
+    entries = signal_entries(signal_indices, len(close))
+    if hold_days <= 0 or len(entries) == 0:
+        return np.empty(0, dtype=TRADE_DTYPE)
+
+    if hit_table is None:
+        hit_table = FirstHitTable(high)
+    targets = open_[entries] * (1 + take_profit_pct / 100)
+    hit_indices = hit_table.first_hits(entries, targets)
+    return resolve_exits(open_, close, entries, targets, hit_indices, hold_days, fee_rate)
+
+
+class TickerSignals:
+    """
+    Vorberechnungen pro Ticker, die sich alle Zellen der Grid Search teilen:
+    - Kursänderung pro Lookback (pct_change) und Einstiege pro (Lookback, Drop)
+    - die FirstHitTable für die Take-Profit-Suche
+    - Treffer-Indizes pro (Lookback, Drop, Take Profit), gültig für jede Haltedauer
+    Pro Zelle läuft danach nur noch resolve_exits (bzw. exits für die Grid Search, einmal für alle Gebühren).
+    """
+
+    def __init__(self, prices, features=None):
+        self._prices = weakref.ref(prices)
+        # Optional vorberechnete Kursänderungen und Sprungtabellen (feature_store.TickerFeatures)
+        self.features = features
+        self._changes = {}
+        self._entries = {}
+        self._hits = {}
+        self._hit_table = None
+        self._day_numbers = None
+        self._lock = threading.Lock()
+
+    @property
+    def prices(self):
+        # Nur schwach referenziert: Sonst hielte der Eintrag in _ticker_signals seinen eigenen Schlüssel am Leben
+        return self._prices()
+
+    @property
+    def hit_table(self):
+        if self._hit_table is None:
+            jumps = self.features.jumps if self.features is not None else None
+            self._hit_table = FirstHitTable(self.prices.high, jumps)
+        return self._hit_table
+
+    @property
+    def day_numbers(self):
+        """
+        Handelstage als Tage seit 1970-01-01 (int32), z.B. für die Exit-Folge in den Kennzahlen.
+        """
+        if self._day_numbers is None:
+            days = self.prices.dates.astype("datetime64[D]").astype(np.int32)
+            days.flags.writeable = False
+            self._day_numbers = days
+        return self._day_numbers
+
+    def change(self, lookback_days):
+        change = self._changes.get(lookback_days)
+        if change is None and self.features is not None:
+            change = self.features.changes.get(lookback_days)
+        if change is None:
+            change = pct_change(self.prices.close, lookback_days)
+            change.flags.writeable = False
+        self._changes[lookback_days] = change
+        return change
+
+    def entries(self, lookback_days, drop_threshold_pct):
+        key = (lookback_days, drop_threshold_pct)
+        entries = self._entries.get(key)
+        if entries is None:
+            threshold_decimal = -(drop_threshold_pct / 100)
+            signal_indices = np.flatnonzero(self.change(lookback_days) < threshold_decimal)
+            entries = signal_entries(signal_indices, len(self.prices))
+            entries.flags.writeable = False
+            if len(self._entries) >= _MAX_CACHED_KEYS:
+                self._entries.clear()
+            self._entries[key] = entries
+        return entries
+
+    def first_hits(self, lookback_days, drop_threshold_pct, take_profit_pct):
+        """
+        Ziele und Treffer-Indizes aller Einstiege für einen Take Profit, gültig für jede Haltedauer.
+        """
+        key = (lookback_days, drop_threshold_pct, take_profit_pct)
+        cached = self._hits.get(key)
+        if cached is None:
+            entries = self.entries(lookback_days, drop_threshold_pct)
+            targets = self.prices.open[entries] * (1 + take_profit_pct / 100)
+            cached = (targets, self.hit_table.first_hits(entries, targets))
+            if len(self._hits) >= _MAX_CACHED_KEYS:
+                self._hits.clear()
+            self._hits[key] = cached
+        return cached
+
+    def _exit_inputs(self, drop_threshold_pct, lookback_days, hold_days, take_profit_pct):
+        with self._lock:
+            entries = self.entries(lookback_days, drop_threshold_pct)
+            if hold_days <= 0 or len(entries) == 0:
+                return None
+            targets, hit_indices = self.first_hits(lookback_days, drop_threshold_pct, take_profit_pct)
+        return entries, targets, hit_indices
+
+    def trades(self, drop_threshold_pct, lookback_days, hold_days, take_profit_pct, fee_rate):
+        inputs = self._exit_inputs(drop_threshold_pct, lookback_days, hold_days, take_profit_pct)
+        if inputs is None:
+            return np.empty(0, dtype=TRADE_DTYPE)
+        return resolve_exits(self.prices.open, self.prices.close, *inputs, hold_days, fee_rate)
+
+    def exits(self, drop_threshold_pct, lookback_days, hold_days, take_profit_pct):
+        """
+        (Einstiege, Exit-Indizes, Haltetage, Exit-Kurse) der ausgeführten Trades einer Zelle, ohne Gebühr.
+        Alle Gebühren-Varianten einer Zelle teilen sich dieses Ergebnis (siehe net_returns).
+        """
+        inputs = self._exit_inputs(drop_threshold_pct, lookback_days, hold_days, take_profit_pct)
+        if inputs is None:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, empty, np.empty(0, dtype=np.float64)
+        entries, exit_idx, exit_offsets, _, raw_exit = _taken_exits(
+            self.prices.open, self.prices.close, *inputs, hold_days
+        )
+        return entries, exit_idx, exit_offsets, raw_exit
+
+
+_ticker_signals = weakref.WeakKeyDictionary()
+_ticker_signals_lock = threading.Lock()
+
+
+def get_ticker_signals(prices, features=None):
+    """
+    Gibt die TickerSignals zu einer PriceData zurück. Der Cache lebt so lange wie die PriceData im Store.
+    features (feature_store.TickerFeatures) wird übernommen, solange die TickerSignals noch keine haben
+    (z.B. wenn der erste Aufruf vor dem Schreiben des Feature-Caches kam).
+    """
+    with _ticker_signals_lock:
+        signals = _ticker_signals.get(prices)
+        if signals is None:
+            signals = TickerSignals(prices, features)
+            _ticker_signals[prices] = signals
+        elif features is not None and signals.features is None:
+            signals.features = features
+        return signals
+
+
+def backtest_arrays(prices, drop_threshold_pct, lookback_days, hold_days, take_profit_pct, fee_rate, features=None):
+    """
+    Kompletter Backtest auf einer PriceData (Signale + Exits), ohne pandas.
+    """
+    return get_ticker_signals(prices, features).trades(
+        drop_threshold_pct, lookback_days, hold_days, take_profit_pct, fee_rate
+    )
+
+
+# --- Testbereich ---
+if __name__ == "__main__":
+    import glob
+    import os
+    from strategy import MeanReversionStrategy
+
+    # Paritätstest: NumPy-Engine gegen die ursprüngliche pandas-Engine auf allen gecachten Tickern
+    tickers = sorted(os.path.basename(p)[:-4] for p in glob.glob(os.path.join("data_cache", "*.csv")))
+    param_sets = [
+        (10.0, 15, 780, 5.0, 0.001),
+        (3.0, 3, 20, 4.0, 0.001),
+        (5.0, 3, 5, 2.0, 0.0),
+        (2.5, 1, 1, 1.0, 0.002),
+    ]
+
+    legacy = MeanReversionStrategy(engine="pandas")
+    fast = MeanReversionStrategy(engine="numpy")
+
+    failures = 0
+    for ticker in tickers:
+        for params in param_sets:
+            expected = legacy.backtest(ticker, *params)
+            actual = fast.backtest(ticker, *params)
+            if expected != actual:
+                failures += 1
+                print(f"ABWEICHUNG: {ticker} {params} ({len(actual)} statt {len(expected)} Trades)")
+
+    checked = len(tickers) * len(param_sets)
+    print(f"Parität geprüft: {checked - failures}/{checked} Kombinationen identisch.")
+
+    # Features, die erst nach dem ersten Aufruf vorliegen, werden nachträglich übernommen
+    from feature_store import compute_features
+    from price_store import get_price_store
+    data = get_price_store().get("MSFT")
+    _ticker_signals.pop(data, None)
+    signals = get_ticker_signals(data)
+    assert signals.features is None
+    features = compute_features(data)
+    assert get_ticker_signals(data, features) is signals and signals.features is features
+    assert signals.change(3) is features.changes[3]
+    raise SystemExit(1 if failures else 0)
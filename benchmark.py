@@ -0,0 +1,367 @@
+# benchmark.py
+"""
+Reproduzierbare Benchmarks für die Hot Paths (Backtest, Grid Search, Kurven, API-Endpunkte).
+
+Läuft in einem temporären Arbeitsverzeichnis mit eigener data_cache-Kopie (oder synthetischen Daten),
+damit der echte Cache und der Ergebnis-Cache nicht verändert werden.
+
+Beispiele:
+    python benchmark.py                              # gecachte Ticker, Ergebnis als JSON auf stdout
+    python benchmark.py --synthetic 20000 --tickers 7
+    python benchmark.py --output bench.json --save-baseline
+    python benchmark.py --baseline benchmark_baseline.json --tolerance 0.25
+    python benchmark.py --no-baseline                # nur messen, ohne Vergleich
+    python benchmark.py --imports-only               # nur Import-Zeiten und Start-Budget prüfen
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(REPO_DIR, "benchmark_baseline.json")
+
+DEFAULT_TICKERS = ["^GDAXI", "^GSPC", "MSFT", "IBM", "SIE.DE", "NVDA", "TSLA"]
+
+# Wie in strategy.py (__main__) bzw. optimizer.py
+BACKTEST_PARAMS = {"drop": 10.0, "lookback": 15, "hold": 780, "take_profit": 5.0, "fee": 0.001}
+GRID_DROP = [2.5, 3.0, 4.0, 5.0, 6.0, 8.0, 10.0, 12.0]
+GRID_HOLD = [5, 10, 20, 40]
+GRID_TP = [2.0, 4.0, 6.0, 8.0]
+
+# Kaltstart-Importe: main (uvicorn) und grid_executor (Pool-Worker) gegen ein Zeit-Budget in Sekunden
+IMPORT_TARGETS = ("main", "grid_executor")
+IMPORT_BUDGET_S = 1.5
+# Module, die erst bei Bedarf geladen werden (Plots, Downloads, CSV/DataFrames) und beim Start nicht auftauchen dürfen
+LAZY_MODULES = ("matplotlib", "seaborn", "yfinance", "pandas")
+
+
+def write_synthetic_csv(path, ticker, rows, seed):
+    """
+    Schreibt eine synthetische Kursreihe (geometrischer Random Walk) im yfinance-CSV-Format.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("1990-01-01", periods=rows)
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.02, rows)))
+    open_ = close * np.exp(rng.normal(0, 0.005, rows))
+    high = np.maximum(open_, close) * np.exp(np.abs(rng.normal(0, 0.01, rows)))
+    low = np.minimum(open_, close) * np.exp(-np.abs(rng.normal(0, 0.01, rows)))
+    volume = rng.integers(1_000_000, 50_000_000, rows)
+
+    columns = pd.MultiIndex.from_product(
+        [["Close", "High", "Low", "Open", "Volume"], [ticker]], names=["Price", "Ticker"]
+    )
+    df = pd.DataFrame(np.column_stack([close, high, low, open_, volume]), index=dates, columns=columns)
+    df.index.name = "Date"
+    df.to_csv(os.path.join(path, f"{ticker}.csv"))
+
+
+def prepare_workdir(args):
+    """
+    Legt ein temporäres Arbeitsverzeichnis mit data_cache an und gibt (Pfad, Ticker) zurück.
+    """
+    workdir = tempfile.mkdtemp(prefix="updown_bench_")
+    cache_dir = os.path.join(workdir, "data_cache")
+    os.makedirs(cache_dir)
+
+    if args.synthetic:
+        tickers = [f"SYN{i}" for i in range(args.tickers)]
+        for i, ticker in enumerate(tickers):
+            write_synthetic_csv(cache_dir, ticker, args.synthetic, seed=args.seed + i)
+    else:
+        tickers = DEFAULT_TICKERS[:args.tickers]
+        for ticker in tickers:
+            shutil.copy2(os.path.join(REPO_DIR, "data_cache", f"{ticker}.csv"), cache_dir)
+    return workdir, tickers
+
+
+def measure(fn, repeat, setup=None):
+    """
+    Führt fn repeat-mal aus und gibt Median/Minimum der Laufzeit zurück.
+    Der Speicher-Peak wird in einem zusätzlichen Lauf mit tracemalloc gemessen,
+    weil das Tracing die Laufzeit Python-lastiger Pfade stark verfälscht.
+    """
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "wall_s": statistics.median(times),
+        "min_s": min(times),
+        "peak_mem_mb": peak / (1024 * 1024),
+    }
+
+
+def measure_import(module, repeat):
+    """
+    Importiert module repeat-mal in einem frischen Interpreter (ohne Interpreter-Start gemessen).
+    Gibt Median/Minimum der Import-Zeit und die dabei geladenen LAZY_MODULES zurück.
+    """
+    code = (
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        f"import {module}\n"
+        "elapsed = time.perf_counter() - start\n"
+        f"print(json.dumps({{'s': elapsed, 'loaded': [m for m in {LAZY_MODULES!r} if m in sys.modules]}}))\n"
+    )
+    env = dict(os.environ, PYTHONPATH=REPO_DIR, LOG_LEVEL="WARNING")
+    times = []
+    loaded = set()
+    with tempfile.TemporaryDirectory(prefix="import_bench_") as cwd:
+        for _ in range(repeat):
+            output = subprocess.run(
+                [sys.executable, "-c", code], cwd=cwd, env=env, capture_output=True, text=True, check=True
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            times.append(result["s"])
+            loaded.update(result["loaded"])
+    return {"wall_s": statistics.median(times), "min_s": min(times), "lazy_modules_loaded": sorted(loaded)}
+
+
+def run_import_benchmarks(repeat):
+    return {f"import[{module}]": measure_import(module, repeat) for module in IMPORT_TARGETS}
+
+
+def check_import_budget(results, budget):
+    """
+    Start-Budget: Liste der Verstöße (Import zu langsam oder Plot-/Download-Module beim Start geladen).
+    """
+    violations = []
+    for name, stats in results.items():
+        if not name.startswith("import["):
+            continue
+        if stats["wall_s"] > budget:
+            violations.append(f"{name} dauert {stats['wall_s']:.2f}s (Budget {budget:.2f}s)")
+        if stats["lazy_modules_loaded"]:
+            violations.append(f"{name} lädt {', '.join(stats['lazy_modules_loaded'])}")
+    return violations
+
+
+def run_benchmarks(args):
+    if args.imports_only:
+        return {"meta": _meta(args), "results": run_import_benchmarks(args.repeat)}
+
+    workdir, tickers = prepare_workdir(args)
+    old_cwd = os.getcwd()
+    os.chdir(workdir)
+    sys.path.insert(0, REPO_DIR)
+    try:
+        from price_store import get_price_store
+        from strategy import MeanReversionStrategy
+        from grid_executor import GridExecutor
+
+        store = get_price_store("data_cache")
+        for ticker in tickers:
+            store.get(ticker)
+        rows = {ticker: len(store.get(ticker)) for ticker in tickers}
+        total_rows = sum(rows.values())
+        results = {}
+
+        # Laden aller Ticker (Binär-Cache, ohne In-Memory-Cache)
+        stats = measure(
+            lambda: [store.get(t) for t in tickers], args.repeat, setup=lambda: store.invalidate()
+        )
+        stats["rows_per_s"] = total_rows / stats["wall_s"]
+        results["data_load"] = stats
+
+        # Backtest pro Ticker (Store wird vorher geleert, damit keine gecachten Signale/Trades greifen)
+        bot = MeanReversionStrategy(initial_capital=10000)
+        for ticker in tickers:
+            stats = measure(
+                lambda t=ticker: bot.backtest(
+                    t,
+                    drop_threshold_pct=BACKTEST_PARAMS["drop"],
+                    lookback_days=BACKTEST_PARAMS["lookback"],
+                    hold_days=BACKTEST_PARAMS["hold"],
+                    take_profit_pct=BACKTEST_PARAMS["take_profit"],
+                    fee_rate=BACKTEST_PARAMS["fee"],
+                ),
+                args.repeat,
+                setup=lambda: store.invalidate(),
+            )
+            stats["rows_per_s"] = rows[ticker] / stats["wall_s"]
+            results[f"backtest[{ticker}]"] = stats
+
+        # Grid Search in Optimizer-Größe (ohne Ergebnis-Cache)
+        cells = [
+            {"drop": d, "lookback": 3, "hold": h, "take_profit": tp, "fee": 0.001}
+            for d in GRID_DROP for h in GRID_HOLD for tp in GRID_TP
+        ]
+        with GridExecutor(max_workers=args.workers) as executor:
+            stats = measure(
+                lambda: list(executor.evaluate(cells, tickers, 10000)), args.repeat, setup=lambda: store.invalidate()
+            )
+        stats["rows_per_s"] = total_rows * len(cells) / stats["wall_s"]
+        stats["cells"] = len(cells)
+        results["grid_search"] = stats
+
+        # Vergleichskurven
+        import main
+        trades = bot.run_portfolio(tickers, BACKTEST_PARAMS)
+        data_dict = {t: store.get(t).to_frame() for t in tickers}
+        stats = measure(
+            lambda: main.calculate_comparison_curves(trades, tickers, 10000, data_dict), args.repeat
+        )
+        stats["rows_per_s"] = total_rows / stats["wall_s"]
+        results["comparison_curves"] = stats
+
+        # API-Endpunkte über den TestClient (benötigt httpx)
+        try:
+            from fastapi.testclient import TestClient
+        except ImportError as e:
+            print(f"Hinweis: Endpunkt-Benchmarks übersprungen ({e})", file=sys.stderr)
+        else:
+            main.grid_executor.max_workers = args.workers
+            body = {
+                "tickers": tickers,
+                "drop_options": GRID_DROP,
+                "hold_options": GRID_HOLD,
+                "take_profit_options": GRID_TP,
+            }
+            with TestClient(main.app) as client:
+                def clear_result_cache():
+                    from result_cache import get_result_cache
+                    with get_result_cache("data_cache")._conn as conn:
+                        conn.execute("DELETE FROM cell_results")
+                    get_result_cache("data_cache")._memory.clear()
+
+                def post_optimize():
+                    response = client.post("/optimize", json=body)
+                    response.raise_for_status()
+
+                stats = measure(post_optimize, args.repeat, setup=clear_result_cache)
+                stats["rows_per_s"] = total_rows * len(cells) / stats["wall_s"]
+                results["endpoint_optimize"] = stats
+
+                def get_chart():
+                    response = client.get(f"/chart/{tickers[0]}")
+                    response.raise_for_status()
+
+                stats = measure(get_chart, args.repeat)
+                stats["rows_per_s"] = rows[tickers[0]] / stats["wall_s"]
+                results["endpoint_chart"] = stats
+            main.grid_executor.shutdown()
+
+        results.update(run_import_benchmarks(args.repeat))
+
+        meta = _meta(args)
+        meta.update({"tickers": tickers, "rows": total_rows})
+        return {"meta": meta, "results": results}
+    finally:
+        os.chdir(old_cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _meta(args):
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "workers": args.workers,
+        "repeat": args.repeat,
+        "data": f"synthetic:{args.synthetic}" if args.synthetic else "data_cache",
+    }
+
+
+def compare_to_baseline(report, baseline, tolerance):
+    """
+    Vergleicht die Laufzeiten mit einer gespeicherten Baseline.
+    Gibt die Liste der Regressionen (langsamer als Baseline * (1 + tolerance)) zurück.
+    """
+    regressions = []
+    for name, stats in report["results"].items():
+        reference = baseline.get("results", {}).get(name)
+        if reference is None:
+            continue
+        ratio = stats["wall_s"] / reference["wall_s"] if reference["wall_s"] else float("inf")
+        stats["baseline_wall_s"] = reference["wall_s"]
+        stats["ratio"] = ratio
+        if ratio > 1 + tolerance:
+            regressions.append((name, ratio))
+    return regressions
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks für Backtest, Grid Search und API.")
+    parser.add_argument("--synthetic", type=int, default=0, help="Synthetische Reihen dieser Länge statt data_cache")
+    parser.add_argument("--tickers", type=int, default=len(DEFAULT_TICKERS), help="Anzahl Ticker")
+    parser.add_argument("--seed", type=int, default=42, help="Seed für synthetische Daten")
+    parser.add_argument("--repeat", type=int, default=5, help="Wiederholungen pro Benchmark")
+    parser.add_argument("--workers", type=int, default=1, help="Worker der Grid Search (1 = ohne Pool)")
+    parser.add_argument("--output", help="Ergebnis zusätzlich als JSON-Datei speichern")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline-Datei zum Vergleich")
+    parser.add_argument("--save-baseline", action="store_true", help="Ergebnis als neue Baseline speichern")
+    parser.add_argument("--no-baseline", action="store_true", help="Nur messen, nicht mit der Baseline vergleichen")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Erlaubte Verlangsamung (0.25 = +25%%)")
+    parser.add_argument("--imports-only", action="store_true", help="Nur Import-Zeiten und Start-Budget messen")
+    parser.add_argument("--import-budget", type=float, default=IMPORT_BUDGET_S,
+                        help="Maximale Import-Zeit pro Modul in Sekunden")
+    args = parser.parse_args(argv)
+
+    if not args.synthetic:
+        args.tickers = min(args.tickers, len(DEFAULT_TICKERS))
+
+    # Ausgaben der Module (print) nach stderr, damit stdout reines JSON bleibt
+    with contextlib.redirect_stdout(sys.stderr):
+        report = run_benchmarks(args)
+
+    violations = check_import_budget(report["results"], args.import_budget)
+    report["budget_violations"] = violations
+
+    regressions = []
+    # Ohne Baseline wäre der Regressionstest stillschweigend wirkungslos -> Fehler statt Überspringen
+    missing_baseline = not args.save_baseline and not args.no_baseline and not os.path.exists(args.baseline)
+    if not args.save_baseline and not args.no_baseline and not missing_baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare_to_baseline(report, json.load(f), args.tolerance)
+        report["regressions"] = [{"name": name, "ratio": ratio} for name, ratio in regressions]
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            f.write(output)
+        print(f"Baseline gespeichert: {args.baseline}", file=sys.stderr)
+
+    for name, ratio in regressions:
+        print(f"REGRESSION: {name} ist {ratio:.2f}x so langsam wie die Baseline", file=sys.stderr)
+    for violation in violations:
+        print(f"BUDGET: {violation}", file=sys.stderr)
+    if missing_baseline:
+        print(f"BASELINE: {args.baseline} fehlt (mit --save-baseline erstellen oder --no-baseline)", file=sys.stderr)
+    return 1 if regressions or violations or missing_baseline else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -1,63 +1,276 @@
 # data_manager.py
-import yfinance as yf
-import pandas as pd
+import numpy as np
+import logging
 import os
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from price_store import get_price_store, source_mtime
+from feature_store import DEFAULT_LOOKBACKS, build_features, load_features
+from result_cache import get_result_cache
+from metrics import timed
+
+logger = logging.getLogger(__name__)
+
+
+def read_raw_csv(file_path):
+    """
+    Liest eine yfinance-CSV im Rohformat (Spalten Price/Ticker, Index Date), z.B. zum Anhängen neuer Bars.
+    """
+    import pandas as pd
+    df = pd.read_csv(
+        file_path, header=[0, 1], index_col=0, skiprows=[2], parse_dates=True, float_precision="round_trip"
+    )
+    df.index.name = "Date"
+    return df
+
+
+class YahooFetcher:
+    """
+    Standard-Datenquelle: yfinance (auto_adjust=True, wie bisher).
+    """
+
+    def fetch(self, ticker, start_date, end_date=None):
+        # yfinance (inkl. HTTP-Stack) erst beim ersten Download laden, Cache-Zugriffe brauchen es nicht
+        import yfinance as yf
+        return yf.download(ticker, start=start_date, end=end_date, progress=False, auto_adjust=True)
+
+
+class LocalFetcher:
+    """
+    Offline-Datenquelle für Tests: liefert Daten aus einem Ordner mit yfinance-CSVs
+    (z.B. einer Kopie von data_cache), beschränkt auf [start_date, end_date).
+    """
+
+    def __init__(self, source_path="data_cache"):
+        self.source_path = source_path
+
+    def fetch(self, ticker, start_date, end_date=None):
+        import pandas as pd
+        file_path = os.path.join(self.source_path, f"{ticker}.csv")
+        if not os.path.exists(file_path):
+            return pd.DataFrame()
+        df = read_raw_csv(file_path)
+        mask = df.index >= pd.Timestamp(start_date)
+        if end_date is not None:
+            mask &= df.index < pd.Timestamp(end_date)
+        return df.loc[mask]
 
 
 class DataManager:
-    def __init__(self, storage_path="data_cache"):
+    def __init__(self, storage_path="data_cache", fetcher=None, max_download_workers=4,
+                 feature_lookbacks=DEFAULT_LOOKBACKS):
         """
         Initialisiert den Manager.
         storage_path: Der Ordner, in dem die CSV-Dateien gespeichert werden.
+        fetcher: Datenquelle mit fetch(ticker, start_date, end_date), Standard ist Yahoo Finance.
+        max_download_workers: Anzahl paralleler Downloads.
+        feature_lookbacks: Lookbacks, deren Kursänderung im Feature-Cache vorberechnet wird (leer = kein Feature-Cache).
         """
         self.storage_path = storage_path
         if not os.path.exists(storage_path):
             os.makedirs(storage_path)
+        self.store = get_price_store(storage_path)
+        self.fetcher = fetcher or YahooFetcher()
+        self.max_download_workers = max_download_workers
+        self.feature_lookbacks = tuple(feature_lookbacks)
 
-    def get_historical_data(self, tickers, start_date, end_date, reload=False):
+    def _csv_path(self, ticker):
+        return os.path.join(self.storage_path, f"{ticker}.csv")
+
+    def _save_download(self, ticker, df):
         """
-        Lädt Daten für eine Liste von Tickern und prüft zuerst, ob lokale Daten vorhanden sind.
+        Schreibt die Rohdaten (atomar) und lädt den Ticker neu in den Store.
+        """
+        file_path = self._csv_path(ticker)
+        tmp_path = file_path + ".tmp"
+        df.to_csv(tmp_path)
+        os.replace(tmp_path, file_path)
 
-        reload: Wenn True, wird der Download erzwungen (Cache ignoriert).
+        # Neue Datei -> Store lädt neu und schreibt dabei den Binär-Cache
+        self.store.invalidate(ticker)
+        data = self.store.get(ticker)
+        self._ensure_features(data)
+        # Gespeicherte Optimierungsergebnisse zu alten Kursdaten verwerfen
+        get_result_cache(self.storage_path).invalidate_ticker(ticker, keep_hash=data.content_hash)
+        return data
+
+    def _download(self, ticker, start_date, end_date):
+        logger.info("[%s] Lade von Yahoo Finance herunter...", ticker)
+        df = self.fetcher.fetch(ticker, start_date, end_date)
+
+        if df.empty:
+            logger.warning("Keine Daten für %s gefunden.", ticker)
+            return None
+        return self._save_download(ticker, df)
+
+    def _refresh(self, ticker, start_date, end_date, overlap_days=10, rtol=1e-6):
+        """
+        Inkrementelles Update: holt nur Bars ab dem letzten gecachten Datum (plus Überlappung).
+        Weichen die überlappenden Bars ab (Split, Dividenden-Adjustierung), wird komplett neu geladen.
+        """
+        import pandas as pd
+        file_path = self._csv_path(ticker)
+        if not os.path.exists(file_path):
+            return self._download(ticker, start_date, end_date)
+
+        cached = read_raw_csv(file_path)
+        if cached.empty:
+            return self._download(ticker, start_date, end_date)
+
+        last_date = cached.index[-1]
+        fetch_start = (last_date - timedelta(days=overlap_days)).strftime('%Y-%m-%d')
+        logger.info("[%s] Aktualisiere ab %s...", ticker, fetch_start)
+        fresh = self.fetcher.fetch(ticker, fetch_start, end_date)
+        if fresh.empty:
+            return self.store.get(ticker)
+
+        fresh = fresh.copy()
+        fresh.index = pd.DatetimeIndex(fresh.index).tz_localize(None)
+        fresh.index.name = "Date"
+
+        overlap = fresh.index.intersection(cached.index)
+        if len(overlap) == 0:
+            logger.info("[%s] Keine Überlappung mit dem Cache, lade komplett neu.", ticker)
+            return self._download(ticker, start_date, end_date)
+
+        old_close = cached.loc[overlap, "Close"].to_numpy(dtype=np.float64)
+        new_close = fresh.loc[overlap, "Close"].to_numpy(dtype=np.float64)
+        if old_close.shape != new_close.shape or not np.allclose(old_close, new_close, rtol=rtol, equal_nan=True):
+            logger.info("[%s] Kurse wurden nachträglich angepasst (Split/Dividende), lade komplett neu.", ticker)
+            return self._download(ticker, start_date, end_date)
+
+        new_rows = fresh.loc[fresh.index > last_date]
+        if new_rows.empty:
+            logger.info("[%s] Bereits aktuell.", ticker)
+            return self.store.get(ticker)
+
+        logger.info("[%s] %d neue Bars angehängt.", ticker, len(new_rows))
+        new_rows = new_rows.reindex(columns=cached.columns)
+        return self._save_download(ticker, pd.concat([cached, new_rows]))
+
+    def _ensure_features(self, data):
+        """
+        Feature-Stufe: berechnet und speichert die Merkmale (feature_store.py), wenn sie fehlen, zu alten
+        Kursen gehören oder konfigurierte Lookbacks fehlen. Danach starten Backtests mit fertigen Arrays.
+        """
+        if data is None or len(data) == 0 or not self.feature_lookbacks:
+            return None
+        features = load_features(self.storage_path, data)
+        if features is None or not set(self.feature_lookbacks) <= set(features.changes):
+            logger.debug("[%s] Berechne Feature-Cache...", data.ticker)
+            features = build_features(self.storage_path, data, self.feature_lookbacks)
+        return features
+
+    @timed("get_price_data")
+    def get_price_data(self, tickers, start_date, end_date, reload=False, refresh=False):
+        """
+        Wie get_historical_data, gibt aber pro Ticker direkt die PriceData-Arrays zurück
+        (None, wenn keine Daten vorhanden sind).
+
+        refresh: Wenn True, werden gecachte Ticker inkrementell bis end_date aktualisiert.
+        Downloads laufen parallel in einem begrenzten Thread-Pool.
         """
         all_data = {}
+        pending = []
 
-        print(f"--- Starte Datenbeschaffung für {len(tickers)} Aktien ---")
+        logger.debug("Starte Datenbeschaffung für %d Aktien", len(tickers))
 
         for ticker in tickers:
-            file_path = os.path.join(self.storage_path, f"{ticker}.csv")
+            cached = source_mtime(self.storage_path, ticker) is not None
 
-            if os.path.exists(file_path) and not reload:
-                print(f"[{ticker}] Lade aus Cache...")
-                df = df = pd.read_csv(file_path, header=[0, 1, 2], index_col=0, parse_dates=True)
+            if cached and not reload and not refresh:
+                logger.debug("[%s] Lade aus Cache...", ticker)
+                all_data[ticker] = self.store.get(ticker)
+                self._ensure_features(all_data[ticker])
+            elif cached and refresh and not reload:
+                pending.append((ticker, self._refresh))
+            else:
+                pending.append((ticker, self._download))
 
+        if pending:
+            workers = max(1, min(self.max_download_workers, len(pending)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    ticker: executor.submit(task, ticker, start_date, end_date)
+                    for ticker, task in pending
+                }
+                for ticker, future in futures.items():
+                    try:
+                        all_data[ticker] = future.result()
+                    except Exception as e:
+                        logger.warning("Download für %s fehlgeschlagen: %s", ticker, e)
+                        all_data[ticker] = self.store.get(ticker)
 
-            else:
-                print(f"[{ticker}] Lade von Yahoo Finance herunter...")
-                df = yf.download(ticker, start=start_date, end=end_date, progress=False, auto_adjust=True)
+        logger.debug("Datenbeschaffung abgeschlossen")
+        return {ticker: all_data.get(ticker) for ticker in tickers}
 
-                if not df.empty:
-                    df.to_csv(file_path)
-                else:
-                    print(f"WARNUNG: Keine Daten für {ticker} gefunden.")
+    def refresh_data(self, tickers, start_date="2000-01-01", end_date=None):
+        """
+        Aktualisiert die gecachten Ticker inkrementell (fehlende werden komplett geladen).
+        """
+        return self.get_price_data(tickers, start_date, end_date, refresh=True)
 
-            all_data[ticker] = df
+    @timed("get_historical_data")
+    def get_historical_data(self, tickers, start_date, end_date, reload=False):
+        """
+        Lädt Daten für eine Liste von Tickern und prüft zuerst, ob lokale Daten vorhanden sind.
 
-        print("--- Datenbeschaffung abgeschlossen ---\n")
-        return all_data
+        reload: Wenn True, wird der Download erzwungen (Cache ignoriert).
+        Gibt pro Ticker einen bereinigten DataFrame (Open/High/Low/Close) aus dem PriceStore zurück.
+        """
+        import pandas as pd
+        price_data = self.get_price_data(tickers, start_date, end_date, reload=reload)
+        return {
+            ticker: data.to_frame() if data is not None else pd.DataFrame()
+            for ticker, data in price_data.items()
+        }
 
 
 # --- Testbereich ---
 if __name__ == "__main__":
-    my_tickers = ["AAPL", "MSFT", "IBM", "SIE.DE", "BMW.DE", "KO"]
+    import shutil
+    import tempfile
 
-    manager = DataManager()
-    data = manager.get_historical_data(
-        tickers=my_tickers,
-        start_date="2020-01-01",
-        end_date=datetime.today().strftime('%Y-%m-%d')
-    )
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    # Inkrementelles Update offline: LocalFetcher liefert eine Kopie von data_cache, der Cache ist gekürzt
+    source = tempfile.mkdtemp()
+    storage = tempfile.mkdtemp()
+    try:
+        ticker = "MSFT"
+        shutil.copy(os.path.join("data_cache", f"{ticker}.csv"), source)
+        with open(os.path.join(source, f"{ticker}.csv"), encoding="utf-8") as f:
+            original = f.read()
+        lines = original.splitlines(keepends=True)
+        with open(os.path.join(storage, f"{ticker}.csv"), "w", encoding="utf-8") as f:
+            f.writelines(lines[:-25])
+
+        manager = DataManager(storage, fetcher=LocalFetcher(source), max_download_workers=1)
+        truncated = len(manager.store.get(ticker))
+
+        # 1) Neue Bars werden angehängt, die Datei ist danach byte-gleich zur Quelle (gleiches Format)
+        data = manager.refresh_data([ticker])[ticker]
+        assert len(data) == truncated + 25
+        with open(manager._csv_path(ticker), encoding="utf-8") as f:
+            assert f.read() == original
+        print(f"25 Bars angehängt ({truncated} -> {len(data)}), Dateiformat unverändert.")
+
+        # 2) Ohne neue Bars bleibt die Datei unangetastet
+        mtime = os.stat(manager._csv_path(ticker)).st_mtime_ns
+        data = manager.refresh_data([ticker])[ticker]
+        assert len(data) == truncated + 25
+        assert os.stat(manager._csv_path(ticker)).st_mtime_ns == mtime
+        print("Bereits aktuell: Datei nicht neu geschrieben.")
 
-    print("Beispiel Daten für Apple:")
-    print(data["AAPL"].head())
\ No newline at end of file
+        # 3) Nachträglich angepasste Kurse (z.B. Split) -> kompletter Neuabruf
+        adjusted = read_raw_csv(os.path.join(source, f"{ticker}.csv"))
+        adjusted[["Open", "High", "Low", "Close"]] /= 2
+        adjusted.to_csv(os.path.join(source, f"{ticker}.csv"))
+        data = manager.refresh_data([ticker])[ticker]
+        assert len(data) == len(adjusted)
+        assert np.allclose(data.close, adjusted["Close"].to_numpy(dtype=np.float64).ravel())
+        print("Angepasste Kurse erkannt, komplett neu geladen.")
+    finally:
+        shutil.rmtree(source)
+        shutil.rmtree(storage)
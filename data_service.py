@@ -0,0 +1,132 @@
+# data_service.py
+"""
+Asynchroner Datenzugriff für die FastAPI-Endpunkte.
+
+Blockierende Ladevorgänge (CSV/Binär-Cache, ggf. Download) laufen in Threads außerhalb des Event-Loops.
+Gleichzeitige Anfragen für denselben Ticker teilen sich eine laufende Ladung (Single-Flight),
+dazu kommt das Vorwärmen des Ticker-Universums beim Start der Anwendung.
+"""
+import asyncio
+import logging
+import os
+
+
+from data_manager import DataManager
+from metrics import CACHE_REQUESTS, span
+
+logger = logging.getLogger(__name__)
+
+
+START_DATE = "2000-01-01"
+END_DATE = "2025-01-01"
+
+# Ticker, die beim Start vorgewärmt werden (Umgebungsvariable PREWARM_TICKERS, kommagetrennt, leer = aus)
+DEFAULT_UNIVERSE = ("^GDAXI", "^GSPC", "MSFT", "IBM", "SIE.DE", "NVDA", "TSLA")
+
+
+def configured_universe():
+    configured = os.environ.get("PREWARM_TICKERS")
+    if configured is None:
+        return list(DEFAULT_UNIVERSE)
+    return [ticker.strip() for ticker in configured.split(",") if ticker.strip()]
+
+
+class AsyncDataService:
+    """
+    Lädt PriceData pro Ticker über den DataManager in einem Thread. Pro Ticker gibt es höchstens eine
+    laufende Ladung, weitere Anfragen warten auf deren Ergebnis. Danach liefert der PriceStore aus dem Speicher.
+    """
+
+    def __init__(self, storage_path="data_cache", start_date=START_DATE, end_date=END_DATE):
+        self.storage_path = storage_path
+        self.start_date = start_date
+        self.end_date = end_date
+        self._manager = None
+        self._inflight = {}
+
+    @property
+    def manager(self):
+        # Erst beim ersten Zugriff anlegen (legt den Speicherordner an)
+        if self._manager is None:
+            self._manager = DataManager(self.storage_path)
+        return self._manager
+
+    def load_blocking(self, ticker):
+        """
+        Lädt einen Ticker im aufrufenden Thread (für Aufrufer, die ohnehin außerhalb des Event-Loops laufen).
+        """
+        return self.manager.get_price_data([ticker], self.start_date, self.end_date, reload=False).get(ticker)
+
+    async def get(self, ticker):
+        """
+        PriceData für einen Ticker (oder None, wenn keine Daten existieren).
+        """
+        task = self._inflight.get(ticker)
+        if task is None:
+            CACHE_REQUESTS.inc(cache="data_loads", result="started")
+            task = asyncio.ensure_future(asyncio.to_thread(self.load_blocking, ticker))
+            self._inflight[ticker] = task
+            task.add_done_callback(lambda _: self._inflight.pop(ticker, None))
+        else:
+            CACHE_REQUESTS.inc(cache="data_loads", result="coalesced")
+        # shield: Bricht ein wartender Request ab, läuft die Ladung für die anderen weiter
+        return await asyncio.shield(task)
+
+    async def get_many(self, tickers):
+        """
+        PriceData pro Ticker (Reihenfolge und Duplikate wie in tickers), alle Ticker laden gleichzeitig.
+        """
+        unique = list(dict.fromkeys(tickers))
+        with span("data_load"):
+            loaded = await asyncio.gather(*(self.get(ticker) for ticker in unique))
+        return dict(zip(unique, loaded))
+
+    async def get_frames(self, tickers):
+        """
+        Wie get_many, aber als DataFrames (leer, wenn keine Daten existieren) wie DataManager.get_historical_data.
+        """
+        import pandas as pd
+        loaded = await self.get_many(tickers)
+        return {ticker: data.to_frame() if data is not None else pd.DataFrame() for ticker, data in loaded.items()}
+
+    async def prewarm(self, tickers):
+        """
+        Lädt das Ticker-Universum in den PriceStore. Fehler einzelner Ticker brechen das Vorwärmen nicht ab.
+        """
+        if not tickers:
+            return {}
+        results = await asyncio.gather(*(self.get(ticker) for ticker in tickers), return_exceptions=True)
+        loaded = {}
+        for ticker, result in zip(tickers, results):
+            if isinstance(result, Exception):
+                logger.warning("Vorwärmen von %s fehlgeschlagen: %s", ticker, result)
+            elif result is not None:
+                loaded[ticker] = result
+        logger.info("%d von %d Tickern vorgewärmt.", len(loaded), len(tickers))
+        return loaded
+
+
+# --- Testbereich ---
+if __name__ == "__main__":
+    import time
+    from price_store import get_price_store
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    async def main():
+        store = get_price_store()
+        store.invalidate()
+        service = AsyncDataService()
+
+        # Zehn gleichzeitige Anfragen für denselben Ticker -> eine Ladung
+        misses = store.misses
+        start = time.perf_counter()
+        results = await asyncio.gather(*(service.get("MSFT") for _ in range(10)))
+        elapsed = time.perf_counter() - start
+        assert all(r is results[0] for r in results)
+        print(f"10 gleichzeitige Anfragen: {store.misses - misses} Ladung(en), {elapsed * 1000:.1f}ms")
+        assert store.misses - misses == 1
+
+        await service.prewarm(configured_universe())
+
+    asyncio.run(main())
@@ -0,0 +1,166 @@
+# feature_store.py
+"""
+Vorberechnete Merkmale pro Ticker, gespeichert neben dem Kurs-Cache in <Ticker>.features/:
+- Kursänderung (pct_change des Close) für eine konfigurierbare Menge von Lookbacks
+- die Sprungtabellen der FirstHitTable (Kette der nächsthöheren Hochs), die für jede Haltedauer
+  und jedes Take-Profit-Ziel den ersten Treffer liefern
+
+Die Dateien sind .npy-Arrays (per mmap ladbar, schreibgeschützt). meta.json wird zuletzt geschrieben und
+bindet die Merkmale an den content_hash der Kursdaten; ändern sich die Kurse, gilt der Cache als veraltet.
+"""
+import json
+import logging
+import os
+import threading
+import weakref
+
+import numpy as np
+
+from backtest_engine import FirstHitTable, pct_change
+from price_store import readonly, replace_file
+
+logger = logging.getLogger(__name__)
+
+
+FEATURE_SUFFIX = ".features"
+FEATURE_FORMAT_VERSION = 1
+
+# Lookbacks, deren Kursänderung vorberechnet wird (andere werden wie bisher bei Bedarf berechnet)
+DEFAULT_LOOKBACKS = (1, 2, 3, 5, 10)
+
+
+class TickerFeatures:
+    """
+    Schreibgeschützte Merkmals-Arrays eines Tickers: changes {Lookback: pct_change}, jumps (Liste der Sprungtabellen).
+    """
+    __slots__ = ("ticker", "content_hash", "changes", "jumps")
+
+    def __init__(self, ticker, content_hash, changes, jumps):
+        self.ticker = ticker
+        self.content_hash = content_hash
+        self.changes = {lookback: readonly(change) for lookback, change in changes.items()}
+        self.jumps = [readonly(jump) for jump in jumps]
+
+    @property
+    def lookbacks(self):
+        return tuple(sorted(self.changes))
+
+
+def feature_path(storage_path, ticker):
+    return os.path.join(storage_path, f"{ticker}{FEATURE_SUFFIX}")
+
+
+def compute_features(data, lookbacks=DEFAULT_LOOKBACKS):
+    """
+    Berechnet die Merkmale aus einer PriceData.
+    """
+    changes = {int(lookback): pct_change(data.close, int(lookback)) for lookback in lookbacks}
+    jumps = FirstHitTable(data.high).jumps
+    return TickerFeatures(data.ticker, data.content_hash, changes, jumps)
+
+
+def write_features(storage_path, features):
+    directory = feature_path(storage_path, features.ticker)
+    os.makedirs(directory, exist_ok=True)
+    for lookback, change in features.changes.items():
+        replace_file(os.path.join(directory, f"change_{lookback}.npy"), lambda f, c=change: np.save(f, c))
+    jumps = np.vstack(features.jumps) if features.jumps else np.empty((0, 0), dtype=np.int64)
+    replace_file(os.path.join(directory, "jumps.npy"), lambda f: np.save(f, jumps))
+
+    meta = {
+        "version": FEATURE_FORMAT_VERSION,
+        "ticker": features.ticker,
+        "content_hash": features.content_hash,
+        "lookbacks": list(features.lookbacks),
+    }
+    replace_file(os.path.join(directory, "meta.json"), lambda f: f.write(json.dumps(meta).encode("utf-8")))
+
+
+def read_features(storage_path, data):
+    """
+    Lädt die Merkmale per mmap. None, wenn sie fehlen, ein anderes Format haben oder zu anderen Kursen gehören.
+    """
+    directory = feature_path(storage_path, data.ticker)
+    try:
+        with open(os.path.join(directory, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get("version") != FEATURE_FORMAT_VERSION or meta.get("content_hash") != data.content_hash:
+        return None
+
+    try:
+        changes = {
+            lookback: np.load(os.path.join(directory, f"change_{lookback}.npy"), mmap_mode="r")
+            for lookback in meta.get("lookbacks", [])
+        }
+        jumps = np.load(os.path.join(directory, "jumps.npy"), mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+    if any(len(change) != len(data) for change in changes.values()) or jumps.shape[1:] != (len(data) + 1,):
+        return None
+    return TickerFeatures(data.ticker, meta["content_hash"], changes, list(jumps))
+
+
+def build_features(storage_path, data, lookbacks=DEFAULT_LOOKBACKS):
+    """
+    Gibt gültige Merkmale mit mindestens diesen Lookbacks zurück; fehlen sie oder sind sie veraltet,
+    werden sie berechnet und gespeichert.
+    """
+    features = read_features(storage_path, data)
+    if features is not None and set(lookbacks) <= set(features.changes):
+        return features
+    if features is not None:
+        lookbacks = sorted(set(lookbacks) | set(features.changes))
+
+    features = compute_features(data, lookbacks)
+    try:
+        write_features(storage_path, features)
+    except OSError as e:
+        logger.warning("Feature-Cache für %s konnte nicht geschrieben werden: %s", data.ticker, e)
+    with _loaded_lock:
+        _loaded[data] = features
+    return features
+
+
+_loaded = weakref.WeakKeyDictionary()
+_loaded_lock = threading.Lock()
+
+
+def load_features(storage_path, data):
+    """
+    Merkmale zu einer PriceData aus dem Store (oder None). Pro PriceData wird höchstens einmal gelesen,
+    der Eintrag lebt so lange wie die PriceData.
+    """
+    if data is None:
+        return None
+    with _loaded_lock:
+        if data in _loaded:
+            return _loaded[data]
+        features = read_features(storage_path, data)
+        _loaded[data] = features
+        return features
+
+
+# --- Testbereich ---
+if __name__ == "__main__":
+    import glob
+    import time
+    from price_store import get_price_store
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    # Alle gecachten Ticker vorberechnen und gegen die direkte Berechnung prüfen
+    store = get_price_store()
+    tickers = sorted(os.path.basename(p)[:-4] for p in glob.glob(os.path.join("data_cache", "*.csv")))
+    for ticker in tickers:
+        data = store.get(ticker)
+        start = time.perf_counter()
+        build_features("data_cache", data)
+        features = read_features("data_cache", data)
+        table = FirstHitTable(data.high)
+        assert all(np.array_equal(a, b) for a, b in zip(features.jumps, table.jumps))
+        for lookback, change in features.changes.items():
+            assert np.array_equal(change, pct_change(data.close, lookback), equal_nan=True)
+        print(f"{ticker}: Lookbacks {features.lookbacks}, {len(features.jumps)} Sprungtabellen "
+              f"({(time.perf_counter() - start) * 1000:.1f}ms)")
@@ -5,6 +5,8 @@ import {
 } from 'recharts';
 import './App.css'
 
+const API_URL = 'http://127.0.0.1:8000'
+
 // --- VERBESSERTE MARKER (Position korrigiert) ---
 const BuyMarker = (props) => {
   const { cx, cy } = props;
@@ -42,6 +44,8 @@ function App() {
   const [tpMax, setTpMax] = useState(8.0)
 
   const [loading, setLoading] = useState(false)
+  const [progress, setProgress] = useState(null)
+  const [jobId, setJobId] = useState(null)
   const [result, setResult] = useState(null)
   const [error, setError] = useState(null)
 
@@ -74,7 +78,37 @@ function App() {
       }
 
       console.log("Sende Anfrage...", payload)
-      const response = await axios.post('http://127.0.0.1:8000/optimize', payload)
+      const job = await axios.post(`${API_URL}/jobs/optimize`, payload)
+      setJobId(job.data.job_id)
+      setProgress(job.data)
+
+      // Fortschritt per Server-Sent Events, bis der Job abgeschlossen ist
+      const finalStatus = await new Promise((resolve, reject) => {
+        const source = new EventSource(`${API_URL}/jobs/${job.data.job_id}/events`)
+        source.onmessage = (event) => {
+          const status = JSON.parse(event.data)
+          setProgress(status)
+          if (['done', 'failed', 'cancelled'].includes(status.status)) {
+            source.close()
+            resolve(status)
+          }
+        }
+        source.onerror = (err) => {
+          source.close()
+          reject(err)
+        }
+      })
+
+      if (finalStatus.status === 'cancelled') {
+        setError("Optimierung abgebrochen.")
+        return
+      }
+      if (finalStatus.status === 'failed') {
+        setError(finalStatus.error || "Optimierung fehlgeschlagen.")
+        return
+      }
+
+      const response = await axios.get(`${API_URL}/jobs/${job.data.job_id}/result`)
       setResult(response.data)
 
       if (response.data.trades.length > 0) {
@@ -90,6 +124,17 @@ function App() {
       setError("Verbindung fehlgeschlagen. Backend prüfen.")
     } finally {
       setLoading(false)
+      setJobId(null)
+      setProgress(null)
+    }
+  }
+
+  const handleCancel = async () => {
+    if (!jobId) return
+    try {
+      await axios.delete(`${API_URL}/jobs/${jobId}`)
+    } catch (err) {
+      console.error(err)
     }
   }
 
@@ -99,7 +144,7 @@ function App() {
     setChartData([])
 
     try {
-      const res = await axios.get(`http://127.0.0.1:8000/chart/${ticker}`)
+      const res = await axios.get(`${API_URL}/chart/${ticker}`)
       const prices = res.data
       const myTrades = allTrades.filter(t => t.ticker === ticker)
 
@@ -165,6 +210,16 @@ function App() {
         <button className="btn-primary" onClick={handleOptimize} disabled={loading}>
           {loading ? "Berechne Strategien..." : "Analyse Starten"}
         </button>
+        {loading && progress && (
+          <div style={{marginTop: '15px', color: '#555', fontSize: '14px', display: 'flex', gap: '20px', alignItems: 'center'}}>
+            <div>Kombinationen: <strong>{progress.cells_done} / {progress.cells_total}</strong></div>
+            {progress.best_roi !== null && <div>Bestes ROI: <strong>{progress.best_roi}%</strong></div>}
+            {progress.eta_seconds !== null && <div>Restzeit: <strong>~{Math.ceil(progress.eta_seconds)} s</strong></div>}
+            <button onClick={handleCancel} style={{padding: '5px 10px', background: '#ecf0f1', border: '1px solid #c0392b', color: '#c0392b', borderRadius: '4px', cursor: 'pointer', fontSize: '12px'}}>
+              Abbrechen
+            </button>
+          </div>
+        )}
       </div>
 
       {error && <div style={{ color: '#c0392b', marginBottom: '20px', padding: '15px', background: '#fadbd8', borderRadius: '4px', border: '1px solid #f5b7b1' }}>{error}</div>}
@@ -0,0 +1,232 @@
+# grid_executor.py
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from backtest_engine import get_ticker_signals, net_returns
+from feature_store import load_features
+from metrics import CELLS_EVALUATED, TRADES_GENERATED
+from performance import TradeStats, portfolio_metrics
+from price_store import get_price_store
+from result_cache import cell_key
+
+
+def default_max_workers():
+    """
+    Anzahl Worker: Umgebungsvariable GRID_MAX_WORKERS, sonst Anzahl CPU-Kerne.
+    """
+    configured = os.environ.get("GRID_MAX_WORKERS")
+    if configured:
+        return max(1, int(configured))
+    return os.cpu_count() or 1
+
+
+# Im Worker-Prozess: vom Initializer geladene Ticker, die auch release_tickers nicht freigibt
+_preloaded = set()
+
+
+def _init_worker(storage_path, preload_tickers):
+    """
+    Initializer der Worker-Prozesse: lädt die Kurs-Arrays einmal in den PriceStore des Workers.
+    """
+    _preloaded.update(preload_tickers)
+    store = get_price_store(storage_path)
+    for ticker in preload_tickers:
+        try:
+            store.get(ticker)
+        except Exception:
+            pass
+
+
+def evaluate_group(storage_path, ticker, cells, initial_capital):
+    """
+    Wertet alle Zellen einer Gruppe (gleicher Ticker, Lookback und Drop) aus.
+    Kursänderung, Signale und Take-Profit-Treffer werden dabei nur einmal berechnet,
+    pro (Hold, TP) läuft nur noch die Exit-Simulation, und zwar einmal für alle Gebühren:
+    Die Gebühr skaliert nur Ein- und Ausstiegspreis und ändert die Exits nicht.
+    Gibt pro Zelle (cell_idx, TradeStats) zurück.
+    """
+    data = get_price_store(storage_path).get(ticker)
+    if data is None or len(data) == 0:
+        return [(cell_idx, TradeStats()) for cell_idx, _ in cells]
+
+    # Vorberechnete Kursänderungen und Sprungtabellen aus dem Feature-Cache, falls vorhanden
+    signals = get_ticker_signals(data, load_features(storage_path, data))
+    day_numbers = signals.day_numbers
+
+    by_exit = {}
+    for cell_idx, params in cells:
+        key = (params['lookback'], params['drop'], params['hold'], params['take_profit'])
+        by_exit.setdefault(key, []).append((cell_idx, params.get('fee', 0.001)))
+
+    results = []
+    for (lookback, drop, hold, take_profit), fee_cells in by_exit.items():
+        # Nur Exits und Gewinn pro Trade, Datumsangaben und Trade-Dicts entstehen erst für den Sieger
+        entries, exit_idx, days_held, raw_exit = signals.exits(
+            drop_threshold_pct=drop,
+            lookback_days=lookback,
+            hold_days=hold,
+            take_profit_pct=take_profit,
+        )
+        entry_price = data.open[entries]
+        exit_days = day_numbers[exit_idx]
+        for cell_idx, fee in fee_cells:
+            profit_pct = net_returns(entry_price, raw_exit, fee)
+            stats = TradeStats.from_trades(profit_pct, days_held, exit_days, len(data), initial_capital)
+            results.append((cell_idx, stats))
+    return results
+
+
+def _evaluate_batch(storage_path, units, initial_capital, release_tickers=False):
+    """
+    Wertet mehrere Arbeitseinheiten aus. Mit release_tickers entfernt der Worker die Ticker danach
+    wieder aus seinem PriceStore (außer den vom Initializer vorab geladenen).
+    """
+    results = []
+    for ticker_pos, ticker, cells in units:
+        for cell_idx, stats in evaluate_group(storage_path, ticker, cells, initial_capital):
+            results.append((cell_idx, ticker_pos, stats))
+    if release_tickers:
+        store = get_price_store(storage_path)
+        for ticker in {ticker for _, ticker, _ in units} - _preloaded:
+            store.invalidate(ticker)
+    return results
+
+
+class GridExecutor:
+    """
+    Verteilt die Grid Search auf einen Prozess-Pool. Eine Arbeitseinheit ist eine Gruppe
+    (Ticker, Lookback, Drop) mit allen zugehörigen (Hold, TP)-Zellen.
+    Der Pool bleibt zwischen Aufrufen bestehen, jeder Worker parst einen Ticker nur einmal.
+    Mit max_workers=1 wird ohne Pool direkt im aktuellen Prozess gerechnet.
+    """
+
+    def __init__(self, storage_path="data_cache", max_workers=None, preload_tickers=()):
+        self.storage_path = storage_path
+        self.max_workers = max_workers or default_max_workers()
+        self.preload_tickers = tuple(preload_tickers)
+        self._pool = None
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=_init_worker,
+                initargs=(self.storage_path, self.preload_tickers),
+            )
+        return self._pool
+
+    def evaluate(self, cells, tickers, initial_capital, cache=None):
+        """
+        Wertet alle Zellen (Parameter-Dicts) über alle Ticker aus.
+        Liefert (cell_idx, metrics) als Generator, sobald alle Ticker einer Zelle fertig sind
+        (Kennzahlen siehe performance.portfolio_metrics).
+        Mit cache (ResultCache) werden nur die (Ticker, Zelle)-Paare berechnet, die noch nicht gespeichert sind.
+        """
+        tickers = list(tickers)
+        parts = [[None] * len(tickers) for _ in cells]
+        remaining = [len(tickers)] * len(cells)
+
+        def finish(cell_idx):
+            # Summe in Ticker-Reihenfolge, unabhängig von der Ankunftsreihenfolge
+            return cell_idx, portfolio_metrics(parts[cell_idx], initial_capital)
+
+        if not tickers:
+            for cell_idx in range(len(cells)):
+                yield finish(cell_idx)
+            return
+
+        results = self.evaluate_parts(cells, tickers, initial_capital, cache=cache)
+        try:
+            for cell_idx, ticker_pos, stats in results:
+                parts[cell_idx][ticker_pos] = stats
+                remaining[cell_idx] -= 1
+                if remaining[cell_idx] == 0:
+                    yield finish(cell_idx)
+        finally:
+            results.close()
+
+    def evaluate_parts(self, cells, tickers, initial_capital, cache=None, release_tickers=False):
+        """
+        Wie evaluate, liefert aber die TradeStats jedes (Zelle, Ticker)-Paars einzeln als
+        (cell_idx, ticker_pos, stats), ohne die Paare zu sammeln: zuerst die Treffer aus dem cache,
+        danach die berechneten Paare in Ankunftsreihenfolge.
+        release_tickers: Die Pool-Worker geben die Kursdaten nach jedem Batch wieder frei (für Scans über
+        große Universen, deren Speicherbudget sonst nur im aktuellen Prozess gälte).
+        """
+        tickers = list(tickers)
+        keys = [cell_key(params) for params in cells]
+        data_hashes = [None] * len(tickers)
+        cached = set()
+
+        if cache is not None:
+            store = get_price_store(self.storage_path)
+            for ticker_pos, ticker in enumerate(tickers):
+                data = store.get(ticker)
+                if data is None:
+                    continue
+                data_hashes[ticker_pos] = data.content_hash
+                found = cache.get_many(ticker, data.content_hash, initial_capital, set(keys))
+                CELLS_EVALUATED.inc(len(found), source="cache")
+                for cell_idx, key in enumerate(keys):
+                    stats = found.get(key)
+                    if stats is not None:
+                        cached.add((cell_idx, ticker_pos))
+                        yield cell_idx, ticker_pos, stats
+
+        # Fehlende Paare nach (Lookback, Drop) gruppieren
+        groups = {}
+        for cell_idx, params in enumerate(cells):
+            for ticker_pos in range(len(tickers)):
+                if (cell_idx, ticker_pos) not in cached:
+                    group = groups.setdefault((params['lookback'], params['drop']), {})
+                    group.setdefault(ticker_pos, []).append((cell_idx, params))
+        # Gruppenweise sortiert, damit Zellen laufend fertig werden (Fortschritt, Abbruch)
+        units = [
+            (ticker_pos, tickers[ticker_pos], group_cells)
+            for group in groups.values()
+            for ticker_pos, group_cells in group.items()
+        ]
+        if not units:
+            return
+
+        def collect(result_batch):
+            CELLS_EVALUATED.inc(len(result_batch), source="computed")
+            TRADES_GENERATED.inc(sum(r[2].count for r in result_batch), source="grid")
+            new_results = {}
+            for cell_idx, ticker_pos, stats in result_batch:
+                if cache is not None and data_hashes[ticker_pos] is not None:
+                    new_results.setdefault(ticker_pos, []).append((keys[cell_idx], stats))
+            for ticker_pos, items in new_results.items():
+                cache.put_many(tickers[ticker_pos], data_hashes[ticker_pos], initial_capital, items)
+            yield from result_batch
+
+        if self.max_workers <= 1:
+            for unit in units:
+                yield from collect(_evaluate_batch(self.storage_path, [unit], initial_capital))
+            return
+
+        # Einheiten bündeln, damit der IPC-Overhead nicht die Backtests überwiegt
+        batch_size = max(1, math.ceil(len(units) / (self.max_workers * 4)))
+        pool = self._get_pool()
+        futures = [
+            pool.submit(_evaluate_batch, self.storage_path, units[i:i + batch_size], initial_capital, release_tickers)
+            for i in range(0, len(units), batch_size)
+        ]
+        try:
+            for future in as_completed(futures):
+                yield from collect(future.result())
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
@@ -0,0 +1,173 @@
+# jobs.py
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+FINISHED_STATES = (JOB_DONE, JOB_FAILED, JOB_CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Wird im Job ausgelöst, sobald ein Abbruch angefordert wurde."""
+
+
+class JobQueueFull(Exception):
+    """Es laufen bzw. warten bereits zu viele Jobs."""
+
+
+class Job:
+    """
+    Ein Optimierungs-Job mit Fortschritt (Zellen fertig, bestes ROI bisher, ETA).
+    Fortschritt wird vom Worker-Thread gemeldet und von den Endpunkten gelesen.
+    """
+
+    def __init__(self, total=0):
+        self.id = uuid.uuid4().hex
+        self.status = JOB_QUEUED
+        self.total = total
+        self.done = 0
+        self.best_roi = None
+        self.result = None
+        self.error = None
+        # HTTP-Status des Fehlers (z.B. 404 für "Keine profitablen Trades"), None bei unerwarteten Fehlern
+        self.status_code = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.version = 0
+        self._cancel_event = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATES
+
+    def cancel(self):
+        self._cancel_event.set()
+        with self._lock:
+            if self.status == JOB_QUEUED:
+                self._finish(JOB_CANCELLED)
+
+    def report(self, done=None, total=None, best_roi=None):
+        """
+        Meldet Fortschritt aus dem Worker. Löst JobCancelled aus, wenn abgebrochen wurde.
+        """
+        if self.cancelled:
+            raise JobCancelled()
+        with self._lock:
+            if done is not None:
+                self.done = done
+            if total is not None:
+                self.total = total
+            if best_roi is not None:
+                self.best_roi = best_roi
+            self.version += 1
+
+    def eta_seconds(self):
+        if self.status != JOB_RUNNING or not self.done or not self.total:
+            return None
+        elapsed = time.time() - self.started_at
+        return elapsed / self.done * (self.total - self.done)
+
+    def snapshot(self):
+        eta = self.eta_seconds()
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "cells_done": self.done,
+            "cells_total": self.total,
+            "best_roi": round(self.best_roi, 2) if self.best_roi is not None else None,
+            "eta_seconds": round(eta, 1) if eta is not None else None,
+            "error": self.error,
+        }
+
+    def _start(self):
+        with self._lock:
+            if self.status != JOB_QUEUED:
+                return False
+            self.status = JOB_RUNNING
+            self.started_at = time.time()
+            self.version += 1
+            return True
+
+    def _finish(self, status, result=None, error=None, status_code=None):
+        self.status = status
+        self.result = result
+        self.error = error
+        self.status_code = status_code
+        self.finished_at = time.time()
+        self.version += 1
+
+
+class JobManager:
+    """
+    Führt Jobs in einem begrenzten Thread-Pool aus.
+    max_workers Jobs laufen gleichzeitig, höchstens max_pending warten bzw. laufen insgesamt.
+    Abgeschlossene Jobs werden bis max_history aufbewahrt (älteste zuerst entfernt).
+    """
+
+    def __init__(self, max_workers=2, max_pending=16, max_history=100):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.max_history = max_history
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, total=0):
+        """
+        Startet fn(*args, job=job) im Hintergrund und gibt den Job sofort zurück.
+        """
+        with self._lock:
+            active = sum(1 for job in self._jobs.values() if not job.finished)
+            if active >= self.max_pending:
+                raise JobQueueFull()
+            job = Job(total=total)
+            self._jobs[job.id] = job
+            self._prune()
+
+        self._executor.submit(self._run, job, fn, args)
+        return job
+
+    def _run(self, job, fn, args):
+        if not job._start():
+            return
+        try:
+            result = fn(*args, job=job)
+        except JobCancelled:
+            job._finish(JOB_CANCELLED)
+        except Exception as e:
+            job._finish(JOB_FAILED, error=getattr(e, "detail", None) or str(e), status_code=getattr(e, "status_code", None))
+        else:
+            job._finish(JOB_CANCELLED if job.cancelled else JOB_DONE, result=result)
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        while len(self._jobs) > self.max_history and finished:
+            del self._jobs[finished.pop(0)]
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self._jobs.get(job_id)
+        if job is not None:
+            job.cancel()
+        return job
+
+    def shutdown(self):
+        for job in list(self._jobs.values()):
+            job.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
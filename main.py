@@ -1,21 +1,99 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List
-import pandas as pd
+from fastapi.responses import FileResponse, StreamingResponse, Response, PlainTextResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from pydantic import BaseModel, Field
+from typing import Annotated, List, Optional, Literal
+from contextlib import asynccontextmanager
+from datetime import date
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
 import numpy as np
 
 from strategy import MeanReversionStrategy
 from data_manager import DataManager
+from data_service import AsyncDataService, configured_universe
+from grid_executor import GridExecutor
+from result_cache import cell_key, get_result_cache
+from result_cube import AGGREGATES, ResultCube
+from robustness import DEFAULT_CONFIDENCE, DEFAULT_SHUFFLES, bootstrap_trades, merged_profits
+from jobs import JobManager, JobQueueFull, JOB_DONE, JOB_FAILED
+from performance import RANK_METRICS
+from search import SEARCH_STRATEGIES, SearchSpace, planned_evaluations, run_search
+from scanner import SignalScanner
+from universe_scan import DEFAULT_TOP_K, cached_tickers, run_universe_scan, scan_path, spill_trades
+from walk_forward import TRAIN_MONTHS, TEST_MONTHS, run_walk_forward
+from metrics import REGISTRY, CONTENT_TYPE, HTTP_REQUEST_SECONDS, HTTP_REQUESTS, collect_spans, span, timed
 
-app = FastAPI()
+# Log-Level über LOG_LEVEL (z.B. WARNING, um Fortschrittsmeldungen abzuschalten)
+logging.basicConfig(
+    level=os.environ.get("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+# Ticker-Universum, das beim Start vorgewärmt wird (PREWARM_TICKERS)
+PREWARM_TICKERS = configured_universe()
+
+# Asynchroner Datenzugriff: Laden außerhalb des Event-Loops, eine Ladung pro Ticker gleichzeitig
+data_service = AsyncDataService()
+
+# Prozess-Pool für die Grid Search (Anzahl Worker über GRID_MAX_WORKERS konfigurierbar)
+grid_executor = GridExecutor(preload_tickers=PREWARM_TICKERS)
+
+# Begrenzte Anzahl gleichzeitiger Optimierungs-Jobs
+job_manager = JobManager(max_workers=2, max_pending=16)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Vorwärmen im Hintergrund, damit der Server sofort Anfragen annimmt (die warten ggf. auf dieselbe Ladung)
+    prewarm = asyncio.create_task(data_service.prewarm(PREWARM_TICKERS))
+    yield
+    prewarm.cancel()
+    job_manager.shutdown()
+    grid_executor.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        "X-Chart-Rows", "X-Chart-Columns", "X-Chart-Dtype",
+        "X-Cube-Dims", "X-Cube-Shape", "X-Cube-Axes", "X-Cube-Dtype", "Server-Timing",
+    ],
 )
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+
+@app.middleware("http")
+async def collect_request_metrics(request: Request, call_next):
+    """
+    Sammelt die Spans eines Requests, hängt sie als Server-Timing-Header an und zählt Dauer/Status pro Route.
+    """
+    start = time.perf_counter()
+    with collect_spans() as summary:
+        response = await call_next(request)
+    elapsed = time.perf_counter() - start
+
+    # Routen-Template statt Pfad, damit z.B. /jobs/{job_id} nur eine Zeitreihe ergibt
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    HTTP_REQUEST_SECONDS.observe(elapsed, method=request.method, route=route)
+    HTTP_REQUESTS.inc(method=request.method, route=route, status=response.status_code)
+
+    timing = summary.server_timing()
+    if timing:
+        response.headers["Server-Timing"] = timing
+    logger.debug("%s %s %d %.1fms %s", request.method, route, response.status_code, elapsed * 1000, summary)
+    return response
 
 
 class OptimizationRequest(BaseModel):
@@ -23,7 +101,50 @@ class OptimizationRequest(BaseModel):
     drop_options: List[float]
     hold_options: List[int]
     take_profit_options: List[float]
+    # Lookback (Tage für den Drop) und Gebühr pro Order als weitere Dimensionen, Standard wie bisher fest
+    lookback_options: List[Annotated[int, Field(ge=1)]] = [3]
+    fee_options: List[Annotated[float, Field(ge=0, lt=1)]] = [0.001]
+    initial_capital: float = 10000.0
+    # Optionales Downsampling der Equity-Kurve (z.B. "weekly" oder max. 1000 Punkte)
+    curve_resolution: Optional[Literal["daily", "weekly", "monthly"]] = None
+    curve_points: Optional[int] = Field(default=None, gt=1)
+    # Kennzahl, nach der die Sieger-Kombination gewählt wird (max_drawdown und exposure: kleiner ist besser)
+    rank_by: Literal[RANK_METRICS] = "roi"
+    # Suchstrategie: "grid" (alle Kombinationen), "random", "halving" oder "coarse_to_fine"
+    search: Literal[SEARCH_STRATEGIES] = "grid"
+    # Budget der Suche in Zellen auf allen Tickern (Standard 64), seed macht die Suche reproduzierbar
+    search_budget: Optional[int] = Field(default=None, gt=0)
+    seed: int = 0
+    # Robustheit: Bootstrap (robustness_resamples, 0 = aus) und Shuffle (robustness_shuffles, 0 = aus) der Trades
+    # für die besten robustness_top_n Zellen, Intervalle zum Konfidenzniveau robustness_confidence
+    robustness_resamples: int = Field(default=0, ge=0, le=100_000)
+    robustness_shuffles: int = Field(default=DEFAULT_SHUFFLES, ge=0, le=100_000)
+    robustness_top_n: int = Field(default=1, ge=1, le=20)
+    robustness_confidence: float = Field(default=DEFAULT_CONFIDENCE, gt=0, lt=1)
+
+
+class WalkForwardRequest(OptimizationRequest):
+    # Training auf train_months, danach Test auf den folgenden test_months (z.B. 1 = monatlich rollierend).
+    # Pro Fenster wird das komplette Grid bewertet, search/search_budget/seed werden ignoriert.
+    train_months: int = Field(default=TRAIN_MONTHS, ge=1)
+    test_months: int = Field(default=TEST_MONTHS, ge=1)
+
+
+class ScanRequest(BaseModel):
+    # Ohne tickers werden alle Ticker im Daten-Cache gescannt
+    tickers: Optional[List[str]] = None
+    drop_options: List[float]
+    hold_options: List[int]
+    take_profit_options: List[float]
+    lookback_options: List[Annotated[int, Field(ge=1)]] = [3]
+    fee_options: List[Annotated[float, Field(ge=0, lt=1)]] = [0.001]
     initial_capital: float = 10000.0
+    rank_by: Literal[RANK_METRICS] = "roi"
+    top_k: int = Field(default=DEFAULT_TOP_K, ge=1, le=100)
+    # Budget für gleichzeitig geladene Kursdaten in MB (Standard: SCAN_MEMORY_MB)
+    memory_budget_mb: Optional[int] = Field(default=None, ge=1)
+    # Trades der top_k Parameter-Sets als CSV auslagern (abrufbar unter /scan/{scan_id}/trades)
+    include_trades: bool = False
 
 
 class TradeResult(BaseModel):
@@ -36,181 +157,924 @@ class TradeResult(BaseModel):
     exit_reason: str
 
 
+class ConfidenceInterval(BaseModel):
+    low: float
+    median: float
+    high: float
+
+
+class RobustnessResult(BaseModel):
+    rank: int
+    drop: float
+    hold: int
+    take_profit: float
+    lookback: int
+    fee: float
+    trades: int
+    resamples: int
+    shuffles: int
+    confidence: float
+    roi_pct: ConfidenceInterval
+    win_rate: ConfidenceInterval
+    max_drawdown_pct: ConfidenceInterval
+    shuffled_max_drawdown_pct: Optional[ConfidenceInterval] = None  # nur die Reihenfolge der Trades vertauscht
+    prob_loss: float  # Anteil der Bootstrap-Stichproben mit negativem ROI
+
+
 class BestStrategyResponse(BaseModel):
     best_drop: float
     best_hold: int
     best_tp: float
+    best_lookback: int = 3
+    best_fee: float = 0.001
     total_profit: float
     roi_pct: float
     win_rate: float
     total_trades: int
+    rank_by: str = "roi"
+    profit_factor: Optional[float] = None
+    max_drawdown_pct: float = 0.0
+    exposure_pct: float = 0.0
+    sharpe_ratio: float = 0.0
+    search: str = "grid"
+    cells_evaluated: int = 0
+    cells_total: int = 0
     equity_curve_data: List[dict]  # Jetzt mit "buy_and_hold" Key
     trades: List[TradeResult]
+    # Kennzahlen aller bewerteten Zellen, abrufbar unter /optimize/cube/{cube_id}
+    cube_id: Optional[str] = None
+    robustness: List[RobustnessResult] = []
+
+
+class WalkForwardWindow(BaseModel):
+    train_start: str
+    test_start: str
+    test_end: str
+    best_drop: float
+    best_hold: int
+    best_tp: float
+    best_lookback: int
+    best_fee: float
+    train_roi_pct: float
+    test_profit: float
+    test_roi_pct: float
+    test_trades: int
+
+
+class WalkForwardResponse(BaseModel):
+    windows: List[WalkForwardWindow]
+    total_profit: float
+    roi_pct: float
+    win_rate: float
+    total_trades: int
+    profit_factor: Optional[float] = None
+    max_drawdown_pct: float
+    exposure_pct: float
+    sharpe_ratio: float
+    equity_curve_data: List[dict]  # Realisierte Out-of-Sample-Equity pro Exit-Tag
+
+
+class ScanCell(BaseModel):
+    rank: int
+    drop: float
+    hold: int
+    take_profit: float
+    lookback: int
+    fee: float
+    total_profit: float
+    roi_pct: float
+    win_rate: float
+    total_trades: int
+    profit_factor: Optional[float] = None
+    max_drawdown_pct: float
+    exposure_pct: float
+    sharpe_ratio: float
+
+
+class ScanResponse(BaseModel):
+    results: List[ScanCell]
+    rank_by: str
+    cells_total: int
+    tickers_scanned: int
+    tickers_missing: List[str]
+    chunks: int
+    scan_id: Optional[str] = None
+    trades_written: Optional[int] = None
+
+
+class SignalPosition(BaseModel):
+    buy_date: str
+    entry_price: float
+    target_price: float
+    days_held: int
+    days_to_time_stop: int
+    unrealized_pct: float
+
+
+class TickerSignal(BaseModel):
+    ticker: str
+    date: Optional[str] = None
+    close: Optional[float] = None
+    change_pct: Optional[float] = None
+    signal: bool = False  # Kauf zum nächsten Open
+    position: Optional[SignalPosition] = None
+    events: List[dict] = []  # entry/exit/signal des letzten Bars
+    error: Optional[str] = None
+
+
+class SignalsResponse(BaseModel):
+    drop: float
+    lookback: int
+    hold: int
+    take_profit: float
+    fee: float
+    signals: List[TickerSignal]
 
 
-def calculate_comparison_curves(trades, tickers, initial_capital, data_dict):
+# Auflösungen für das Downsampling der Kurven (Pandas-Periodenkürzel)
+CURVE_RESOLUTIONS = {"daily": None, "weekly": "W", "monthly": "M"}
+
+
+def downsample_positions(dates, resolution=None, max_points=None):
+    """
+    Positionen der Zeilen, die nach dem Downsampling übrig bleiben.
+    resolution: "daily", "weekly" oder "monthly" (letzter Handelstag je Periode).
+    max_points: gleichmäßig ausdünnen, bis höchstens so viele Punkte übrig sind (letzter Punkt bleibt).
+    """
+    positions = np.arange(len(dates))
+    freq = CURVE_RESOLUTIONS.get(resolution or "daily")
+    if freq is not None and len(dates):
+        import pandas as pd
+        periods = pd.DatetimeIndex(dates).to_period(freq).asi8
+        positions = positions[np.append(periods[1:] != periods[:-1], True)]
+
+    if max_points and len(positions) > max_points:
+        step = int(np.ceil(len(positions) / max_points))
+        thinned = positions[::step]
+        if thinned[-1] != positions[-1]:
+            thinned = np.append(thinned[:max_points - 1], positions[-1])
+        positions = thinned
+    return positions
+
+
+@timed("comparison_curves")
+def calculate_comparison_curves(trades, tickers, initial_capital, data_dict, resolution=None, max_points=None):
     """
     Berechnet tagesgenau die Strategie-Equity vs. Buy & Hold Benchmark.
+    Alle Ticker werden in einem Schritt auf den gemeinsamen Zeitstrahl ausgerichtet,
+    beide Kurven werden als Arrays berechnet. Optional wird vor der Ausgabe ausgedünnt.
     """
-    # 1. Wir brauchen einen gemeinsamen Zeitstrahl (Index) über alle Jahre
-    all_dates = pd.DatetimeIndex([])
-    for t in tickers:
-        if t in data_dict and not data_dict[t].empty:
-            all_dates = all_dates.union(data_dict[t].index)
+    import pandas as pd
 
-    if len(all_dates) == 0:
+    # 1. Gemeinsamer Zeitstrahl: alle Schlusskurse in einem Schritt auf die Vereinigung der Indizes
+    closes = {
+        t: data_dict[t]['Close']
+        for t in dict.fromkeys(tickers)
+        if t in data_dict and not data_dict[t].empty
+    }
+    if not closes:
         return []
 
-    all_dates = all_dates.sort_values().unique()
+    prices = pd.concat(closes, axis=1, join='outer').sort_index()
+    all_dates = prices.index
+    n = len(all_dates)
 
-    df_curve = pd.DataFrame(index=all_dates)
+    # 2. Strategie: realisierte Gewinne am Verkaufstag aufsummieren
+    daily_profits = np.zeros(n)
+    if trades:
+        sell_dates = np.array([t['sell_date'] for t in trades], dtype='datetime64[ns]')
+        profits = np.array([t['profit_abs'] for t in trades], dtype=np.float64)
+        # Verkaufstage außerhalb des Zeitstrahls zählen ab dem nächsten Handelstag
+        positions = all_dates.searchsorted(sell_dates)
+        valid = positions < n
+        daily_profits = np.bincount(positions[valid], weights=profits[valid], minlength=n)
 
-    df_curve['strategy_equity'] = 0.0  # Wird später gefüllt
-    daily_profits = pd.Series(0.0, index=all_dates)
+    strategy_equity = initial_capital + np.cumsum(daily_profits)
 
-    if trades:
-        trades_df = pd.DataFrame(trades)
-        trades_df['sell_date'] = pd.to_datetime(trades_df['sell_date'])
+    # 3. Buy & Hold: gleiches Startkapital pro (eindeutigem) Ticker, der Anteil von Tickern ohne Daten bleibt Cash
+    unique_tickers = len(dict.fromkeys(tickers))
+    allocation_per_ticker = initial_capital / unique_tickers
+    price_matrix = prices.ffill().bfill().to_numpy(dtype=np.float64)
+    start_prices = price_matrix[0]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        relative = np.where(start_prices > 0, price_matrix / start_prices, 1.0)
+    cash = (unique_tickers - price_matrix.shape[1]) * allocation_per_ticker
+    benchmark_equity = relative.sum(axis=1) * allocation_per_ticker + cash
 
-        grouped_profits = trades_df.groupby('sell_date')['profit_abs'].sum()
+    curve = pd.DataFrame(
+        {'strategy_equity': strategy_equity, 'benchmark_equity': benchmark_equity}, index=all_dates
+    ).ffill().fillna(initial_capital)
 
-        daily_profits = daily_profits.add(grouped_profits, fill_value=0)
+    keep = downsample_positions(all_dates, resolution, max_points)
+    dates = np.datetime_as_string(all_dates.values[keep], unit='D').tolist()
+    equity = np.round(curve['strategy_equity'].to_numpy()[keep], 2).tolist()
+    buy_and_hold = np.round(curve['benchmark_equity'].to_numpy()[keep], 2).tolist()
 
+    return [
+        {"date": d, "equity": e, "buy_and_hold": b}
+        for d, e, b in zip(dates, equity, buy_and_hold)
+    ]
 
-    df_curve['strategy_equity'] = initial_capital + daily_profits.cumsum()
 
-    df_curve['strategy_equity'] = df_curve['strategy_equity'].ffill()
+# --- ENDPUNKTE ---
 
-    #BUY & HOLD BENCHMARK
-    allocation_per_ticker = initial_capital / len(tickers)
-    df_curve['benchmark_equity'] = 0.0
+class BatchOptimizationRequest(BaseModel):
+    requests: List[OptimizationRequest] = Field(min_length=1)
 
-    for t in tickers:
-        if t in data_dict and not data_dict[t].empty:
 
-            df_asset = data_dict[t]
+class BatchOptimizationItem(BaseModel):
+    # Genau eins von beiden ist gesetzt: Ergebnis oder Fehlermeldung (z.B. keine Trades gefunden)
+    result: Optional[BestStrategyResponse] = None
+    error: Optional[str] = None
 
-            if isinstance(df_asset.columns, pd.MultiIndex):
-                prices = df_asset['Close'].iloc[:, 0]
-            else:
-                prices = df_asset['Close']
 
-            prices = prices.reindex(all_dates).ffill().bfill()
+class BatchOptimizationResponse(BaseModel):
+    results: List[BatchOptimizationItem]
+    unique_backtests: int
 
-            start_price = prices.iloc[0]
-            if start_price > 0:
-                val_series = (prices / start_price) * allocation_per_ticker
-                df_curve['benchmark_equity'] += val_series
-            else:
-                df_curve['benchmark_equity'] += allocation_per_ticker
+class JobStatusResponse(BaseModel):
+    job_id: str
+    status: str
+    cells_done: int
+    cells_total: int
+    best_roi: Optional[float] = None
+    eta_seconds: Optional[float] = None
+    error: Optional[str] = None
 
 
-    chart_data = []
+def build_search_space(request):
+    return SearchSpace({
+        "lookback": request.lookback_options,
+        "drop": request.drop_options,
+        "hold": request.hold_options,
+        "take_profit": request.take_profit_options,
+        "fee": request.fee_options,
+    })
 
-    df_curve = df_curve.fillna(method='ffill').fillna(initial_capital)
 
-    for date, row in df_curve.iterrows():
-        chart_data.append({
-            "date": date.strftime('%Y-%m-%d'),
-            "equity": round(row['strategy_equity'], 2),
-            "buy_and_hold": round(row['benchmark_equity'], 2)
-        })
+def planned_cells(request):
+    space = build_search_space(request)
+    return planned_evaluations(request.search, space.size, len(request.tickers), request.search_budget)
 
-    return chart_data
 
+class SharedBacktests:
+    """
+    Trades pro (Ticker, Startkapital, Parameter) über mehrere Optimierungen hinweg.
+    run_portfolio hängt nur die Trades der einzelnen Ticker aneinander, daher läuft jeder
+    Backtest einmal und jedes Portfolio wird aus den gemeinsamen Trade-Listen zusammengesetzt.
+    """
 
-# --- ENDPUNKTE ---
+    def __init__(self):
+        self._trades = {}
 
-@app.post("/optimize", response_model=BestStrategyResponse)
-def get_best_strategy(request: OptimizationRequest):
-    print(f"Starte Optimierung für {len(request.tickers)} Ticker...")
+    def __len__(self):
+        return len(self._trades)
+
+    def run_portfolio(self, bot, tickers, params):
+        all_trades = []
+        for ticker in tickers:
+            key = (ticker, bot.initial_capital) + cell_key(params)
+            if key not in self._trades:
+                self._trades[key] = bot.run_portfolio([ticker], params)
+            all_trades.extend(self._trades[key])
+        return all_trades
+
+
+# Würfel der letzten Optimierungen (für Heatmaps), älteste werden verdrängt
+MAX_RESULT_CUBES = 32
+result_cubes = {}
+
+
+def remember_cube(cube):
+    cube_id = uuid.uuid4().hex
+    result_cubes[cube_id] = cube
+    while len(result_cubes) > MAX_RESULT_CUBES:
+        result_cubes.pop(next(iter(result_cubes)), None)
+    return cube_id
+
+
+def _rounded_interval(interval):
+    return {key: round(value, 2) for key, value in interval.items()} if interval is not None else None
+
+
+@timed("robustness")
+def run_robustness(request, space, search, cache=None):
+    """
+    Bootstrap/Shuffle für die besten Zellen der Suche. Die Trades kommen als TradeStats pro Ticker
+    (aus dem Ergebnis-Cache oder neu berechnet), ohne Trade-Dicts zu erzeugen.
+    """
+    indices = search.top(request.rank_by, request.robustness_top_n)
+    cells = space.cells(indices)
+    parts = [[None] * len(request.tickers) for _ in cells]
+    for cell_idx, ticker_pos, stats in grid_executor.evaluate_parts(
+        cells, request.tickers, request.initial_capital, cache=cache
+    ):
+        parts[cell_idx][ticker_pos] = stats
+
+    results = []
+    for rank, (params, cell_parts) in enumerate(zip(cells, parts), start=1):
+        result = bootstrap_trades(
+            merged_profits([p for p in cell_parts if p is not None]), request.initial_capital,
+            resamples=request.robustness_resamples, shuffles=request.robustness_shuffles,
+            confidence=request.robustness_confidence, seed=request.seed,
+        )
+        if result is None:
+            continue
+        results.append({
+            "rank": rank,
+            "drop": params['drop'],
+            "hold": params['hold'],
+            "take_profit": params['take_profit'],
+            "lookback": params['lookback'],
+            "fee": params['fee'],
+            "trades": result["trades"],
+            "resamples": result["resamples"],
+            "shuffles": result["shuffles"],
+            "confidence": result["confidence"],
+            "roi_pct": _rounded_interval(result["roi"]),
+            "win_rate": _rounded_interval(result["win_rate"]),
+            "max_drawdown_pct": _rounded_interval(result["max_drawdown"]),
+            "shuffled_max_drawdown_pct": _rounded_interval(result["shuffled_max_drawdown"]),
+            "prob_loss": round(result["prob_loss"], 4),
+        })
+    return results
+
+
+def run_optimization_request(request, job=None, data_dict=None, backtests=None):
+    """
+    Führt die komplette Optimierung aus. Mit job wird Fortschritt gemeldet und Abbruch geprüft.
+    data_dict (bereits geladene Kursdaten) und backtests (SharedBacktests) teilen sich mehrere Anfragen eines Batches.
+    """
+    logger.info("Starte Optimierung für %d Ticker...", len(request.tickers))
 
     dm = DataManager()
-    data_dict = dm.get_historical_data(request.tickers, "2000-01-01", "2025-01-01", reload=False)
+    if data_dict is None:
+        data_dict = dm.get_historical_data(request.tickers, "2000-01-01", "2025-01-01", reload=False)
 
     bot = MeanReversionStrategy(initial_capital=request.initial_capital)
 
-    best_roi = -999999.0
-    best_result = None
-    best_trades = []
-    best_params = {}
-
-    combinations = len(request.drop_options) * len(request.hold_options) * len(request.take_profit_options)
-    print(f"Prüfe {combinations} Kombinationen...")
-
-    for drop in request.drop_options:
-        for hold in request.hold_options:
-            for tp in request.take_profit_options:
-                current_params = {
-                    "drop": drop, "lookback": 3, "hold": hold, "take_profit": tp, "fee": 0.001
-                }
-                trades = bot.run_portfolio(request.tickers, current_params)
-
-                if trades:
-                    df = pd.DataFrame(trades)
-                    profit = df['profit_abs'].sum()
-                    roi = (profit / request.initial_capital) * 100
-                    win_rate = len(df[df['profit_abs'] > 0]) / len(df) * 100
-                else:
-                    profit = 0;
-                    roi = 0;
-                    win_rate = 0
-
-                if roi > best_roi:
-                    best_roi = roi
-                    best_trades = trades
-                    best_params = {"drop": drop, "hold": hold, "tp": tp}
-                    best_result = {"profit": profit, "win_rate": win_rate, "count": len(trades)}
-
-    if not best_params:
+    space = build_search_space(request)
+    total = planned_cells(request)
+    logger.info("Prüfe %d von %d Kombinationen (Suche: %s)...", total, space.size, request.search)
+    if job is not None:
+        job.report(done=0, total=total)
+
+    # Bereits berechnete (Ticker, Zelle)-Paare kommen aus dem Ergebnis-Cache
+    cache = get_result_cache(dm.storage_path)
+    progress = {"done": 0, "best_roi": None}
+
+    def evaluate(cells, tickers):
+        metrics = [None] * len(cells)
+        results = grid_executor.evaluate(cells, tickers, request.initial_capital, cache=cache)
+        try:
+            for cell_idx, cell_metrics in results:
+                metrics[cell_idx] = cell_metrics
+                progress["done"] += 1
+                # Bestes ROI nur aus Zellen, die auf allen Tickern bewertet wurden
+                if len(tickers) == len(request.tickers) and (
+                    progress["best_roi"] is None or cell_metrics['roi'] > progress["best_roi"]
+                ):
+                    progress["best_roi"] = cell_metrics['roi']
+                if job is not None:
+                    job.report(done=min(progress["done"], total), best_roi=progress["best_roi"])
+        finally:
+            # Bei Abbruch die restlichen Arbeitseinheiten im Pool verwerfen
+            results.close()
+        return metrics
+
+    with span("grid_evaluation"):
+        search = run_search(
+            request.search, space, evaluate, request.tickers,
+            budget=request.search_budget, seed=request.seed, rank_by=request.rank_by,
+        )
+
+    # Bei gleichem Wert gewinnt die zuerst aufgezählte Kombination (wie bei der Dreifach-Schleife)
+    best_idx = search.best(request.rank_by)
+    if best_idx is None:
         raise HTTPException(status_code=404, detail="Keine profitablen Trades gefunden.")
+    best_params = space.cell(best_idx)
+    best_metrics = search.metrics[best_idx]
+    cube_id = remember_cube(ResultCube.from_search(space, search.metrics))
+    robustness = run_robustness(request, space, search, cache) if request.robustness_resamples else []
+
+    # Nur für die Sieger-Kombination werden die Trades vollständig erzeugt
+    if backtests is None:
+        best_trades = bot.run_portfolio(request.tickers, best_params)
+    else:
+        best_trades = backtests.run_portfolio(bot, request.tickers, best_params)
 
     equity_data = calculate_comparison_curves(
-        best_trades, request.tickers, request.initial_capital, data_dict
+        best_trades, request.tickers, request.initial_capital, data_dict,
+        resolution=request.curve_resolution, max_points=request.curve_points
     )
 
     return {
         "best_drop": best_params['drop'],
         "best_hold": best_params['hold'],
-        "best_tp": best_params['tp'],
-        "total_profit": round(best_result['profit'], 2),
-        "roi_pct": round(best_roi, 2),
-        "win_rate": round(best_result['win_rate'], 2),
-        "total_trades": best_result['count'],
+        "best_tp": best_params['take_profit'],
+        "best_lookback": best_params['lookback'],
+        "best_fee": best_params['fee'],
+        "total_profit": round(best_metrics['profit'], 2),
+        "roi_pct": round(best_metrics['roi'], 2),
+        "win_rate": round(best_metrics['win_rate'], 2),
+        "total_trades": best_metrics['trades'],
+        "rank_by": request.rank_by,
+        "profit_factor": round(best_metrics['profit_factor'], 2) if best_metrics['profit_factor'] is not None else None,
+        "max_drawdown_pct": round(best_metrics['max_drawdown'], 2),
+        "exposure_pct": round(best_metrics['exposure'], 2),
+        "sharpe_ratio": round(best_metrics['sharpe'], 2),
+        "search": request.search,
+        "cells_evaluated": search.cells_evaluated,
+        "cells_total": space.size,
         "equity_curve_data": equity_data,
-        "trades": best_trades
+        "trades": best_trades,
+        "cube_id": cube_id,
+        "robustness": robustness,
+    }
+
+
+@app.post("/optimize", response_model=BestStrategyResponse)
+async def get_best_strategy(request: OptimizationRequest):
+    data_dict = await data_service.get_frames(request.tickers)
+    return await asyncio.to_thread(run_optimization_request, request, data_dict=data_dict)
+
+
+def parse_cube_select(select):
+    """
+    "take_profit:4,fee:0.001" -> {"take_profit": 4.0, "fee": 0.001}
+    """
+    fixed = {}
+    for item in filter(None, (part.strip() for part in select.split(","))):
+        name, _, value = item.partition(":")
+        try:
+            fixed[name.strip()] = float(value)
+        except ValueError:
+            raise ValueError(f"Ungültige Auswahl: {item} (erwartet Achse:Wert).") from None
+    return fixed
+
+
+@app.get("/optimize/cube/{cube_id}")
+async def get_result_cube(
+    cube_id: str,
+    dims: str = "drop,hold",
+    metrics: Optional[str] = None,
+    aggregate: Literal[tuple(AGGREGATES)] = "mean",
+    select: Optional[str] = None,
+    format: Literal["columnar", "binary"] = "columnar",
+):
+    """
+    Kennzahlen aller Zellen einer Optimierung als Würfel, serverseitig reduziert:
+    dims: Achsen der Ausgabe (kommagetrennt, z.B. "drop,hold"; leer = alles zusammenfassen),
+    metrics: Kennzahlen (Standard: alle, siehe CUBE_METRICS), aggregate: Zusammenfassung der übrigen Achsen,
+    select: Achsen auf einen Wert festhalten (z.B. "take_profit:4").
+    format: "columnar" (JSON mit Achsen und flachen Werten) oder "binary" (float32, Beschriftung in den Headern).
+    Nicht bewertete Zellen sind NaN bzw. null.
+    """
+    cube = result_cubes.get(cube_id)
+    if cube is None:
+        raise HTTPException(status_code=404, detail="Würfel nicht gefunden (abgelaufen oder unbekannt).")
+    try:
+        pivot = cube.pivot(
+            [d.strip() for d in dims.split(",") if d.strip()],
+            [m.strip() for m in metrics.split(",") if m.strip()] if metrics else None,
+            aggregate=aggregate,
+            select=parse_cube_select(select) if select else None,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if format == "binary":
+        payload, headers = pivot.to_binary()
+        return Response(content=payload, media_type="application/octet-stream", headers=headers)
+    return dict(pivot.to_columnar(), aggregate=aggregate)
+
+
+def run_batch_optimization(batch, data_dict=None):
+    """
+    Mehrere Optimierungen mit überlappenden Ticker-Körben: Kursdaten werden einmal für alle Ticker geladen,
+    (Ticker, Zelle)-Kennzahlen der Grid Search kommen nach der ersten Berechnung aus dem Ergebnis-Cache,
+    die Sieger-Backtests laufen pro (Ticker, Parameter) nur einmal. Identische Anfragen werden nur einmal gerechnet.
+    """
+    tickers = list(dict.fromkeys(t for request in batch.requests for t in request.tickers))
+    logger.info("Starte Batch mit %d Optimierungen über %d Ticker...", len(batch.requests), len(tickers))
+
+    if data_dict is None:
+        dm = DataManager()
+        data_dict = dm.get_historical_data(tickers, "2000-01-01", "2025-01-01", reload=False)
+    backtests = SharedBacktests()
+
+    items = {}
+    results = []
+    for request in batch.requests:
+        key = request.model_dump_json()
+        if key not in items:
+            try:
+                result = run_optimization_request(request, data_dict=data_dict, backtests=backtests)
+                items[key] = {"result": result, "error": None}
+            except HTTPException as e:
+                items[key] = {"result": None, "error": e.detail}
+        results.append(items[key])
+
+    return {"results": results, "unique_backtests": len(backtests)}
+
+
+@app.post("/optimize/batch", response_model=BatchOptimizationResponse)
+async def get_best_strategies(batch: BatchOptimizationRequest):
+    data_dict = await data_service.get_frames([t for request in batch.requests for t in request.tickers])
+    return await asyncio.to_thread(run_batch_optimization, batch, data_dict)
+
+
+def run_walk_forward_request(request):
+    """
+    Walk-Forward-Optimierung: Signale und Exits laufen einmal über die volle Historie,
+    jedes Fenster schneidet nur seine Trades heraus (siehe walk_forward.py).
+    Die Kursdaten müssen bereits im PriceStore liegen (siehe get_walk_forward).
+    """
+    space = build_search_space(request)
+    logger.info("Walk-Forward über %d Kombinationen (%d/%d Monate)...", space.size, request.train_months, request.test_months)
+    with span("walk_forward"):
+        result = run_walk_forward(
+            space.cells(range(space.size)), request.tickers, request.initial_capital,
+            train_months=request.train_months, test_months=request.test_months, rank_by=request.rank_by,
+        )
+    if not result["windows"]:
+        raise HTTPException(status_code=404, detail="Zu wenig Historie für ein Trainings- und Testfenster.")
+
+    windows = [
+        {
+            "train_start": window["train_start"],
+            "test_start": window["test_start"],
+            "test_end": window["test_end"],
+            "best_drop": window["params"]['drop'],
+            "best_hold": window["params"]['hold'],
+            "best_tp": window["params"]['take_profit'],
+            "best_lookback": window["params"]['lookback'],
+            "best_fee": window["params"]['fee'],
+            "train_roi_pct": round(window["train_roi"], 2),
+            "test_profit": round(window["test"]['profit'], 2),
+            "test_roi_pct": round(window["test"]['roi'], 2),
+            "test_trades": window["test"]['trades'],
+        }
+        for window in result["windows"]
+    ]
+
+    keep = downsample_positions(result["equity_days"], request.curve_resolution, request.curve_points)
+    dates = np.datetime_as_string(result["equity_days"][keep], unit='D').tolist()
+    equity = np.round(result["equity"][keep], 2).tolist()
+
+    metrics = result["metrics"]
+    return {
+        "windows": windows,
+        "total_profit": round(metrics['profit'], 2),
+        "roi_pct": round(metrics['roi'], 2),
+        "win_rate": round(metrics['win_rate'], 2),
+        "total_trades": metrics['trades'],
+        "profit_factor": round(metrics['profit_factor'], 2) if metrics['profit_factor'] is not None else None,
+        "max_drawdown_pct": round(metrics['max_drawdown'], 2),
+        "exposure_pct": round(metrics['exposure'], 2),
+        "sharpe_ratio": round(metrics['sharpe'], 2),
+        "equity_curve_data": [{"date": d, "equity": e} for d, e in zip(dates, equity)],
     }
 
 
+@app.post("/optimize/walk-forward", response_model=WalkForwardResponse)
+async def get_walk_forward(request: WalkForwardRequest):
+    await data_service.get_many(request.tickers)
+    return await asyncio.to_thread(run_walk_forward_request, request)
+
+
+def run_scan_request(request, scan_id=None):
+    """
+    Scan über ein großes Ticker-Universum: blockweise Auswertung mit begrenztem Speicher (siehe universe_scan.py).
+    Fehlende Ticker werden beim Laden heruntergeladen. Mit scan_id werden die Trades der besten Zellen ausgelagert.
+    """
+    tickers = request.tickers if request.tickers is not None else cached_tickers(data_service.storage_path)
+    space = build_search_space(request)
+    cells = space.cells(range(space.size))
+    memory_budget = request.memory_budget_mb * 1024 * 1024 if request.memory_budget_mb else None
+    logger.info("Scan über %d Ticker und %d Kombinationen...", len(tickers), space.size)
+
+    with span("universe_scan"):
+        result = run_universe_scan(
+            cells, tickers, request.initial_capital, rank_by=request.rank_by, top_k=request.top_k,
+            memory_budget=memory_budget, executor=grid_executor, cache=get_result_cache(data_service.storage_path),
+            load=data_service.load_blocking, storage_path=data_service.storage_path,
+        )
+    if not result["top"]:
+        raise HTTPException(status_code=404, detail="Keine Kursdaten für die angefragten Ticker gefunden.")
+
+    results = []
+    for rank, (cell_idx, metrics) in enumerate(result["top"], start=1):
+        params = cells[cell_idx]
+        results.append({
+            "rank": rank,
+            "drop": params['drop'],
+            "hold": params['hold'],
+            "take_profit": params['take_profit'],
+            "lookback": params['lookback'],
+            "fee": params['fee'],
+            "total_profit": round(metrics['profit'], 2),
+            "roi_pct": round(metrics['roi'], 2),
+            "win_rate": round(metrics['win_rate'], 2),
+            "total_trades": metrics['trades'],
+            "profit_factor": round(metrics['profit_factor'], 2) if metrics['profit_factor'] is not None else None,
+            "max_drawdown_pct": round(metrics['max_drawdown'], 2),
+            "exposure_pct": round(metrics['exposure'], 2),
+            "sharpe_ratio": round(metrics['sharpe'], 2),
+        })
+
+    trades_written = None
+    if scan_id is not None:
+        scanned = [t for t in tickers if t not in set(result["tickers_missing"])]
+        with span("spill_trades"):
+            trades_written = spill_trades(
+                scan_path(data_service.storage_path, scan_id), [cells[i] for i, _ in result["top"]],
+                scanned, request.initial_capital, storage_path=data_service.storage_path,
+            )
+
+    return {
+        "results": results,
+        "rank_by": request.rank_by,
+        "cells_total": space.size,
+        "tickers_scanned": result["tickers_scanned"],
+        "tickers_missing": result["tickers_missing"],
+        "chunks": result["chunks"],
+        "scan_id": scan_id,
+        "trades_written": trades_written,
+    }
+
+
+@app.post("/scan", response_model=ScanResponse)
+async def scan_universe(request: ScanRequest):
+    scan_id = uuid.uuid4().hex if request.include_trades else None
+    return await asyncio.to_thread(run_scan_request, request, scan_id)
+
+
+@app.get("/scan/{scan_id}/trades")
+async def get_scan_trades(scan_id: str):
+    """
+    Ausgelagerte Trades eines Scans als CSV (Spalte rank = Platz des Parameter-Sets).
+    """
+    path = scan_path(data_service.storage_path, scan_id)
+    if not scan_id.isalnum() or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Keine Trades für diesen Scan gefunden.")
+    return FileResponse(path, media_type="text/csv", filename=f"scan_{scan_id}.csv")
+
+
+# Scanner pro Parameter-Set, älteste werden verdrängt
+MAX_SIGNAL_SCANNERS = 32
+signal_scanners = {}
+
+
+def get_signal_scanner(drop, lookback, hold, take_profit, fee):
+    key = (drop, lookback, hold, take_profit, fee)
+    scanner = signal_scanners.pop(key, None)
+    if scanner is None:
+        scanner = SignalScanner(drop, lookback, hold, take_profit, fee)
+    signal_scanners[key] = scanner
+    while len(signal_scanners) > MAX_SIGNAL_SCANNERS:
+        signal_scanners.pop(next(iter(signal_scanners)))
+    return scanner
+
+
+def scan_signals(scanner, price_data):
+    """
+    Bringt die Scanner auf den Stand der Kursdaten (nur neue Bars) und gibt den Stand pro Ticker zurück.
+    """
+    results = []
+    with span("signal_scan"):
+        for ticker, data in price_data.items():
+            if data is None or len(data) == 0:
+                results.append({"ticker": ticker, "error": "Keine Daten gefunden."})
+                continue
+            scanner.sync(ticker, data)
+            results.append(scanner.snapshot(ticker))
+    return results
+
+
+@app.get("/signals", response_model=SignalsResponse)
+async def get_signals(
+    tickers: Optional[str] = None,
+    drop: float = Query(5.0, gt=0),
+    lookback: int = Query(3, ge=1),
+    hold: int = Query(20, ge=1),
+    take_profit: float = Query(4.0, gt=0),
+    fee: float = Query(0.001, ge=0, lt=1),
+):
+    """
+    Live-Signale für die Watchlist (kommagetrennt, Standard: vorgewärmtes Universum) nach den Regeln des Backtests:
+    Kaufsignal für den nächsten Open, offene Position und Ereignisse des letzten Bars.
+    Die Historie wird pro Ticker und Parameter-Set nur einmal durchgespielt, danach nur neue Bars (O(1) pro Bar).
+    """
+    watchlist = [t.strip() for t in tickers.split(",") if t.strip()] if tickers else PREWARM_TICKERS
+    price_data = await data_service.get_many(watchlist)
+    scanner = get_signal_scanner(drop, lookback, hold, take_profit, fee)
+    results = await asyncio.to_thread(scan_signals, scanner, price_data)
+    return {
+        "drop": drop, "lookback": lookback, "hold": hold, "take_profit": take_profit, "fee": fee,
+        "signals": results,
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """
+    Laufzeit-Metriken im Prometheus-Textformat (Zeit pro Verarbeitungsschritt, Cache-Treffer,
+    ausgewertete Zellen, erzeugte Trades, Request-Dauer pro Route).
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
+# --- JOB-ENDPUNKTE (asynchrone Optimierung) ---
+
+def _get_job_or_404(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job nicht gefunden.")
+    return job
+
+
+@app.post("/jobs/optimize", response_model=JobStatusResponse, status_code=202)
+def submit_optimization_job(request: OptimizationRequest):
+    try:
+        job = job_manager.submit(run_optimization_request, request, total=planned_cells(request))
+    except JobQueueFull:
+        raise HTTPException(status_code=429, detail="Zu viele laufende Optimierungen. Bitte später erneut versuchen.")
+    return job.snapshot()
+
+
+@app.get("/jobs/{job_id}", response_model=JobStatusResponse)
+def get_job_status(job_id: str):
+    return _get_job_or_404(job_id).snapshot()
+
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """
+    Server-Sent Events: sendet bei jeder Fortschrittsänderung den aktuellen Job-Status.
+    """
+    job = _get_job_or_404(job_id)
+
+    async def event_stream():
+        last_version = -1
+        while True:
+            finished = job.finished
+            if job.version != last_version:
+                last_version = job.version
+                yield f"data: {json.dumps(job.snapshot())}\n\n"
+            if finished:
+                break
+            await asyncio.sleep(0.25)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.delete("/jobs/{job_id}", response_model=JobStatusResponse)
+def cancel_job(job_id: str):
+    job = _get_job_or_404(job_id)
+    job.cancel()
+    return job.snapshot()
+
+
+@app.get("/jobs/{job_id}/result", response_model=BestStrategyResponse)
+def get_job_result(job_id: str):
+    job = _get_job_or_404(job_id)
+    if job.status == JOB_DONE:
+        return job.result
+    if job.status == JOB_FAILED:
+        # Erwartete Fehler (HTTPException im Job) mit ihrem Status wie bei /optimize, sonst 500
+        raise HTTPException(status_code=job.status_code or 500, detail=job.error)
+    raise HTTPException(status_code=409, detail=f"Job ist nicht abgeschlossen (Status: {job.status}).")
+
+
+CHART_COLUMNS = ("date", "open", "high", "low", "close")
+
+
+def _fill_gaps(values):
+    """
+    Entspricht ffill().bfill().fillna(0.0) auf einem einzelnen Array.
+    """
+    import pandas as pd
+    filled = pd.Series(values).ffill().bfill().fillna(0.0)
+    return filled.to_numpy(dtype=np.float64)
+
+
+def resample_ohlc(dates, open_, high, low, close, resolution):
+    """
+    Fasst OHLC-Daten pro Periode zusammen: Open = erster Open, High = Maximum, Low = Minimum,
+    Close = letzter Close. Datum ist der letzte Handelstag der Periode.
+    """
+    freq = CURVE_RESOLUTIONS.get(resolution or "daily")
+    if freq is None or len(dates) == 0:
+        return dates, open_, high, low, close
+
+    import pandas as pd
+    periods = pd.DatetimeIndex(dates).to_period(freq).asi8
+    starts = np.flatnonzero(np.append(True, periods[1:] != periods[:-1]))
+    ends = np.append(starts[1:] - 1, len(dates) - 1)
+    return (
+        dates[ends],
+        open_[starts],
+        np.maximum.reduceat(high, starts),
+        np.minimum.reduceat(low, starts),
+        close[ends],
+    )
+
+
+def build_chart_columns(data, start=None, end=None, resolution=None):
+    """
+    Spaltenweise Chart-Daten eines Tickers (Arrays), optional auf [start, end] beschränkt und resampelt.
+    """
+    columns = [_fill_gaps(values) for values in (data.open, data.high, data.low, data.close)]
+    dates = data.dates
+
+    lo = 0 if start is None else dates.searchsorted(np.datetime64(start, 'ns'), side='left')
+    hi = len(dates) if end is None else dates.searchsorted(np.datetime64(end, 'ns') + np.timedelta64(1, 'D'), side='left')
+    dates = dates[lo:hi]
+    columns = [values[lo:hi] for values in columns]
+
+    return resample_ohlc(dates, *columns, resolution)
+
+
+def pack_chart_binary(dates, open_, high, low, close):
+    """
+    Binärformat: fünf float32-Blöcke (little endian) hintereinander in der Reihenfolge CHART_COLUMNS.
+    Das Datum steht als Tage seit 1970-01-01 (in float32 exakt darstellbar).
+    """
+    days = dates.astype('datetime64[D]').astype(np.int64)
+    matrix = np.vstack([days, open_, high, low, close]).astype('<f4')
+    return matrix.tobytes()
+
+
+def render_chart(data, format="records", start=None, end=None, resolution=None):
+    """
+    Baut die Chart-Antwort aus den PriceData eines Tickers (läuft in einem Thread, siehe get_chart_data).
+    """
+    with span("chart_data"):
+        dates, open_, high, low, close = build_chart_columns(data, start, end, resolution)
+
+    if format == "binary":
+        return Response(
+            content=pack_chart_binary(dates, open_, high, low, close),
+            media_type="application/octet-stream",
+            headers={
+                "X-Chart-Rows": str(len(dates)),
+                "X-Chart-Columns": ",".join(CHART_COLUMNS),
+                "X-Chart-Dtype": "float32-le",
+            },
+        )
+
+    columns = {
+        "date": np.datetime_as_string(dates, unit='D').tolist(),
+        "open": np.round(open_, 2).tolist(),
+        "high": np.round(high, 2).tolist(),
+        "low": np.round(low, 2).tolist(),
+        "close": np.round(close, 2).tolist(),
+    }
+    if format == "columnar":
+        return columns
+
+    return [dict(zip(CHART_COLUMNS, row)) for row in zip(*(columns[c] for c in CHART_COLUMNS))]
+
+
 @app.get("/chart/{ticker}")
-def get_chart_data(ticker: str):
-    dm = DataManager()
-    data_dict = dm.get_historical_data([ticker], "2000-01-01", "2025-01-01", reload=False)
+async def get_chart_data(
+    ticker: str,
+    format: Literal["records", "columnar", "binary"] = "records",
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    resolution: Optional[Literal["daily", "weekly", "monthly"]] = None,
+):
+    """
+    OHLC-Daten für den Chart.
+    format: "records" (Liste von Dicts), "columnar" ({"date": [...], "open": [...], ...})
+    oder "binary" (gepackte float32-Spalten, siehe pack_chart_binary).
+    start/end/resolution begrenzen und resampeln die Daten serverseitig.
+    Antworten werden per GZip komprimiert, wenn der Client es unterstützt.
+    Gleichzeitige Anfragen für denselben Ticker teilen sich eine Ladung (data_service).
+    """
+    if start is not None and end is not None and start > end:
+        raise HTTPException(status_code=400, detail="start muss vor end liegen.")
+
+    data = await data_service.get(ticker)
 
-    if ticker not in data_dict or data_dict[ticker].empty:
+    if data is None or len(data) == 0:
         raise HTTPException(status_code=404, detail="Ticker nicht gefunden.")
 
-    df = data_dict[ticker].copy()
+    return await asyncio.to_thread(render_chart, data, format, start, end, resolution)
 
-    if isinstance(df.columns, pd.MultiIndex):
-        try:
-            clean_df = pd.DataFrame(index=df.index)
-            clean_df['Open'] = df['Open'].iloc[:, 0]
-            clean_df['High'] = df['High'].iloc[:, 0]
-            clean_df['Low'] = df['Low'].iloc[:, 0]
-            clean_df['Close'] = df['Close'].iloc[:, 0]
-            df = clean_df
-        except:
-            pass  # Fallback
-
-    df = df.ffill().bfill().fillna(0.0)
-    chart_data = []
-    for index, row in df.iterrows():
-        chart_data.append({
-            "date": index.strftime('%Y-%m-%d'),
-            "open": float(round(row['Open'], 2)),
-            "high": float(round(row['High'], 2)),
-            "low": float(round(row['Low'], 2)),
-            "close": float(round(row['Close'], 2))
-        })
-    return chart_data
\ No newline at end of file
+
+# --- Testbereich ---
+if __name__ == "__main__":
+    from benchmark import IMPORT_BUDGET_S, check_import_budget, run_import_benchmarks
+
+    # Start-Budget: Kaltstart-Import von main und grid_executor in frischen Interpretern
+    results = run_import_benchmarks(repeat=3)
+    for name, stats in results.items():
+        print(f"{name}: {stats['wall_s']:.2f}s (Budget {IMPORT_BUDGET_S:.2f}s)")
+    violations = check_import_budget(results, IMPORT_BUDGET_S)
+    assert not violations, violations
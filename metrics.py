@@ -0,0 +1,247 @@
+# metrics.py
+"""
+Einfache Laufzeit-Metriken im Prometheus-Textformat (ohne zusätzliche Abhängigkeit).
+
+- Counter und Histogramme mit Labels, prozessweit in REGISTRY gesammelt (render() für /metrics).
+- span(stage) / @timed(stage) messen einen Verarbeitungsschritt und schreiben ihn in das
+  Histogramm updown_stage_seconds sowie in die Zusammenfassung des laufenden Requests (collect_spans).
+"""
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """
+    Monoton steigender Zähler, optional pro Label-Kombination.
+    """
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(str(labels[name]) for name in self.labelnames), 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram:
+    """
+    Histogramm mit festen Bucket-Grenzen (kumulativ wie bei Prometheus), optional pro Label-Kombination.
+    """
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    def count(self, **labels):
+        entry = self._values.get(tuple(str(labels[name]) for name in self.labelnames))
+        return entry[2] if entry else 0
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, (list(entry[0]), entry[1], entry[2])) for key, entry in self._values.items())
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, [("le", _format_value(float(bound)))])
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        """
+        Alle Metriken im Prometheus-Textformat (Version 0.0.4).
+        """
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "updown_stage_seconds", "Dauer der Verarbeitungsschritte in Sekunden.", ("stage",)
+)
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "updown_http_request_seconds", "Dauer der HTTP-Requests bis zur Antwort in Sekunden.", ("method", "route")
+)
+HTTP_REQUESTS = REGISTRY.counter(
+    "updown_http_requests_total", "Anzahl HTTP-Requests.", ("method", "route", "status")
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    "updown_cache_requests_total", "Cache-Zugriffe (prices = PriceStore, results = Ergebnis-Cache).",
+    ("cache", "result")
+)
+CELLS_EVALUATED = REGISTRY.counter(
+    "updown_cells_evaluated_total", "Ausgewertete (Ticker, Zelle)-Paare der Grid Search.", ("source",)
+)
+TRADES_GENERATED = REGISTRY.counter(
+    "updown_trades_generated_total", "Erzeugte Trades.", ("source",)
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class SpanSummary:
+    """
+    Zeiten pro Verarbeitungsschritt innerhalb eines Requests (Anzahl Aufrufe, Summe in Sekunden).
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self._lock:
+            count, total = self.stages.get(stage, (0, 0.0))
+            self.stages[stage] = (count + 1, total + seconds)
+
+    def server_timing(self):
+        """
+        Wert für den Server-Timing-Header, z.B. "backtest;dur=12.3, run_portfolio;dur=15.0".
+        """
+        with self._lock:
+            return ", ".join(f"{stage};dur={total * 1000:.1f}" for stage, (_, total) in self.stages.items())
+
+    def __str__(self):
+        with self._lock:
+            return " ".join(
+                f"{stage}={total * 1000:.1f}ms" + (f"(x{count})" if count > 1 else "")
+                for stage, (count, total) in self.stages.items()
+            )
+
+
+_current_summary = contextvars.ContextVar("span_summary", default=None)
+
+
+@contextmanager
+def collect_spans():
+    """
+    Sammelt alle Spans im aktuellen Kontext (auch in Threads, die den Kontext kopieren) in einer SpanSummary.
+    """
+    summary = SpanSummary()
+    token = _current_summary.set(summary)
+    try:
+        yield summary
+    finally:
+        _current_summary.reset(token)
+
+
+@contextmanager
+def span(stage):
+    """
+    Misst die Dauer eines Verarbeitungsschritts.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        summary = _current_summary.get()
+        if summary is not None:
+            summary.add(stage, elapsed)
+
+
+def timed(stage):
+    """
+    Decorator-Variante von span().
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# --- Testbereich ---
+if __name__ == "__main__":
+    with collect_spans() as summary:
+        with span("beispiel"):
+            time.sleep(0.01)
+        CACHE_REQUESTS.inc(cache="prices", result="hit")
+    print(summary)
+    print(REGISTRY.render())
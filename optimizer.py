@@ -1,8 +1,10 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-from strategy import MeanReversionStrategy
+import logging
 from data_manager import DataManager
+from grid_executor import GridExecutor
+from result_cache import get_result_cache
+from search import SearchSpace, planned_evaluations, run_search
+
+logger = logging.getLogger(__name__)
 
 
 
@@ -20,99 +22,107 @@ HOLD_OPTIONS = [5, 10, 20, 40]
 TP_OPTIONS = [2.0, 4.0, 6.0, 8.0]
 
 
-FEE = 0.001
-
-
-def run_optimization():
-    print("--- Bereite Daten vor ---")
-    dm = DataManager()
-    dm.get_historical_data(TICKERS, "2000-01-01", "2025-01-01", reload=False)
-
-    bot = MeanReversionStrategy(initial_capital=10000)
-    results = []
-
-    total_combinations = len(DROP_OPTIONS) * len(HOLD_OPTIONS) * len(TP_OPTIONS)
-    counter = 0
-
-    print(f"\n--- Starte Grid Search ({total_combinations} Kombinationen für {len(TICKERS)} Assets) ---")
-    print("Dies kann einen Moment dauern... Ich melde mich bei Highlights.\n")
-
-    # DIE DREIFACHE SCHLEIFE
-    for drop in DROP_OPTIONS:
-        for hold in HOLD_OPTIONS:
-            for tp in TP_OPTIONS:
-                counter += 1
+LOOKBACK_OPTIONS = [3]
 
-                params = {
-                    "drop": drop,
-                    "lookback": 3,  # Fix auf 3 Tage (Standard)
-                    "hold": hold,
-                    "take_profit": tp,
-                    "fee": FEE
-                }
 
-                trades = bot.run_portfolio(TICKERS, params)
+FEE_OPTIONS = [0.001]
 
-                if not trades:
-                    results.append({
-                        "drop": drop, "hold": hold, "tp": tp,
-                        "profit": 0, "roi": 0, "trades": 0, "win_rate": 0
-                    })
-                    continue
 
-                # Ergebnis berechnen
-                df = pd.DataFrame(trades)
-                total_profit = df['profit_abs'].sum()
-                roi = (total_profit / 10000) * 100
-                win_rate = len(df[df['profit_abs'] > 0]) / len(df) * 100
+# None = Anzahl CPU-Kerne (bzw. Umgebungsvariable GRID_MAX_WORKERS)
+MAX_WORKERS = None
 
 
-                is_highlight = roi > 50.0
-                if counter % 10 == 0 or is_highlight:
-                    marker = "🔥 SUPER TREFFER!" if is_highlight else ""
-                    print(
-                        f"[{counter}/{total_combinations}] Drop:{drop}% | Hold:{hold}d | TP:{tp}% -> ROI: {roi:.2f}% {marker}")
+# Suchstrategie ("grid", "random", "halving", "coarse_to_fine"), Budget in Zellen und Seed
+SEARCH = "grid"
+SEARCH_BUDGET = None
+SEED = 0
 
-                results.append({
-                    "drop": drop,
-                    "hold": hold,
-                    "tp": tp,
-                    "profit": total_profit,
-                    "roi": roi,
-                    "trades": len(df),
-                    "win_rate": win_rate
-                })
 
-    return pd.DataFrame(results)
+def run_optimization(max_workers=MAX_WORKERS, use_cache=True, search=SEARCH, budget=SEARCH_BUDGET, seed=SEED):
+    logger.info("--- Bereite Daten vor ---")
+    dm = DataManager()
+    dm.get_historical_data(TICKERS, "2000-01-01", "2025-01-01", reload=False)
 
+    initial_capital = 10000
 
-def plot_heatmap(df_results):
-    """
-    Erstellt eine Heatmap: Drop vs. Hold (mit ROI als Farbe)
-    """
-    pivot_table = df_results.pivot_table(
-        index='drop',
-        columns='hold',
-        values='roi',
-        aggfunc='mean'
-    )
+    space = SearchSpace({
+        "lookback": LOOKBACK_OPTIONS,
+        "drop": DROP_OPTIONS,
+        "hold": HOLD_OPTIONS,
+        "take_profit": TP_OPTIONS,
+        "fee": FEE_OPTIONS,
+    })
 
-    plt.figure(figsize=(12, 8))
-    sns.heatmap(pivot_table, annot=True, fmt=".1f", cmap="RdYlGn", cbar_kws={'label': 'Ø ROI %'})
+    total_combinations = planned_evaluations(search, space.size, len(TICKERS), budget)
+    counter = 0
 
-    plt.title("Grid Search Heatmap: Wo liegt der Sweetspot?")
-    plt.ylabel("Drop Schwellwert (%)")
-    plt.xlabel("Haltedauer (Tage)")
+    logger.info("--- Starte Suche '%s' (%d von %d Kombinationen für %d Assets) ---",
+                search, total_combinations, space.size, len(TICKERS))
+    logger.info("Dies kann einen Moment dauern... Ich melde mich bei Highlights.")
 
+    # Alle Kombinationen laufen parallel, Ergebnisse kommen in Fertigstellungs-Reihenfolge zurück
+    with GridExecutor(max_workers=max_workers, preload_tickers=TICKERS) as executor:
+        cache = get_result_cache(dm.storage_path) if use_cache else None
 
-    plt.figtext(0.5, 0.01, "Zahlen zeigen den Durchschnitts-ROI über alle Take-Profit Varianten",
-                wrap=True, horizontalalignment='center', fontsize=10)
+        def evaluate(cells, tickers):
+            nonlocal counter
+            metrics = [None] * len(cells)
+            for cell_idx, cell_metrics in executor.evaluate(cells, tickers, initial_capital, cache=cache):
+                counter += 1
+                metrics[cell_idx] = cell_metrics
+                params = cells[cell_idx]
+                roi = cell_metrics['roi']
 
-    plt.tight_layout()
-    plt.show()
+                is_highlight = roi > 50.0 and len(tickers) == len(TICKERS)
+                if counter % 10 == 0 or is_highlight:
+                    marker = "🔥 SUPER TREFFER!" if is_highlight else ""
+                    logger.info(
+                        "[%d/%d] Lookback:%sd | Drop:%s%% | Hold:%sd | TP:%s%% | Fee:%s -> ROI: %.2f%% %s",
+                        counter, total_combinations, params['lookback'], params['drop'], params['hold'],
+                        params['take_profit'], params['fee'], roi, marker)
+            return metrics
+
+        result = run_search(search, space, evaluate, TICKERS, budget=budget, seed=seed)
+
+    logger.info("%d Zellen ausgewertet (%d Ticker-Auswertungen).", result.cells_evaluated, result.pair_evaluations)
+
+    import pandas as pd
+
+    rows = []
+    for index in sorted(result.metrics):
+        params = space.cell(index)
+        metrics = result.metrics[index]
+        rows.append({
+            "lookback": params['lookback'],
+            "fee": params['fee'],
+            "drop": params['drop'],
+            "hold": params['hold'],
+            "tp": params['take_profit'],
+            "profit": metrics['profit'],
+            "roi": metrics['roi'],
+            "trades": metrics['trades'],
+            "win_rate": metrics['win_rate'],
+            "profit_factor": metrics['profit_factor'],
+            "max_drawdown": metrics['max_drawdown'],
+            "exposure": metrics['exposure'],
+            "sharpe": metrics['sharpe']
+        })
+
+    return pd.DataFrame(rows)
+
+
+def __getattr__(name):
+    # plot_heatmap liegt in plotting.py, matplotlib und seaborn werden erst beim ersten Zugriff geladen
+    if name == "plot_heatmap":
+        from plotting import plot_heatmap
+        return plot_heatmap
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 if __name__ == "__main__":
+    import pandas as pd
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     pd.set_option('display.max_rows', 50)
     pd.set_option('display.width', 1000)
 
@@ -131,15 +141,20 @@ if __name__ == "__main__":
     print(f"Drop Schwellwert: {best['drop']}%")
     print(f"Haltedauer:       {int(best['hold'])} Tage")
     print(f"Take Profit:      {best['tp']}%")
+    print(f"Lookback:         {int(best['lookback'])} Tage")
+    print(f"Gebühr:           {best['fee'] * 100:.2f}%")
     print("-" * 30)
     print(f"Gesamt-Rendite:   {best['roi']:.2f}%")
     print(f"Anzahl Trades:    {int(best['trades'])}")
     print(f"Trefferquote:     {best['win_rate']:.2f}%")
+    print(f"Max Drawdown:     {best['max_drawdown']:.2f}%")
+    print(f"Sharpe (ähnlich): {best['sharpe']:.2f}")
     print("=" * 60)
 
 
     print("Erstelle Heatmap...")
     try:
+        from plotting import plot_heatmap
         plot_heatmap(df_results)
     except Exception as e:
         print(f"Hinweis: Konnte Heatmap nicht erstellen: {e}")
\ No newline at end of file
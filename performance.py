@@ -0,0 +1,273 @@
+# performance.py
+"""
+Kennzahlen einer Grid-Zelle (ROI, Trefferquote, Profit Factor, Max Drawdown, Exposure, Sharpe-ähnlich),
+berechnet in einem Durchlauf über die Trades, ohne tägliche Equity-Kurve.
+
+Pro (Ticker, Zelle) entsteht ein TradeStats mit aufsummierbaren Größen und der kompakten Folge
+(Exit-Tag, Gewinn) der Trades. Über alle Ticker werden die Summen addiert, der Drawdown kommt aus
+dem Zusammenführen der bereits sortierten Exit-Folgen. Er ist auf 100 % begrenzt: Fällt die realisierte
+Equity auf oder unter null, gilt das als Totalverlust.
+"""
+import json
+import math
+
+import numpy as np
+
+
+TRADING_DAYS_PER_YEAR = 252
+
+# Mögliche Werte für rank_by; bei Drawdown und Exposure ist kleiner besser
+RANK_METRICS = ("roi", "win_rate", "profit_factor", "max_drawdown", "exposure", "sharpe")
+LOWER_IS_BETTER = ("max_drawdown", "exposure")
+
+_SCALAR_FIELDS = (
+    "profit", "wins", "count", "gross_profit", "gross_loss",
+    "sum_return", "sum_return_sq", "held_bars", "bars",
+)
+
+
+class TradeStats:
+    """
+    Aufsummierbare Kennzahlen der Trades eines Tickers für eine Zelle.
+    profit/gross_*: auf Cent gerundete Gewinne wie in den Trade-Dicts, sum_return*: Netto-Rendite pro Trade,
+    held_bars: Tage in Position (Einstiegs- bis Exit-Tag), bars: Anzahl Handelstage des Tickers.
+    exit_days (Tage seit 1970, int32) und exit_profits sind nach Exit-Tag sortiert.
+    """
+    __slots__ = _SCALAR_FIELDS + ("exit_days", "exit_profits")
+
+    def __init__(self, profit=0.0, wins=0, count=0, gross_profit=0.0, gross_loss=0.0, sum_return=0.0,
+                 sum_return_sq=0.0, held_bars=0, bars=0, exit_days=None, exit_profits=None):
+        self.profit = profit
+        self.wins = wins
+        self.count = count
+        self.gross_profit = gross_profit
+        self.gross_loss = gross_loss
+        self.sum_return = sum_return
+        self.sum_return_sq = sum_return_sq
+        self.held_bars = held_bars
+        self.bars = bars
+        self.exit_days = np.empty(0, dtype=np.int32) if exit_days is None else exit_days
+        self.exit_profits = np.empty(0, dtype=np.float64) if exit_profits is None else exit_profits
+
+    @classmethod
+    def from_trades(cls, profit_pct, days_held, exit_days, bars, initial_capital):
+        """
+        Aus den Trades eines Tickers (in Exit-Reihenfolge): Netto-Rendite, Haltetage und Exit-Tag pro Trade.
+        """
+        profit_abs = np.round(initial_capital * profit_pct, 2)
+        return cls(
+            profit=float(profit_abs.sum()),
+            wins=int((profit_abs > 0).sum()),
+            count=len(profit_abs),
+            gross_profit=float(profit_abs[profit_abs > 0].sum()),
+            gross_loss=float(-profit_abs[profit_abs < 0].sum()),
+            sum_return=float(profit_pct.sum()),
+            sum_return_sq=float(np.dot(profit_pct, profit_pct)),
+            held_bars=int(days_held.sum()) + len(days_held),
+            bars=bars,
+            exit_days=np.asarray(exit_days, dtype=np.int32),
+            exit_profits=profit_abs,
+        )
+
+    def to_record(self):
+        """
+        (JSON der Summen, Bytes der Exit-Folge) für den Ergebnis-Cache.
+        """
+        scalars = json.dumps({name: getattr(self, name) for name in _SCALAR_FIELDS})
+        return scalars, self.exit_days.astype("<i4").tobytes() + self.exit_profits.astype("<f8").tobytes()
+
+    @classmethod
+    def from_record(cls, scalars, blob):
+        stats = cls(**json.loads(scalars))
+        split = stats.count * 4
+        stats.exit_days = np.frombuffer(blob, dtype="<i4", count=stats.count)
+        stats.exit_profits = np.frombuffer(blob, dtype="<f8", count=stats.count, offset=split)
+        return stats
+
+
+def max_drawdown_pct(parts, initial_capital):
+    """
+    Maximaler Rückgang der realisierten Equity (Startkapital + kumulierte Gewinne am Verkaufstag) vom
+    bisherigen Hoch in Prozent, höchstens 100 (Equity unter null zählt als null).
+    Mehrere Exits am selben Tag zählen zusammen, wie in der Equity-Kurve.
+    """
+    parts = [p for p in parts if p.count]
+    if not parts:
+        return 0.0
+    if len(parts) == 1:
+        days, profits = parts[0].exit_days, parts[0].exit_profits
+    else:
+        days = np.concatenate([p.exit_days for p in parts])
+        profits = np.concatenate([p.exit_profits for p in parts])
+        # Die Folgen sind je Ticker sortiert, der stabile Sort führt sie nur noch zusammen
+        order = np.argsort(days, kind="stable")
+        days, profits = days[order], profits[order]
+    return _drawdown_pct(days, profits, initial_capital)
+
+
+def _drawdown_pct(days, profits, initial_capital):
+    if not len(days):
+        return 0.0
+    day_ends = np.flatnonzero(np.append(days[1:] != days[:-1], True))
+    equity = np.maximum(initial_capital + np.cumsum(profits)[day_ends], 0.0)
+    peak = np.maximum.accumulate(np.maximum(equity, initial_capital))
+    return float(((peak - equity) / peak).max() * 100)
+
+
+def portfolio_metrics(parts, initial_capital):
+    """
+    Kennzahlen einer Zelle über alle Ticker aus den TradeStats der einzelnen Ticker.
+    """
+    sums = {name: sum(getattr(p, name) for p in parts) for name in _SCALAR_FIELDS}
+    max_bars = max((p.bars for p in parts), default=0)
+    return _metrics_from_sums(sums, max_bars, max_drawdown_pct(parts, initial_capital), initial_capital)
+
+
+def _metrics_from_sums(sums, max_bars, max_drawdown, initial_capital):
+    profit = sums["profit"]
+    wins = sums["wins"]
+    count = sums["count"]
+    gross_profit = sums["gross_profit"]
+    gross_loss = sums["gross_loss"]
+    sum_return = sums["sum_return"]
+    sum_return_sq = sums["sum_return_sq"]
+    held_bars = sums["held_bars"]
+    total_bars = sums["bars"]
+
+    # Sharpe-ähnlich: mittlere Trade-Rendite / Streuung, hochgerechnet auf Trades pro Jahr
+    sharpe = 0.0
+    if count > 1 and max_bars:
+        mean = sum_return / count
+        variance = max(sum_return_sq / count - mean * mean, 0.0)
+        if variance > 0:
+            trades_per_year = count / (max_bars / TRADING_DAYS_PER_YEAR)
+            sharpe = mean / math.sqrt(variance) * math.sqrt(trades_per_year)
+
+    return {
+        "profit": profit,
+        "roi": (profit / initial_capital) * 100,
+        "win_rate": wins / count * 100 if count else 0,
+        "wins": wins,
+        "trades": count,
+        # Ohne Verlust-Trades ist der Profit Factor unendlich, ausgegeben wird dann None
+        "profit_factor": gross_profit / gross_loss if gross_loss else None,
+        "gross_profit": gross_profit,
+        "max_drawdown": max_drawdown,
+        "exposure": held_bars / total_bars * 100 if total_bars else 0.0,
+        "sharpe": sharpe,
+    }
+
+
+class PortfolioAccumulator:
+    """
+    Kennzahlen einer Zelle, Ticker für Ticker aufsummiert, ohne die TradeStats aller Ticker zu behalten.
+    Die Exit-Folgen werden bei compact() zu Gewinnen pro Exit-Tag verdichtet, der Speicher pro Zelle ist
+    damit durch die Anzahl der Handelstage begrenzt und wächst nicht mit der Anzahl der Ticker.
+    """
+    __slots__ = ("sums", "max_bars", "exit_days", "exit_profits", "_pending")
+
+    def __init__(self):
+        self.sums = dict.fromkeys(_SCALAR_FIELDS, 0)
+        self.max_bars = 0
+        self.exit_days = np.empty(0, dtype=np.int32)
+        self.exit_profits = np.empty(0, dtype=np.float64)
+        self._pending = []
+
+    def add(self, stats):
+        for name in _SCALAR_FIELDS:
+            self.sums[name] += getattr(stats, name)
+        self.max_bars = max(self.max_bars, stats.bars)
+        if stats.count:
+            self._pending.append((stats.exit_days, stats.exit_profits))
+
+    def compact(self):
+        """
+        Führt die seit dem letzten Aufruf hinzugekommenen Exit-Folgen mit den Tagessummen zusammen.
+        """
+        if not self._pending:
+            return
+        days = np.concatenate([self.exit_days] + [d for d, _ in self._pending])
+        profits = np.concatenate([self.exit_profits] + [p for _, p in self._pending])
+        self.exit_days, inverse = np.unique(days, return_inverse=True)
+        self.exit_profits = np.bincount(inverse, weights=profits, minlength=len(self.exit_days))
+        self._pending = []
+
+    @property
+    def nbytes(self):
+        return self.exit_days.nbytes + self.exit_profits.nbytes + sum(d.nbytes + p.nbytes for d, p in self._pending)
+
+    def metrics(self, initial_capital):
+        """
+        Kennzahlen wie portfolio_metrics über alle bisher hinzugefügten Ticker.
+        """
+        self.compact()
+        drawdown = _drawdown_pct(self.exit_days, self.exit_profits, initial_capital)
+        return _metrics_from_sums(self.sums, self.max_bars, drawdown, initial_capital)
+
+
+def rank_score(metrics, rank_by="roi"):
+    """
+    Vergleichswert einer Zelle für rank_by (größer ist besser).
+    Außer bei ROI landen Zellen ohne Trades immer hinten.
+    """
+    if rank_by == "roi":
+        return metrics["roi"]
+    if not metrics["trades"]:
+        return -math.inf
+    if rank_by == "profit_factor":
+        value = metrics["profit_factor"]
+        if value is None:
+            return math.inf if metrics["gross_profit"] > 0 else 0.0
+        return value
+    value = metrics[rank_by]
+    return -value if rank_by in LOWER_IS_BETTER else value
+
+
+# --- Testbereich ---
+if __name__ == "__main__":
+    import pandas as pd
+    from strategy import MeanReversionStrategy
+    from price_store import get_price_store
+
+    # Drawdown aus der Exit-Folge gegen die tägliche Equity-Kurve (wie calculate_comparison_curves)
+    tickers = ["MSFT", "IBM", "NVDA", "^GDAXI"]
+    capital = 10000
+    bot = MeanReversionStrategy(initial_capital=capital)
+    store = get_price_store()
+    params = {"drop": 5.0, "lookback": 3, "hold": 20, "take_profit": 4.0, "fee": 0.001}
+
+    trades = bot.run_portfolio(tickers, params)
+    df = pd.DataFrame(trades)
+    parts = []
+    for ticker in tickers:
+        sub = df[df["ticker"] == ticker]
+        profit_pct = sub["profit_pct"].to_numpy() / 100
+        days = pd.to_datetime(sub["sell_date"]).to_numpy().astype("datetime64[D]").astype(np.int64)
+        stats = TradeStats.from_trades(profit_pct, sub["days_held"].to_numpy(), days, len(store.get(ticker)), capital)
+        # profit_abs aus den Trade-Dicts übernehmen (profit_pct dort ist gerundet)
+        stats.exit_profits = sub["profit_abs"].to_numpy(dtype=np.float64)
+        parts.append(stats)
+
+    daily = df.groupby("sell_date")["profit_abs"].sum().sort_index().cumsum() + capital
+    peak = np.maximum.accumulate(np.maximum(daily.to_numpy(), capital))
+    expected = min(((peak - daily.to_numpy()) / peak).max() * 100, 100.0)
+    actual = max_drawdown_pct(parts, capital)
+    print(f"Max Drawdown: {actual:.4f}% (Referenz {expected:.4f}%)")
+    assert abs(actual - expected) < 1e-9
+
+    # Verluste über das Startkapital hinaus: Drawdown endet bei 100 %
+    assert _drawdown_pct(np.arange(3), np.array([500.0, -12000.0, 300.0]), capital) == 100.0
+    assert abs(_drawdown_pct(np.arange(2), np.array([-2500.0, 500.0]), capital) - 25.0) < 1e-9
+
+    metrics = portfolio_metrics(parts, capital)
+    print({k: round(v, 4) if isinstance(v, float) else v for k, v in metrics.items()})
+    accumulator = PortfolioAccumulator()
+    for stats in parts:
+        accumulator.add(stats)
+        accumulator.compact()
+    streamed = accumulator.metrics(capital)
+    assert all(abs(streamed[k] - v) < 1e-6 for k, v in metrics.items() if v is not None)
+    restored = TradeStats.from_record(*parts[0].to_record())
+    assert np.array_equal(restored.exit_days, parts[0].exit_days)
+    assert np.array_equal(restored.exit_profits, parts[0].exit_profits)
+    print("Kennzahlen geprüft.")
@@ -0,0 +1,114 @@
+# plotting.py
+"""
+Diagramme für die Analyse im Terminal (Equity-Kurve, Trades im Kurs-Chart, Grid-Search-Heatmap).
+Getrennt vom Backtest-Kern, damit API- und Grid-Worker matplotlib/seaborn nie laden.
+"""
+import logging
+
+import matplotlib.pyplot as plt
+import pandas as pd
+import seaborn as sns
+
+logger = logging.getLogger(__name__)
+
+
+def plot_equity_curve(trades_df, initial_capital):
+    """
+    Erstellt ein Diagramm für den Verlauf des Portfolios
+    """
+    if trades_df.empty:
+        logger.info("Keine Trades zum Plotten.")
+        return
+
+    df_sorted = trades_df.sort_values("sell_date")
+
+    df_sorted['cumulative_profit'] = df_sorted['profit_abs'].cumsum()
+
+    df_sorted['equity'] = initial_capital + df_sorted['cumulative_profit']
+
+    start_date = df_sorted['sell_date'].min() - pd.Timedelta(days=1)
+
+    plt.figure(figsize=(12, 6))
+
+    plt.plot(df_sorted['sell_date'], df_sorted['equity'], label="Portfolio Wert", color="blue")
+
+    plt.axhline(y=initial_capital, color='r', linestyle='--', label="Startkapital")
+
+    plt.title("Portfolio Performance (Equity Curve)")
+    plt.xlabel("Datum")
+    plt.ylabel("Kapital in €")
+    plt.legend()
+    plt.grid(True)
+    plt.tight_layout()
+    plt.show()
+
+
+def plot_trades_on_chart(ticker, strategy_instance, trades_df):
+    """
+    Zeigt den Aktienkurs und markiert die Käufe und Verkäufe
+    """
+    logger.info("Lade Chart-Daten für %s...", ticker)
+    df_prices = strategy_instance.load_and_clean_data(ticker)
+
+    if df_prices is None or df_prices.empty:
+        logger.warning("Keine Daten für %s gefunden.", ticker)
+        return
+
+    ticker_trades = trades_df[trades_df['ticker'] == ticker]
+
+    if ticker_trades.empty:
+        logger.info("Keine Trades für %s gefunden.", ticker)
+        return
+
+    plt.figure(figsize=(14, 7))
+
+
+    start_plot = pd.to_datetime(ticker_trades['buy_date'].min()) - pd.Timedelta(days=30)
+    end_plot = pd.to_datetime(ticker_trades['sell_date'].max()) + pd.Timedelta(days=30)
+
+    mask = (df_prices.index >= start_plot) & (df_prices.index <= end_plot)
+    subset = df_prices.loc[mask]
+
+    plt.plot(subset.index, subset['Close'], label=f"{ticker} Kurs", color="gray", alpha=0.5)
+
+    plt.scatter(pd.to_datetime(ticker_trades['buy_date']),
+                ticker_trades['entry_price'],
+                color='green', marker='^', s=100, label='Kauf', zorder=5)
+
+
+    plt.scatter(pd.to_datetime(ticker_trades['sell_date']),
+                ticker_trades['exit_price'],
+                color='red', marker='v', s=100, label='Verkauf', zorder=5)
+
+    plt.title(f"Trade Analyse für {ticker}")
+    plt.xlabel("Datum")
+    plt.ylabel("Preis")
+    plt.legend()
+    plt.grid(True)
+    plt.show()
+
+
+def plot_heatmap(df_results):
+    """
+    Erstellt eine Heatmap: Drop vs. Hold (mit ROI als Farbe)
+    """
+    pivot_table = df_results.pivot_table(
+        index='drop',
+        columns='hold',
+        values='roi',
+        aggfunc='mean'
+    )
+
+    plt.figure(figsize=(12, 8))
+    sns.heatmap(pivot_table, annot=True, fmt=".1f", cmap="RdYlGn", cbar_kws={'label': 'Ø ROI %'})
+
+    plt.title("Grid Search Heatmap: Wo liegt der Sweetspot?")
+    plt.ylabel("Drop Schwellwert (%)")
+    plt.xlabel("Haltedauer (Tage)")
+
+
+    plt.figtext(0.5, 0.01, "Zahlen zeigen den Durchschnitts-ROI über alle Take-Profit Varianten",
+                wrap=True, horizontalalignment='center', fontsize=10)
+
+    plt.tight_layout()
+    plt.show()
@@ -0,0 +1,381 @@
+# price_store.py
+import glob
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from metrics import CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+
+PRICE_FIELDS = ("Open", "High", "Low", "Close")
+
+# Binärer Cache: ein Ordner <ticker>.cols mit einer .npy-Datei pro Spalte (per mmap ladbar)
+BINARY_SUFFIX = ".cols"
+BINARY_COLUMNS = ("dates", "open", "high", "low", "close")
+BINARY_FORMAT_VERSION = 1
+
+
+class PriceData:
+    """
+    Bereinigte Kursdaten eines Tickers.
+    Open/High/Low/Close liegen als zusammenhängende float64-Arrays vor, dazu ein datetime64-Index.
+    Die Arrays sind schreibgeschützt, weil sich alle Backtests dieselben Arrays teilen.
+    """
+    __slots__ = ("ticker", "dates", "open", "high", "low", "close", "mtime", "_content_hash", "__weakref__")
+
+    def __init__(self, ticker, dates, open_, high, low, close, mtime=None):
+        self.ticker = ticker
+        self.dates = readonly(np.asarray(dates, dtype="datetime64[ns]"))
+        self.open = readonly(np.ascontiguousarray(open_, dtype=np.float64))
+        self.high = readonly(np.ascontiguousarray(high, dtype=np.float64))
+        self.low = readonly(np.ascontiguousarray(low, dtype=np.float64))
+        self.close = readonly(np.ascontiguousarray(close, dtype=np.float64))
+        self.mtime = mtime
+        self._content_hash = None
+
+    def __len__(self):
+        return len(self.dates)
+
+    @property
+    def nbytes(self):
+        return self.dates.nbytes + self.open.nbytes + self.high.nbytes + self.low.nbytes + self.close.nbytes
+
+    @property
+    def content_hash(self):
+        """
+        SHA-1 über alle Spalten. Ändern sich die Kurse (z.B. nach einem Download), ändert sich der Hash.
+        """
+        if self._content_hash is None:
+            digest = hashlib.sha1()
+            for column in (self.dates, self.open, self.high, self.low, self.close):
+                digest.update(np.ascontiguousarray(column).view(np.uint8))
+            self._content_hash = digest.hexdigest()
+        return self._content_hash
+
+    def to_frame(self):
+        """
+        Baut einen DataFrame (Open/High/Low/Close) aus den Arrays.
+        Der DataFrame bekommt eigene Kopien, damit Änderungen den Store nicht berühren.
+        """
+        import pandas as pd
+        return pd.DataFrame(
+            {"Open": self.open, "High": self.high, "Low": self.low, "Close": self.close},
+            index=pd.DatetimeIndex(self.dates, name="Date"),
+            copy=True,
+        )
+
+
+def readonly(arr):
+    """
+    Schreibschutz für Arrays, die sich mehrere Backtests teilen (auch für bereits geschützte mmap-Arrays).
+    """
+    if arr.flags.writeable:
+        arr.flags.writeable = False
+    return arr
+
+
+def clean_price_frame(df):
+    """
+    Bereinigt einen yfinance-DataFrame: erste Spalte unter dem jeweiligen Header nehmen, Lücken füllen.
+    Funktioniert für MultiIndex-Spalten (yfinance CSV) und für flache Spalten.
+    """
+    import pandas as pd
+    clean_df = pd.DataFrame(index=pd.DatetimeIndex(pd.to_datetime(df.index), name="Date"))
+    for field in PRICE_FIELDS:
+        if field not in df.columns.get_level_values(0):
+            clean_df[field] = np.nan
+            continue
+        column = df[field]
+        if isinstance(column, pd.DataFrame):
+            column = column.iloc[:, 0]
+        clean_df[field] = pd.to_numeric(column, errors="coerce").to_numpy()
+
+    clean_df.ffill(inplace=True)
+    return clean_df
+
+
+def load_price_file(file_path, ticker):
+    """
+    Liest eine yfinance-CSV (Header=[0,1,2]) und gibt bereinigte PriceData zurück.
+    """
+    # pandas wird nur für CSV und DataFrames gebraucht, Zugriffe über den Binär-Cache kommen ohne aus
+    import pandas as pd
+    mtime = os.path.getmtime(file_path)
+    df = pd.read_csv(file_path, header=[0, 1, 2], index_col=0, parse_dates=True)
+    clean_df = clean_price_frame(df)
+    return PriceData(
+        ticker,
+        clean_df.index.values,
+        clean_df["Open"].to_numpy(),
+        clean_df["High"].to_numpy(),
+        clean_df["Low"].to_numpy(),
+        clean_df["Close"].to_numpy(),
+        mtime=mtime,
+    )
+
+
+def csv_path(storage_path, ticker):
+    return os.path.join(storage_path, f"{ticker}.csv")
+
+
+def binary_path(storage_path, ticker):
+    return os.path.join(storage_path, f"{ticker}{BINARY_SUFFIX}")
+
+
+def _mtime_or_none(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+def source_mtime(storage_path, ticker):
+    """
+    Versionsmerkmal eines Tickers: mtime der CSV, ohne CSV die mtime des Binär-Caches.
+    """
+    mtime = _mtime_or_none(csv_path(storage_path, ticker))
+    if mtime is None:
+        mtime = _mtime_or_none(os.path.join(binary_path(storage_path, ticker), "meta.json"))
+    return mtime
+
+
+def replace_file(path, write):
+    """
+    Schreibt eine Datei atomar: write(f) füllt eine .tmp-Datei, die danach die alte ersetzt.
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+def write_binary_cache(storage_path, data, csv_mtime=None):
+    """
+    Schreibt die bereinigten Spalten als .npy-Dateien. meta.json wird zuletzt geschrieben
+    und markiert den Cache erst dann als gültig (inkl. mtime der Quell-CSV).
+    """
+    directory = binary_path(storage_path, data.ticker)
+    os.makedirs(directory, exist_ok=True)
+    for name in BINARY_COLUMNS:
+        column = getattr(data, name)
+        replace_file(os.path.join(directory, f"{name}.npy"), lambda f, c=column: np.save(f, c))
+
+    meta = {
+        "version": BINARY_FORMAT_VERSION,
+        "ticker": data.ticker,
+        "rows": len(data),
+        "source_mtime": csv_mtime,
+    }
+    replace_file(os.path.join(directory, "meta.json"), lambda f: f.write(json.dumps(meta).encode("utf-8")))
+
+
+def read_binary_cache(storage_path, ticker, csv_mtime=None):
+    """
+    Lädt den Binär-Cache per mmap (nahezu ohne Kopie).
+    Gibt None zurück, wenn er fehlt, veraltet ist (CSV neuer) oder ein anderes Format hat.
+    """
+    directory = binary_path(storage_path, ticker)
+    meta_path = os.path.join(directory, "meta.json")
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if meta.get("version") != BINARY_FORMAT_VERSION:
+        return None
+    if csv_mtime is not None and meta.get("source_mtime") != csv_mtime:
+        return None
+
+    try:
+        columns = {
+            name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+            for name in BINARY_COLUMNS
+        }
+    except (OSError, ValueError):
+        return None
+    if any(len(column) != meta.get("rows") for column in columns.values()):
+        return None
+
+    return PriceData(
+        ticker,
+        columns["dates"],
+        columns["open"],
+        columns["high"],
+        columns["low"],
+        columns["close"],
+        mtime=csv_mtime if csv_mtime is not None else os.path.getmtime(meta_path),
+    )
+
+
+def load_price_data(storage_path, ticker):
+    """
+    Gemeinsamer Loader für DataManager und Strategie.
+    Liest bevorzugt den Binär-Cache, sonst die CSV, die dabei einmalig in den Binär-Cache konvertiert wird.
+    Gibt None zurück, wenn für den Ticker keine Daten vorliegen.
+    """
+    csv_file = csv_path(storage_path, ticker)
+    csv_mtime = _mtime_or_none(csv_file)
+
+    data = read_binary_cache(storage_path, ticker, csv_mtime)
+    if data is not None:
+        return data
+    if csv_mtime is None:
+        return None
+
+    data = load_price_file(csv_file, ticker)
+    try:
+        write_binary_cache(storage_path, data, csv_mtime)
+    except OSError as e:
+        logger.warning("Binär-Cache für %s konnte nicht geschrieben werden: %s", ticker, e)
+    return data
+
+
+def migrate_csv_cache(storage_path="data_cache"):
+    """
+    Konvertiert alle CSVs im Speicherordner in den Binär-Cache (nur fehlende oder veraltete).
+    Gibt die Liste der konvertierten Ticker zurück.
+    """
+    converted = []
+    for file_path in sorted(glob.glob(os.path.join(storage_path, "*.csv"))):
+        ticker = os.path.basename(file_path)[:-len(".csv")]
+        csv_mtime = os.path.getmtime(file_path)
+        if read_binary_cache(storage_path, ticker, csv_mtime) is not None:
+            continue
+        write_binary_cache(storage_path, load_price_file(file_path, ticker), csv_mtime)
+        converted.append(ticker)
+    return converted
+
+
+class PriceStore:
+    """
+    Prozessweiter In-Memory-Cache für bereinigte Kursdaten.
+    Jeder Ticker wird pro Prozess nur einmal geladen. Ändert sich die mtime der Datei, wird neu geladen.
+    Begrenzt über max_entries und max_bytes, verdrängt wird der am längsten nicht genutzte Ticker (LRU).
+    Gleichzeitige Anfragen für denselben Ticker warten auf eine gemeinsame Ladung,
+    verschiedene Ticker laden parallel.
+    """
+
+    def __init__(self, storage_path="data_cache", max_entries=64, max_bytes=256 * 1024 * 1024):
+        self.storage_path = storage_path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self._load_locks = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, ticker):
+        """
+        Gibt die PriceData für den Ticker zurück oder None, wenn keine Daten existieren.
+        """
+        mtime = source_mtime(self.storage_path, ticker)
+        if mtime is None:
+            self.invalidate(ticker)
+            return None
+
+        data = self._cached(ticker, mtime)
+        if data is not None:
+            return data
+
+        with self._lock:
+            load_lock = self._load_locks.setdefault(ticker, threading.Lock())
+        with load_lock:
+            # Ein anderer Thread hat den Ticker evtl. geladen, während wir gewartet haben
+            data = self._cached(ticker, mtime)
+            if data is not None:
+                return data
+
+            self.misses += 1
+            CACHE_REQUESTS.inc(cache="prices", result="miss")
+            data = load_price_data(self.storage_path, ticker)
+            if data is None:
+                return None
+            with self._lock:
+                self._put(ticker, data)
+            return data
+
+    def _cached(self, ticker, mtime):
+        with self._lock:
+            data = self._entries.get(ticker)
+            if data is None or data.mtime != mtime:
+                return None
+            self._entries.move_to_end(ticker)
+            self.hits += 1
+            CACHE_REQUESTS.inc(cache="prices", result="hit")
+            return data
+
+    def _put(self, ticker, data):
+        old = self._entries.pop(ticker, None)
+        if old is not None:
+            self._bytes -= old.nbytes
+        self._entries[ticker] = data
+        self._bytes += data.nbytes
+        self._evict()
+
+    def _evict(self):
+        # Der zuletzt eingefügte Eintrag bleibt immer erhalten
+        while len(self._entries) > 1 and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.nbytes
+
+    def invalidate(self, ticker=None):
+        """
+        Entfernt einen Ticker (oder alle, wenn ticker=None) aus dem Cache.
+        """
+        with self._lock:
+            if ticker is None:
+                self._entries.clear()
+                self._bytes = 0
+                return
+            old = self._entries.pop(ticker, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+
+    def __contains__(self, ticker):
+        return ticker in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def nbytes(self):
+        return self._bytes
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_price_store(storage_path="data_cache"):
+    """
+    Gibt den prozessweiten PriceStore für einen Speicherordner zurück.
+    """
+    key = os.path.abspath(storage_path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = PriceStore(storage_path)
+            _stores[key] = store
+        return store
+
+
+# --- Migration ---
+if __name__ == "__main__":
+    import sys
+
+    path = sys.argv[1] if len(sys.argv) > 1 else "data_cache"
+    tickers = migrate_csv_cache(path)
+    if tickers:
+        print(f"{len(tickers)} Ticker in den Binär-Cache konvertiert: {', '.join(tickers)}")
+    else:
+        print("Binär-Cache ist bereits aktuell.")
@@ -0,0 +1,177 @@
+# result_cache.py
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from metrics import CACHE_REQUESTS
+from performance import TradeStats
+
+
+# Wird erhöht, wenn sich die Berechnung der Kennzahlen ändert (alte Einträge werden ignoriert)
+CACHE_VERSION = 2
+
+# Zellen pro Abfrage in get_many: 5 Parameter pro Zelle, unter dem Limit älterer SQLite-Versionen (999)
+LOOKUP_CHUNK = 150
+
+
+def cell_key(params):
+    """
+    Schlüssel einer Grid-Zelle ohne Ticker: (lookback, drop, hold, take_profit, fee).
+    """
+    return (
+        int(params['lookback']),
+        float(params['drop']),
+        int(params['hold']),
+        float(params['take_profit']),
+        float(params.get('fee', 0.001)),
+    )
+
+
+class ResultCache:
+    """
+    Persistenter Cache für Backtest-Kennzahlen (TradeStats) pro (Ticker, Zelle), mit begrenztem LRU im Speicher davor.
+    Die Summen liegen als JSON in metrics, die Exit-Folge für den Drawdown als Bytes in exits
+    (deshalb ist der LRU im Speicher kleiner als die Anzahl Zellen großer Grids).
+    Der Schlüssel enthält den Inhalts-Hash der Kursdaten: Nach einem neuen Download passen nur die
+    Einträge des betroffenen Tickers nicht mehr, alle anderen Ticker bleiben gültig.
+    """
+
+    def __init__(self, db_path="data_cache/results.sqlite", max_memory_entries=20_000):
+        self.db_path = db_path
+        self.max_memory_entries = max_memory_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cell_results (
+                    ticker TEXT NOT NULL,
+                    data_hash TEXT NOT NULL,
+                    capital REAL NOT NULL,
+                    version INTEGER NOT NULL,
+                    lookback INTEGER NOT NULL,
+                    drop_pct REAL NOT NULL,
+                    hold INTEGER NOT NULL,
+                    take_profit REAL NOT NULL,
+                    fee REAL NOT NULL,
+                    metrics TEXT NOT NULL,
+                    exits BLOB,
+                    PRIMARY KEY (ticker, data_hash, capital, version, lookback, drop_pct, hold, take_profit, fee)
+                )
+                """
+            )
+            # Ältere Datenbanken ohne Exit-Folge: Spalte ergänzen, Einträge alter Versionen verwerfen
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(cell_results)")]
+            if "exits" not in columns:
+                self._conn.execute("ALTER TABLE cell_results ADD COLUMN exits BLOB")
+            self._conn.execute("DELETE FROM cell_results WHERE version != ?", (CACHE_VERSION,))
+
+    def _remember(self, key, metrics):
+        self._memory[key] = metrics
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, ticker, data_hash, capital, keys):
+        """
+        Sucht die Kennzahlen für mehrere Zellen eines Tickers. Gibt {cell_key: TradeStats} für alle Treffer zurück.
+        """
+        found = {}
+        missing = []
+        with self._lock:
+            for key in keys:
+                metrics = self._memory.get((ticker, data_hash, capital) + key)
+                if metrics is not None:
+                    self._memory.move_to_end((ticker, data_hash, capital) + key)
+                    found[key] = metrics
+                else:
+                    missing.append(key)
+
+            # Nur die gesuchten Zellen lesen: Join gegen eine VALUES-Liste, ein Index-Zugriff pro Zelle
+            for start in range(0, len(missing), LOOKUP_CHUNK):
+                chunk = missing[start:start + LOOKUP_CHUNK]
+                rows = self._conn.execute(
+                    "SELECT c.lookback, c.drop_pct, c.hold, c.take_profit, c.fee, c.metrics, c.exits "
+                    f"FROM (VALUES {', '.join(['(?, ?, ?, ?, ?)'] * len(chunk))}) AS w "
+                    "CROSS JOIN cell_results AS c "
+                    "ON c.ticker = ? AND c.data_hash = ? AND c.capital = ? AND c.version = ? "
+                    "AND c.lookback = w.column1 AND c.drop_pct = w.column2 AND c.hold = w.column3 "
+                    "AND c.take_profit = w.column4 AND c.fee = w.column5",
+                    [value for key in chunk for value in key] + [ticker, data_hash, capital, CACHE_VERSION],
+                )
+                for lookback, drop, hold, take_profit, fee, metrics, exits in rows:
+                    key = (lookback, drop, hold, take_profit, fee)
+                    stats = TradeStats.from_record(metrics, exits)
+                    found[key] = stats
+                    self._remember((ticker, data_hash, capital) + key, stats)
+
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        CACHE_REQUESTS.inc(len(found), cache="results", result="hit")
+        CACHE_REQUESTS.inc(len(keys) - len(found), cache="results", result="miss")
+        return found
+
+    def put_many(self, ticker, data_hash, capital, items):
+        """
+        Speichert [(cell_key, TradeStats), ...] für einen Ticker.
+        """
+        if not items:
+            return
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO cell_results "
+                    "(ticker, data_hash, capital, version, lookback, drop_pct, hold, take_profit, fee, metrics, exits) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (ticker, data_hash, capital, CACHE_VERSION) + key + stats.to_record()
+                        for key, stats in items
+                    ],
+                )
+            for key, stats in items:
+                self._remember((ticker, data_hash, capital) + key, stats)
+
+    def invalidate_ticker(self, ticker, keep_hash=None):
+        """
+        Entfernt alle Einträge eines Tickers, optional außer denen zum aktuellen Daten-Hash.
+        """
+        with self._lock:
+            with self._conn:
+                if keep_hash is None:
+                    self._conn.execute("DELETE FROM cell_results WHERE ticker = ?", (ticker,))
+                else:
+                    self._conn.execute(
+                        "DELETE FROM cell_results WHERE ticker = ? AND data_hash != ?", (ticker, keep_hash)
+                    )
+            for key in [k for k in self._memory if k[0] == ticker and k[1] != keep_hash]:
+                del self._memory[key]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_result_cache(storage_path="data_cache"):
+    """
+    Gibt den prozessweiten ResultCache für einen Speicherordner zurück (SQLite-Datei results.sqlite).
+    """
+    key = os.path.abspath(storage_path)
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = ResultCache(os.path.join(storage_path, "results.sqlite"))
+            _caches[key] = cache
+        return cache
@@ -0,0 +1,185 @@
+# result_cube.py
+"""
+Kennzahlen aller bewerteten Zellen einer Optimierung als dichter Würfel: eine Achse pro Dimension des
+Suchraums (lookback, drop, hold, take_profit, fee) und zuletzt eine Achse für die Kennzahl.
+
+Die Werte liegen als float32 vor. Nicht bewertete Zellen (random, halving, coarse_to_fine) sind NaN,
+ein Profit Factor ohne Verlust-Trades ist +inf. pivot() reduziert den Würfel serverseitig auf die
+gewünschten Achsen (z.B. drop x hold, Mittelwert über take_profit), etwa für eine Heatmap.
+"""
+import json
+import warnings
+
+import numpy as np
+
+
+CUBE_METRICS = ("roi", "profit", "trades", "win_rate", "profit_factor", "max_drawdown", "exposure", "sharpe")
+
+# Zusammenfassung der nicht gewählten Achsen, NaN (nicht bewertet) wird ignoriert
+AGGREGATES = {"mean": np.nanmean, "max": np.nanmax, "min": np.nanmin, "median": np.nanmedian}
+
+METRIC_AXIS = "metric"
+
+
+def _metric_value(metrics, name):
+    value = metrics[name]
+    if value is None:
+        # Profit Factor ohne Verlust-Trades (siehe performance.portfolio_metrics)
+        return np.inf if metrics["gross_profit"] > 0 else np.nan
+    return value
+
+
+class ResultCube:
+    """
+    Würfel der Kennzahlen: data hat die Form (len(values[0]), ..., len(metrics)).
+    names/values beschriften die Parameter-Achsen, metrics die letzte Achse.
+    """
+    __slots__ = ("names", "values", "metrics", "data")
+
+    def __init__(self, names, values, metrics, data):
+        self.names = list(names)
+        self.values = [list(v) for v in values]
+        self.metrics = list(metrics)
+        self.data = data
+
+    @classmethod
+    def from_search(cls, space, metrics_by_index, metrics=CUBE_METRICS):
+        """
+        Aus dem SearchSpace und den Kennzahlen pro flachem Zell-Index (SearchResult.metrics).
+        """
+        data = np.full(space.shape + (len(metrics),), np.nan, dtype=np.float32)
+        flat = data.reshape(-1, len(metrics))
+        for index, cell_metrics in metrics_by_index.items():
+            flat[index] = [_metric_value(cell_metrics, name) for name in metrics]
+        return cls(space.names, space.values, metrics, data)
+
+    @property
+    def dims(self):
+        return self.names + [METRIC_AXIS]
+
+    @property
+    def axes(self):
+        return dict(zip(self.dims, self.values + [self.metrics]))
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes
+
+    def _axis(self, name):
+        if name not in self.names:
+            raise ValueError(f"Unbekannte Achse: {name}. Erlaubt: {', '.join(self.names)}")
+        return self.names.index(name)
+
+    def pivot(self, dims, metrics=None, aggregate="mean", select=None):
+        """
+        Reduziert den Würfel auf die Achsen dims (in dieser Reihenfolge) und die Kennzahlen metrics
+        (Standard: alle). Die übrigen Achsen werden mit aggregate zusammengefasst, select {Achse: Wert}
+        hält Achsen vorher auf einem Wert fest. Gibt einen neuen ResultCube zurück.
+        """
+        if aggregate not in AGGREGATES:
+            raise ValueError(f"Unbekannte Aggregation: {aggregate}. Erlaubt: {', '.join(AGGREGATES)}")
+        keep = [self._axis(name) for name in dims]
+        if len(set(keep)) != len(keep):
+            raise ValueError("Jede Achse darf nur einmal gewählt werden.")
+        metrics = list(metrics or self.metrics)
+        unknown = [m for m in metrics if m not in self.metrics]
+        if unknown:
+            raise ValueError(f"Unbekannte Kennzahl: {', '.join(unknown)}. Erlaubt: {', '.join(self.metrics)}")
+
+        data = self.data[..., [self.metrics.index(m) for m in metrics]]
+        values = list(self.values)
+        for name, value in (select or {}).items():
+            axis = self._axis(name)
+            matches = [pos for pos, v in enumerate(values[axis]) if float(v) == float(value)]
+            if not matches:
+                raise ValueError(f"{name}={value} ist kein Wert der Achse ({values[axis]}).")
+            data = np.take(data, matches[:1], axis=axis)
+            values[axis] = [values[axis][matches[0]]]
+
+        reduce_axes = tuple(axis for axis in range(len(self.names)) if axis not in keep)
+        if reduce_axes:
+            # Zellen, die über alle zusammengefassten Achsen NaN sind, bleiben NaN (ohne Warnung)
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)
+                data = AGGREGATES[aggregate](data, axis=reduce_axes)
+        remaining = sorted(keep)
+        data = data.transpose([remaining.index(axis) for axis in keep] + [len(keep)])
+
+        return ResultCube(
+            [self.names[axis] for axis in keep],
+            [values[axis] for axis in keep],
+            metrics,
+            np.ascontiguousarray(data, dtype=np.float32),
+        )
+
+    def to_columnar(self, decimals=4):
+        """
+        JSON-Darstellung: Achsen mit Beschriftung, Form und die Werte flach in C-Reihenfolge
+        (letzte Achse läuft am schnellsten). Nicht endliche Werte werden zu None.
+        """
+        flat = np.round(self.data.astype(np.float64).ravel(), decimals)
+        finite = np.isfinite(flat)
+        values = flat.tolist()
+        if not finite.all():
+            values = [v if ok else None for v, ok in zip(values, finite.tolist())]
+        return {
+            "dims": self.dims,
+            "axes": self.axes,
+            "shape": list(self.data.shape),
+            "dtype": "float32",
+            "values": values,
+        }
+
+    def to_binary(self):
+        """
+        (Bytes, Header): float32 little-endian in C-Reihenfolge, Form und Beschriftung in den Headern.
+        """
+        headers = {
+            "X-Cube-Dims": ",".join(self.dims),
+            "X-Cube-Shape": ",".join(str(n) for n in self.data.shape),
+            "X-Cube-Axes": json.dumps(self.axes, separators=(",", ":")),
+            "X-Cube-Dtype": "float32-le",
+        }
+        return self.data.astype("<f4").tobytes(), headers
+
+
+# --- Testbereich ---
+if __name__ == "__main__":
+    from grid_executor import GridExecutor
+    from search import SearchSpace, run_search
+
+    tickers = ["^GDAXI", "^GSPC", "MSFT", "IBM", "SIE.DE", "NVDA", "TSLA"]
+    space = SearchSpace({
+        "lookback": [3],
+        "drop": [2.5, 3.0, 4.0, 5.0, 6.0, 8.0, 10.0, 12.0],
+        "hold": [5, 10, 20, 40],
+        "take_profit": [2.0, 4.0, 6.0, 8.0],
+        "fee": [0.001],
+    })
+    with GridExecutor(max_workers=1) as executor:
+        def evaluate(cells, ticker_subset):
+            metrics = [None] * len(cells)
+            for cell_idx, cell_metrics in executor.evaluate(cells, ticker_subset, 10000):
+                metrics[cell_idx] = cell_metrics
+            return metrics
+
+        result = run_search("grid", space, evaluate, tickers)
+
+    cube = ResultCube.from_search(space, result.metrics)
+    print(f"Würfel {cube.dims} {cube.data.shape}, {cube.nbytes} Bytes")
+
+    # Heatmap drop x hold, Mittelwert über take_profit (wie plotting.plot_heatmap)
+    heatmap = cube.pivot(["drop", "hold"], ["roi"])
+    for drop, row in zip(heatmap.values[0], heatmap.data[..., 0]):
+        expected = [np.mean([m["roi"] for i, m in result.metrics.items()
+                             if space.cell(i)["drop"] == drop and space.cell(i)["hold"] == hold])
+                    for hold in heatmap.values[1]]
+        assert np.allclose(row, expected, rtol=1e-5), drop
+    print("Pivot drop x hold (Mittel über TP) geprüft.")
+
+    fixed = cube.pivot(["hold", "drop"], ["roi", "sharpe"], select={"take_profit": 4.0})
+    assert fixed.data.shape == (4, 8, 2)
+    payload, headers = fixed.to_binary()
+    assert len(payload) == fixed.nbytes
+    print(headers)
+    print(json.dumps(cube.pivot([], ["roi"], aggregate="max").to_columnar()))
@@ -0,0 +1,166 @@
+# robustness.py
+"""
+Robustheit eines Parameter-Sets per Monte Carlo über seine Trades:
+- Bootstrap: so viele Trades wie im Original mit Zurücklegen ziehen -> Streuung von ROI, Trefferquote
+  und Max Drawdown
+- Shuffle: die Reihenfolge der Trades vertauschen -> ROI und Trefferquote bleiben gleich, nur der
+  Drawdown hängt von der Reihenfolge ab
+
+Alle Stichproben eines Blocks laufen als eine Matrix (Stichprobe x Trade) durch NumPy, ohne Schleife
+pro Stichprobe. Der Drawdown wird wie in performance.py auf die realisierte Equity (Startkapital plus
+kumulierte Gewinne) bezogen und auf 100 % begrenzt, hier pro Trade statt pro Exit-Tag.
+"""
+import numpy as np
+
+
+DEFAULT_RESAMPLES = 10_000
+# Der Shuffle ist optional: er streut nur den Drawdown, eine Permutation kostet etwa so viel wie fünf Ziehungen
+DEFAULT_SHUFFLES = 0
+DEFAULT_CONFIDENCE = 0.9
+
+# Matrix-Elemente pro Block: klein genug für den Cache, groß genug, damit der Python-Overhead nicht zählt
+BLOCK_ELEMENTS = 250_000
+
+
+def trade_profits(trades):
+    """
+    Gewinne (profit_abs) aus Trade-Dicts in der Reihenfolge der Verkaufstage.
+    """
+    ordered = sorted(trades, key=lambda trade: trade["sell_date"])
+    return np.array([trade["profit_abs"] for trade in ordered], dtype=np.float64)
+
+
+def merged_profits(parts):
+    """
+    Gewinne aus den TradeStats mehrerer Ticker, nach Exit-Tag zusammengeführt.
+    """
+    parts = [p for p in parts if p.count]
+    if not parts:
+        return np.empty(0, dtype=np.float64)
+    days = np.concatenate([p.exit_days for p in parts])
+    order = np.argsort(days, kind="stable")
+    return np.concatenate([p.exit_profits for p in parts])[order].astype(np.float64)
+
+
+def path_drawdowns(paths):
+    """
+    Max Drawdown in Prozent pro Zeile. Jede Zeile beginnt mit dem Startkapital, danach folgen die Trade-Gewinne:
+    Die kumulierte Summe ist direkt die Equity und das laufende Hoch nie kleiner als das Startkapital.
+    Equity unter null zählt als null (höchstens 100 %). Überschreibt paths.
+    """
+    equity = np.cumsum(paths, axis=1, out=paths)
+    peak = np.maximum.accumulate(equity, axis=1)
+    equity /= peak
+    return (1 - np.maximum(equity.min(axis=1), 0)) * 100
+
+
+def _interval(values, confidence):
+    tail = (1 - confidence) / 2 * 100
+    low, median, high = np.percentile(values, [tail, 50, 100 - tail])
+    return {"low": float(low), "median": float(median), "high": float(high)}
+
+
+def bootstrap_trades(profits, initial_capital=10000, resamples=DEFAULT_RESAMPLES, shuffles=DEFAULT_SHUFFLES,
+                     confidence=DEFAULT_CONFIDENCE, seed=0):
+    """
+    Bootstrap (resamples Stichproben) und Shuffle (shuffles Permutationen, 0 = aus)
+    über die Trade-Gewinne (profit_abs, in Handelsreihenfolge).
+    Gibt Konfidenzintervalle {low, median, high} für roi, win_rate, max_drawdown (Bootstrap) und
+    shuffled_max_drawdown (nur Reihenfolge vertauscht) zurück, dazu prob_loss (Anteil der Bootstrap-Stichproben
+    mit negativem ROI). Ohne Trades None.
+    Die Equity-Pfade rechnen in float32, die Abweichung liegt weit unter der Breite der Intervalle.
+    """
+    profits = np.asarray(profits, dtype=np.float64)
+    n = len(profits)
+    if n == 0:
+        return None
+
+    rng = np.random.default_rng(seed)
+    # Index 0 ist das Startkapital, 1..n die Trades
+    values = np.concatenate([[initial_capital], profits]).astype(np.float32)
+    roi = np.empty(resamples)
+    win_rate = np.empty(resamples)
+    drawdown = np.empty(resamples)
+    shuffled = np.empty(shuffles)
+    block = max(1, BLOCK_ELEMENTS // (n + 1))
+
+    for start in range(0, resamples, block):
+        stop = min(start + block, resamples)
+        idx = rng.integers(1, n + 1, size=(stop - start, n + 1))
+        idx[:, 0] = 0
+        paths = values[idx]
+        roi[start:stop] = paths[:, 1:].sum(axis=1, dtype=np.float64) / initial_capital * 100
+        win_rate[start:stop] = np.count_nonzero(paths[:, 1:] > 0, axis=1) / n * 100
+        drawdown[start:stop] = path_drawdowns(paths)
+
+    for start in range(0, shuffles, block):
+        stop = min(start + block, shuffles)
+        # Gleichverteilte Permutation pro Zeile, das Startkapital bleibt vorn
+        paths = np.tile(values, (stop - start, 1))
+        rng.permuted(paths[:, 1:], axis=1, out=paths[:, 1:])
+        shuffled[start:stop] = path_drawdowns(paths)
+
+    return {
+        "trades": n,
+        "resamples": resamples,
+        "shuffles": shuffles,
+        "confidence": confidence,
+        "roi": _interval(roi, confidence),
+        "win_rate": _interval(win_rate, confidence),
+        "max_drawdown": _interval(drawdown, confidence),
+        "shuffled_max_drawdown": _interval(shuffled, confidence) if shuffles else None,
+        "prob_loss": float((roi < 0).mean()),
+    }
+
+
+# --- Testbereich ---
+if __name__ == "__main__":
+    import time
+    from performance import _drawdown_pct
+    from strategy import MeanReversionStrategy
+
+    BUDGET_S = 1.0
+
+    # Drawdown pro Zeile gegen die Einzelberechnung aus performance.py (jeder Trade ein eigener Tag)
+    rng = np.random.default_rng(1)
+    paths = rng.normal(5, 300, size=(50, 400))
+    expected = [_drawdown_pct(np.arange(400), row, 10000) for row in paths]
+    assert np.allclose(path_drawdowns(np.hstack([np.full((50, 1), 10000.0), paths])), expected)
+
+    tickers = ["^GDAXI", "^GSPC", "MSFT", "IBM", "SIE.DE", "NVDA", "TSLA"]
+    bot = MeanReversionStrategy(initial_capital=10000)
+    trades = bot.run_portfolio(tickers, {"drop": 2.5, "lookback": 3, "hold": 20, "take_profit": 4.0, "fee": 0.001})
+    profits = trade_profits(trades)
+
+    # Jede Permutation der Trades ist gleich wahrscheinlich: Position jedes Trades gleichverteilt
+    permuted = np.tile(np.arange(4, dtype=np.float32), (60_000, 1))
+    rng.permuted(permuted[:, 1:], axis=1, out=permuted[:, 1:])
+    assert (permuted[:, 0] == 0).all()
+    frequencies = np.stack([(permuted[:, 1:] == value).mean(axis=0) for value in (1, 2, 3)])
+    assert np.allclose(frequencies, 1 / 3, atol=0.01), frequencies
+
+    bootstrap_trades(profits[:100], resamples=100)
+    start = time.perf_counter()
+    result = bootstrap_trades(profits, shuffles=1000)
+    elapsed = time.perf_counter() - start
+    start = time.perf_counter()
+    bootstrap_trades(profits)
+    elapsed_bootstrap = time.perf_counter() - start
+    observed_roi = profits.sum() / 10000 * 100
+    assert result["roi"]["low"] < observed_roi < result["roi"]["high"]
+    assert abs(result["win_rate"]["median"] - (profits > 0).mean() * 100) < 1.0
+    assert bootstrap_trades(profits, seed=3) == bootstrap_trades(profits, seed=3)
+    print(f"{result['resamples']} Stichproben + {result['shuffles']} Permutationen über {result['trades']} Trades "
+          f"in {elapsed * 1000:.0f}ms (nur Bootstrap {elapsed_bootstrap * 1000:.0f}ms), ROI beobachtet {observed_roi:.1f}%")
+    for key in ("roi", "win_rate", "max_drawdown", "shuffled_max_drawdown"):
+        interval = result[key]
+        print(f"  {key:22s} {interval['low']:9.2f} {interval['median']:9.2f} {interval['high']:9.2f}")
+    print(f"  Verlustwahrscheinlichkeit {result['prob_loss']:.3f}")
+
+    # Zeitbudget mit den Standardwerten über 3000 Trades (so läuft es inline in /optimize)
+    synthetic = rng.normal(5, 300, size=3000)
+    start = time.perf_counter()
+    bootstrap_trades(synthetic)
+    elapsed = time.perf_counter() - start
+    print(f"Standardwerte über {len(synthetic)} Trades: {elapsed * 1000:.0f}ms")
+    assert elapsed < BUDGET_S, f"{elapsed:.2f}s > {BUDGET_S}s"
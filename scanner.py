@@ -0,0 +1,254 @@
+# scanner.py
+"""
+Live-Scanner: verarbeitet pro Ticker einen neuen Bar nach dem anderen in O(1) und meldet Signale
+nach denselben Regeln wie MeanReversionStrategy.backtest:
+- Signal, wenn der Schlusskurs über lookback Tage um mehr als drop % gefallen ist -> Kauf zum nächsten Open
+- kein Einstieg, solange eine Position offen ist (und nicht am Exit-Tag der vorigen Position)
+- Take Profit, sobald das High das Ziel erreicht (Verkauf zum Ziel, bei Gap über das Ziel zum Open,
+  am Einstiegstag immer zum Ziel), sonst Time Stop zum Schluss des hold-ten Tages
+
+Pro Ticker liegen nur ein Ringpuffer der letzten lookback Schlusskurse, das Signal des Vortags und
+die offene Position im Speicher. Unterschied zum Backtest: Der Backtest kennt nur abgeschlossene Trades.
+Läuft am Datenende noch eine Position, kann er einen späteren Trade enthalten, den der Scanner wegen der
+offenen Position nicht eröffnet.
+"""
+import threading
+from collections import deque
+
+import numpy as np
+
+from backtest_engine import EXIT_REASONS, EXIT_TAKE_PROFIT, EXIT_TIME_STOP
+
+
+class TickerScanner:
+    """
+    Zustand eines Tickers für ein Parameter-Set. update() verarbeitet genau einen Bar.
+    """
+
+    def __init__(self, ticker, drop, lookback, hold, take_profit, fee=0.001, initial_capital=10000):
+        self.ticker = ticker
+        self.threshold = -(drop / 100)
+        self.lookback = lookback
+        self.hold = hold
+        self.take_profit = take_profit
+        self.fee = fee
+        self.initial_capital = initial_capital
+
+        self.closes = deque(maxlen=lookback)
+        self.index = -1
+        self.last_date = None
+        self.last_close = None
+        self.change = None
+        # Signal am letzten Schlusskurs: Kauf zum nächsten Open
+        self.signal = False
+        # Offene Position: (Einstiegs-Index, Einstiegsdatum, Einstiegskurs, Ziel)
+        self.position = None
+        # Ereignisse des zuletzt verarbeiteten Bars
+        self.last_events = []
+
+    def update(self, date, open_, high, close):
+        """
+        Verarbeitet den nächsten Bar (date als "YYYY-MM-DD"). Gibt die Ereignisse dieses Bars zurück:
+        "entry" (Kauf zum Open), "exit" (Trade-Dict wie im Backtest) und "signal" (Kauf zum nächsten Open).
+        """
+        self.index += 1
+        events = []
+
+        if self.signal and self.position is None:
+            target = open_ * (1 + self.take_profit / 100)
+            self.position = (self.index, date, open_, target)
+            events.append({"event": "entry", "ticker": self.ticker, "date": date, "price": float(np.round(open_, 2))})
+
+        if self.position is not None:
+            trade = self._check_exit(date, open_, high, close)
+            if trade is not None:
+                self.position = None
+                events.append(dict(trade, event="exit"))
+
+        # Kursänderung über lookback Tage aus dem Ringpuffer (ältester Eintrag = Schluss vor lookback Tagen)
+        self.change = None
+        if len(self.closes) == self.lookback and self.lookback > 0:
+            previous = self.closes[0]
+            if previous == previous and previous != 0:
+                self.change = close / previous - 1
+        self.closes.append(close)
+        self.last_date = date
+        self.last_close = close
+
+        # Nach einem Exit am selben Tag ist ein Einstieg am nächsten Tag wieder erlaubt
+        self.signal = self.change is not None and self.change < self.threshold and self.position is None
+        if self.signal:
+            events.append({
+                "event": "signal",
+                "ticker": self.ticker,
+                "date": date,
+                "change_pct": float(np.round(self.change * 100, 2)),
+            })
+        self.last_events = events
+        return events
+
+    def _check_exit(self, date, open_, high, close):
+        entry_idx, entry_date, entry_price, target = self.position
+        days_held = self.index - entry_idx
+        if high >= target:
+            # Eröffnet der Kurs über dem Ziel (nicht am Einstiegstag), wird zum Open verkauft
+            exit_price = open_ if days_held > 0 and open_ > target else target
+            reason = EXIT_TAKE_PROFIT
+        elif days_held == self.hold - 1:
+            exit_price = close
+            reason = EXIT_TIME_STOP
+        else:
+            return None
+
+        effective_entry = entry_price * (1 + self.fee)
+        profit_pct = (exit_price * (1 - self.fee) - effective_entry) / effective_entry
+        return {
+            "ticker": self.ticker,
+            "buy_date": entry_date,
+            "sell_date": date,
+            "days_held": days_held,
+            "exit_reason": EXIT_REASONS[reason],
+            "entry_price": float(np.round(entry_price, 2)),
+            "exit_price": float(np.round(exit_price, 2)),
+            "profit_pct": float(np.round(profit_pct * 100, 2)),
+            "profit_abs": float(np.round(self.initial_capital * profit_pct, 2)),
+        }
+
+    def feed(self, data, start=0):
+        """
+        Verarbeitet die Bars ab Position start einer PriceData, gibt alle Ereignisse zurück.
+        """
+        dates = np.datetime_as_string(data.dates[start:], unit="D").tolist()
+        rows = zip(dates, data.open[start:].tolist(), data.high[start:].tolist(), data.close[start:].tolist())
+        events = []
+        for date, open_, high, close in rows:
+            events.extend(self.update(date, open_, high, close))
+        return events
+
+    def snapshot(self):
+        """
+        Aktueller Stand: Signal für den nächsten Open und offene Position (Ziel, Tage bis zum Time Stop).
+        """
+        position = None
+        if self.position is not None:
+            entry_idx, entry_date, entry_price, target = self.position
+            days_held = self.index - entry_idx
+            position = {
+                "buy_date": entry_date,
+                "entry_price": float(np.round(entry_price, 2)),
+                "target_price": float(np.round(target, 2)),
+                "days_held": days_held,
+                "days_to_time_stop": self.hold - 1 - days_held,
+                "unrealized_pct": float(np.round((self.last_close / entry_price - 1) * 100, 2)),
+            }
+        return {
+            "ticker": self.ticker,
+            "date": self.last_date,
+            "close": None if self.last_close is None else float(np.round(self.last_close, 2)),
+            "change_pct": None if self.change is None else float(np.round(self.change * 100, 2)),
+            "signal": self.signal,
+            "position": position,
+            "events": self.last_events,
+        }
+
+
+class SignalScanner:
+    """
+    Scanner für eine Watchlist und ein Parameter-Set. Beim ersten Abruf eines Tickers wird die Historie
+    einmal durchgespielt, danach kommen nur noch neue Bars hinzu (z.B. nach DataManager.refresh_data).
+    Ändert sich die Historie selbst (Split-Adjustierung), wird der Ticker neu aufgebaut.
+    """
+
+    def __init__(self, drop, lookback, hold, take_profit, fee=0.001, initial_capital=10000):
+        self.params = (drop, lookback, hold, take_profit, fee, initial_capital)
+        self._tickers = {}
+        self._lock = threading.Lock()
+
+    def sync(self, ticker, data):
+        """
+        Bringt den Ticker auf den Stand der PriceData und gibt die Ereignisse der neuen Bars zurück.
+        """
+        with self._lock:
+            scanner = self._tickers.get(ticker)
+            if scanner is not None and not self._continues(scanner, data):
+                scanner = None
+            if scanner is None:
+                scanner = TickerScanner(ticker, *self.params)
+                self._tickers[ticker] = scanner
+            return scanner.feed(data, scanner.index + 1)
+
+    @staticmethod
+    def _continues(scanner, data):
+        # Die neue Reihe muss den bisher verarbeiteten letzten Bar unverändert enthalten
+        last = scanner.index
+        if last < 0:
+            return True
+        if last >= len(data):
+            return False
+        return (
+            str(np.datetime64(data.dates[last], "D")) == scanner.last_date
+            and data.close[last] == scanner.last_close
+        )
+
+    def snapshot(self, ticker):
+        with self._lock:
+            scanner = self._tickers.get(ticker)
+            return None if scanner is None else scanner.snapshot()
+
+
+# --- Testbereich ---
+if __name__ == "__main__":
+    import glob
+    import os
+    import time
+    from strategy import MeanReversionStrategy
+    from price_store import get_price_store
+
+    # Replay: Bar für Bar über data_cache gegen den vollständigen Backtest
+    tickers = sorted(os.path.basename(p)[:-4] for p in glob.glob(os.path.join("data_cache", "*.csv")))
+    param_sets = [
+        {"drop": 10.0, "lookback": 15, "hold": 780, "take_profit": 5.0, "fee": 0.001},
+        {"drop": 3.0, "lookback": 3, "hold": 20, "take_profit": 4.0, "fee": 0.001},
+        {"drop": 2.0, "lookback": 1, "hold": 1, "take_profit": 1.0, "fee": 0.0},
+        {"drop": 5.0, "lookback": 5, "hold": 10, "take_profit": 8.0, "fee": 0.002},
+    ]
+    store = get_price_store()
+    bot = MeanReversionStrategy(initial_capital=10000)
+    checked = 0
+    start = time.perf_counter()
+    bars = 0
+    for ticker in tickers:
+        data = store.get(ticker)
+        for params in param_sets:
+            scanner = TickerScanner(ticker, params["drop"], params["lookback"], params["hold"],
+                                    params["take_profit"], params["fee"])
+            events = scanner.feed(data)
+            bars += len(data)
+            closed = [{k: v for k, v in e.items() if k != "event"} for e in events if e["event"] == "exit"]
+            expected = bot.backtest(ticker, params["drop"], params["lookback"], params["hold"],
+                                    params["take_profit"], params["fee"])
+            assert closed == expected[:len(closed)], (ticker, params)
+            # Zusätzliche Backtest-Trades gibt es nur hinter einer am Datenende noch offenen Position
+            extra = expected[len(closed):]
+            if extra:
+                assert scanner.position is not None and all(t["buy_date"] > scanner.position[1] for t in extra)
+            checked += 1
+    elapsed = time.perf_counter() - start
+    print(f"Replay geprüft: {checked} Kombinationen identisch ({bars / elapsed / 1e6:.2f} Mio. Bars/s inkl. Backtest).")
+
+    # Inkrementell: Historie ohne die letzten 50 Bars, dann Bar für Bar nachliefern
+    from price_store import PriceData
+    data = store.get("MSFT")
+    cut = len(data) - 50
+    head = PriceData("MSFT", data.dates[:cut], data.open[:cut], data.high[:cut], data.low[:cut], data.close[:cut])
+    live = SignalScanner(3.0, 3, 20, 4.0)
+    live.sync("MSFT", head)
+    start = time.perf_counter()
+    for end in range(cut + 1, len(data) + 1):
+        part = PriceData("MSFT", data.dates[:end], data.open[:end], data.high[:end], data.low[:end], data.close[:end])
+        live.sync("MSFT", part)
+    per_bar = (time.perf_counter() - start) / 50
+    full = SignalScanner(3.0, 3, 20, 4.0)
+    full.sync("MSFT", data)
+    assert live.snapshot("MSFT") == full.snapshot("MSFT")
+    print(f"Inkrementelles Update: {per_bar * 1e6:.0f}µs pro Bar, Stand {live.snapshot('MSFT')}")
@@ -0,0 +1,288 @@
+# search.py
+"""
+Suchstrategien über den Parameterraum der Grid Search.
+
+- grid: vollständiges kartesisches Produkt (bisheriges Verhalten)
+- random: zufällige Auswahl von budget Zellen
+- halving: Successive Halving, bewertet viele Zellen auf wenigen Tickern und befördert das beste Drittel
+  auf mehr Ticker, bis die Finalisten auf allen Tickern laufen
+- coarse_to_fine: grobes Raster über jede Dimension, danach Verfeinerung um die beste Zelle
+
+Alle Strategien sind bei gleichem seed deterministisch. Zellen werden über ihren flachen Index im
+kartesischen Produkt adressiert (letzte Dimension läuft am schnellsten, wie die verschachtelte Schleife),
+bei gleichem Wert gewinnt wie bisher die zuerst aufgezählte Zelle.
+"""
+import itertools
+import math
+
+import numpy as np
+
+from performance import rank_score
+
+
+SEARCH_STRATEGIES = ("grid", "random", "halving", "coarse_to_fine")
+
+# Standard-Budget (Zellen auf allen Tickern), entspricht einem 4x4x4-Grid
+DEFAULT_BUDGET = 64
+
+# Successive Halving: pro Stufe bleibt 1/HALVING_ETA der Zellen übrig, die Ticker-Anzahl wächst um diesen Faktor
+HALVING_ETA = 3
+
+# Coarse-to-fine: Punkte pro Dimension im ersten, groben Raster (höchstens)
+COARSE_POINTS = 3
+
+
+class SearchSpace:
+    """
+    Kartesisches Produkt der Optionen pro Dimension (z.B. drop, hold, take_profit),
+    dazu feste Parameter, die in jede Zelle übernommen werden.
+    """
+
+    def __init__(self, dimensions, fixed=None):
+        self.names = list(dimensions)
+        self.values = [list(values) for values in dimensions.values()]
+        self.fixed = dict(fixed or {})
+        self.shape = tuple(len(values) for values in self.values)
+        self.size = math.prod(self.shape) if self.shape else 0
+
+    def coords(self, index):
+        return tuple(int(c) for c in np.unravel_index(index, self.shape))
+
+    def index(self, coords):
+        return int(np.ravel_multi_index(coords, self.shape))
+
+    def cell(self, index):
+        params = dict(self.fixed)
+        for name, values, coord in zip(self.names, self.values, self.coords(index)):
+            params[name] = values[coord]
+        return params
+
+    def cells(self, indices):
+        return [self.cell(index) for index in indices]
+
+
+class SearchResult:
+    """
+    Ergebnis einer Suche: Kennzahlen aller Zellen, die auf allen Tickern bewertet wurden,
+    sowie die Anzahl der Auswertungen (Zellen insgesamt und (Ticker, Zelle)-Paare).
+    """
+
+    def __init__(self, strategy, space):
+        self.strategy = strategy
+        self.space = space
+        self.metrics = {}
+        self.cells_evaluated = 0
+        self.pair_evaluations = 0
+
+    def best(self, rank_by="roi"):
+        """
+        Flacher Index der besten Zelle (bei Gleichstand die zuerst aufgezählte) oder None.
+        """
+        best_index = None
+        best_score = None
+        for index in sorted(self.metrics):
+            score = rank_score(self.metrics[index], rank_by)
+            if best_index is None or score > best_score:
+                best_index = index
+                best_score = score
+        return best_index
+
+    def top(self, rank_by="roi", n=1):
+        """
+        Flache Indizes der besten n Zellen, beste zuerst (bei Gleichstand die zuerst aufgezählte).
+        """
+        ranked = sorted(self.metrics, key=lambda index: (-rank_score(self.metrics[index], rank_by), index))
+        return ranked[:n]
+
+
+class _Evaluator:
+    """
+    Bewertet Zellen über die evaluate-Funktion des Aufrufers und führt Buch über die Auswertungen.
+    evaluate(cells, tickers) muss die Kennzahlen in der Reihenfolge der Zellen zurückgeben.
+    """
+
+    def __init__(self, space, evaluate, tickers, result):
+        self.space = space
+        self.evaluate = evaluate
+        self.tickers = list(tickers)
+        self.result = result
+
+    def __call__(self, indices, tickers=None):
+        indices = list(indices)
+        tickers = self.tickers if tickers is None else list(tickers)
+        if not indices:
+            return []
+        metrics = self.evaluate(self.space.cells(indices), tickers)
+        self.result.cells_evaluated += len(indices)
+        self.result.pair_evaluations += len(indices) * len(tickers)
+        if tickers == self.tickers:
+            self.result.metrics.update(zip(indices, metrics))
+        return metrics
+
+
+def grid_search(space, evaluate, tickers, budget, rng, rank_by):
+    evaluate(range(space.size))
+
+
+def random_search(space, evaluate, tickers, budget, rng, rank_by):
+    count = min(budget, space.size)
+    evaluate(np.sort(rng.choice(space.size, size=count, replace=False)).tolist())
+
+
+def halving_plan(size, n_tickers, budget):
+    """
+    Stufen des Successive Halving als Liste (Anzahl Zellen, Anzahl Ticker).
+    Die Zellenzahl der ersten Stufe ist so gewählt, dass alle Stufen zusammen etwa
+    budget Zellen auf allen Tickern kosten.
+    """
+    if size == 0:
+        return []
+    rungs = 1
+    while n_tickers >= HALVING_ETA ** rungs:
+        rungs += 1
+    fidelities = [max(1, math.ceil(n_tickers / HALVING_ETA ** (rungs - 1 - k))) for k in range(rungs)]
+
+    cost_per_cell = sum(f / HALVING_ETA ** k for k, f in enumerate(fidelities)) / max(n_tickers, 1)
+    count = min(size, max(1, int(budget / cost_per_cell)))
+
+    plan = []
+    for fidelity in fidelities:
+        plan.append((count, fidelity))
+        count = max(1, math.ceil(count / HALVING_ETA))
+    return plan
+
+
+def successive_halving(space, evaluate, tickers, budget, rng, rank_by):
+    """
+    Bewertet viele Zellen auf einer Teilmenge der Ticker und befördert jeweils das beste Drittel.
+    Die Teilmengen sind Präfixe einer (per seed) gemischten Ticker-Reihenfolge, die letzte Stufe
+    nutzt alle Ticker in der Original-Reihenfolge.
+    """
+    plan = halving_plan(space.size, len(tickers), budget)
+    if not plan:
+        return
+    shuffled = [tickers[i] for i in rng.permutation(len(tickers))]
+    candidates = np.sort(rng.choice(space.size, size=plan[0][0], replace=False)).tolist()
+
+    for rung, (_, fidelity) in enumerate(plan):
+        last = rung == len(plan) - 1
+        metrics = evaluate(candidates, None if last or fidelity >= len(tickers) else shuffled[:fidelity])
+        if last:
+            break
+        keep = plan[rung + 1][0]
+        ranked = sorted(range(len(candidates)), key=lambda j: (-rank_score(metrics[j], rank_by), candidates[j]))
+        candidates = sorted(candidates[j] for j in ranked[:keep])
+
+
+def coarse_to_fine(space, evaluate, tickers, budget, rng, rank_by):
+    """
+    Grobes Raster (höchstens COARSE_POINTS Werte pro Dimension, nach Wert sortiert), danach wird die
+    Schrittweite um die beste Zelle halbiert, bis die direkten Nachbarn bewertet sind oder das Budget aufgebraucht ist.
+    """
+    if space.size == 0:
+        return
+    result = evaluate.result
+    # Rang (nach Wert sortiert) -> Position in der Options-Liste
+    orders = [np.argsort(values, kind="stable").tolist() for values in space.values]
+    ranks_of = [{pos: rank for rank, pos in enumerate(order)} for order in orders]
+
+    def flat(ranks):
+        return space.index(tuple(order[r] for order, r in zip(orders, ranks)))
+
+    # Dimensionen mit nur einem Wert zählen für die Größe des groben Rasters nicht
+    varying = sum(1 for length in space.shape if length > 1)
+    points = COARSE_POINTS
+    while points > 2 and points ** varying > budget:
+        points -= 1
+    strides = [max(1, math.ceil((length - 1) / (points - 1))) for length in space.shape]
+    axes = [sorted(set(range(0, length, stride)) | {length - 1}) for length, stride in zip(space.shape, strides)]
+
+    evaluated = set()
+    candidates = [flat(ranks) for ranks in itertools.product(*axes)]
+    while candidates:
+        candidates = [index for index in dict.fromkeys(candidates) if index not in evaluated]
+        candidates = sorted(candidates[:max(0, budget - len(evaluated))])
+        if not candidates:
+            break
+        evaluate(candidates)
+        evaluated.update(candidates)
+
+        best_ranks = [ranks_of[d][c] for d, c in enumerate(space.coords(result.best(rank_by)))]
+        strides = [max(1, stride // 2) for stride in strides]
+        axes = [
+            [r for r in (best - stride, best, best + stride) if 0 <= r < length]
+            for best, stride, length in zip(best_ranks, strides, space.shape)
+        ]
+        candidates = [flat(ranks) for ranks in itertools.product(*axes)]
+
+
+STRATEGIES = {
+    "grid": grid_search,
+    "random": random_search,
+    "halving": successive_halving,
+    "coarse_to_fine": coarse_to_fine,
+}
+
+
+def planned_evaluations(strategy, size, n_tickers, budget=None):
+    """
+    Geplante Anzahl Zellen-Auswertungen (für Fortschrittsanzeigen). Coarse-to-fine kann früher enden.
+    """
+    budget = budget or DEFAULT_BUDGET
+    if strategy == "grid":
+        return size
+    if strategy == "halving":
+        return sum(count for count, _ in halving_plan(size, n_tickers, budget))
+    return min(budget, size)
+
+
+def run_search(strategy, space, evaluate, tickers, budget=None, seed=0, rank_by="roi"):
+    """
+    Führt eine Suchstrategie aus. budget: Anzahl Zellen auf allen Tickern (Standard DEFAULT_BUDGET),
+    wird von "grid" ignoriert. Gibt ein SearchResult zurück.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unbekannte Suchstrategie: {strategy}. Erlaubt: {', '.join(SEARCH_STRATEGIES)}")
+    result = SearchResult(strategy, space)
+    evaluator = _Evaluator(space, evaluate, tickers, result)
+    STRATEGIES[strategy](space, evaluator, list(tickers), budget or DEFAULT_BUDGET, np.random.default_rng(seed), rank_by)
+    return result
+
+
+# --- Testbereich ---
+if __name__ == "__main__":
+    import time
+    from grid_executor import GridExecutor
+
+    tickers = ["^GDAXI", "^GSPC", "MSFT", "IBM", "SIE.DE", "NVDA", "TSLA"]
+    space = SearchSpace({
+        "lookback": [3],
+        "drop": [1.5, 2.0, 2.5, 3.0, 4.0, 5.0, 6.0, 8.0, 10.0, 12.0],
+        "hold": [3, 5, 7, 10, 15, 20, 30, 40, 60, 80],
+        "take_profit": [1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 8.0, 10.0, 12.0, 15.0],
+        "fee": [0.001],
+    })
+
+    with GridExecutor(max_workers=1) as executor:
+        def evaluate(cells, subset):
+            metrics = [None] * len(cells)
+            for cell_idx, cell_metrics in executor.evaluate(cells, subset, 10000):
+                metrics[cell_idx] = cell_metrics
+            return metrics
+
+        start = time.perf_counter()
+        full = run_search("grid", space, evaluate, tickers)
+        reference = full.metrics[full.best()]["roi"]
+        print(f"grid: {full.cells_evaluated} Zellen, bestes ROI {reference:.2f}% ({time.perf_counter() - start:.2f}s)")
+
+        for strategy in SEARCH_STRATEGIES[1:]:
+            start = time.perf_counter()
+            result = run_search(strategy, space, evaluate, tickers, seed=42)
+            again = run_search(strategy, space, evaluate, tickers, seed=42)
+            assert again.best() == result.best() and again.cells_evaluated == result.cells_evaluated
+            best = result.best()
+            print(
+                f"{strategy}: {result.cells_evaluated} Zellen ({result.pair_evaluations} Ticker-Auswertungen), "
+                f"bestes ROI {result.metrics[best]['roi']:.2f}% = {result.metrics[best]['roi'] / reference:.0%} "
+                f"des Optimums, {space.cell(best)} ({time.perf_counter() - start:.2f}s für zwei Läufe)"
+            )
@@ -1,45 +1,112 @@
-import pandas as pd
+import logging
 import numpy as np
-import os
-import matplotlib.pyplot as plt
 from data_manager import DataManager
+from price_store import get_price_store
+from backtest_engine import backtest_arrays, EXIT_REASONS
+from feature_store import load_features
+from metrics import TRADES_GENERATED, timed
+
+logger = logging.getLogger(__name__)
+
+ENGINES = ("numpy", "pandas")
 
 
 class MeanReversionStrategy:
-    def __init__(self, initial_capital=10000):
+    def __init__(self, initial_capital=10000, engine="numpy", data_path="data_cache"):
+        """
+        engine: "numpy" (vektorisierte Engine auf den Roh-Arrays) oder "pandas" (ursprüngliche Schleife).
+        """
+        if engine not in ENGINES:
+            raise ValueError(f"Unbekannte Engine: {engine}. Erlaubt: {', '.join(ENGINES)}")
         self.initial_capital = initial_capital
-        self.data_path = "data_cache"  # Stelle sicher, dass der Ordner existiert
+        self.engine = engine
+        self.data_path = data_path  # Stelle sicher, dass der Ordner existiert
+        self.store = get_price_store(self.data_path)
 
-    def load_and_clean_data(self, ticker):
+    def load_price_data(self, ticker):
         """
-        Lädt die Daten und bereinigt die Daten
+        Gibt die bereinigten Kurs-Arrays (PriceData) aus dem PriceStore zurück.
         """
-        file_path = os.path.join(self.data_path, f"{ticker}.csv")
-        if not os.path.exists(file_path):
-            print(f"WARNUNG: Datei nicht gefunden: {file_path}")
-            return None
-
         try:
-            # Header=[0,1,2] ist wichtig für yfinance CSVs
-            df = pd.read_csv(file_path, header=[0, 1, 2], index_col=0, parse_dates=True)
-
-            clean_df = pd.DataFrame(index=df.index)
-            # Wir holen uns die erste Spalte unter dem jeweiligen Header
-            clean_df['Close'] = df['Close'].iloc[:, 0]
-            clean_df['Open'] = df['Open'].iloc[:, 0]
-            clean_df['High'] = df['High'].iloc[:, 0]
-
-            # Lücken füllen
-            clean_df.ffill(inplace=True)
-            return clean_df
+            data = self.store.get(ticker)
         except Exception as e:
-            print(f"Fehler beim Laden von {ticker}: {e}")
+            logger.error("Fehler beim Laden von %s: %s", ticker, e)
             return None
 
+        if data is None:
+            logger.warning("Keine Daten gefunden für %s in %s", ticker, self.data_path)
+        return data
+
+    def load_features(self, ticker):
+        """
+        Vorberechnete Merkmale (pct_change pro Lookback, Sprungtabellen für Take Profit) als
+        schreibgeschützte Arrays, oder None, wenn der Feature-Cache für den Ticker fehlt.
+        """
+        return load_features(self.data_path, self.load_price_data(ticker))
+
+    @timed("load_and_clean_data")
+    def load_and_clean_data(self, ticker):
+        """
+        Lädt die Daten und bereinigt die Daten.
+        Die CSV wird nur einmal pro Prozess geparst, danach kommen die Arrays aus dem PriceStore.
+        """
+        data = self.load_price_data(ticker)
+        if data is None:
+            return None
+        return data.to_frame()
+
+    @timed("backtest")
     def backtest(self, ticker, drop_threshold_pct, lookback_days, hold_days, take_profit_pct, fee_rate):
         """
         Führt den Backtest durch
         """
+        if self.engine == "pandas":
+            return self._backtest_pandas(ticker, drop_threshold_pct, lookback_days, hold_days, take_profit_pct, fee_rate)
+
+        data = self.load_price_data(ticker)
+        if data is None or len(data) == 0:
+            return []
+
+        features = load_features(self.data_path, data)
+        trades = backtest_arrays(data, drop_threshold_pct, lookback_days, hold_days, take_profit_pct, fee_rate, features)
+        TRADES_GENERATED.inc(len(trades), source="backtest")
+        return self.format_trades(ticker, data.dates, trades)
+
+    def format_trades(self, ticker, dates, trades):
+        """
+        Wandelt ein Trade-Array (TRADE_DTYPE) in die Trade-Dicts um, die auch die pandas-Engine liefert.
+        """
+        if len(trades) == 0:
+            return []
+
+        buy_dates = np.datetime_as_string(dates[trades["entry_idx"]], unit="D").tolist()
+        sell_dates = np.datetime_as_string(dates[trades["exit_idx"]], unit="D").tolist()
+        days_held = trades["days_held"].tolist()
+        exit_reasons = [EXIT_REASONS[r] for r in trades["exit_reason"].tolist()]
+        entry_prices = np.round(trades["entry_price"], 2).tolist()
+        exit_prices = np.round(trades["exit_price"], 2).tolist()
+        profit_pcts = np.round(trades["profit_pct"] * 100, 2).tolist()
+        profit_abs = np.round(self.initial_capital * trades["profit_pct"], 2).tolist()
+
+        return [
+            {
+                "ticker": ticker,
+                "buy_date": buy_dates[k],
+                "sell_date": sell_dates[k],
+                "days_held": days_held[k],
+                "exit_reason": exit_reasons[k],
+                "entry_price": entry_prices[k],
+                "exit_price": exit_prices[k],
+                "profit_pct": profit_pcts[k],
+                "profit_abs": profit_abs[k]
+            }
+            for k in range(len(trades))
+        ]
+
+    def _backtest_pandas(self, ticker, drop_threshold_pct, lookback_days, hold_days, take_profit_pct, fee_rate):
+        """
+        Ursprüngliche Engine: Schleife über alle Signale und Haltetage mit pandas-Zugriffen.
+        """
         df = self.load_and_clean_data(ticker)
         if df is None or df.empty:
             return []
@@ -134,13 +201,13 @@ class MeanReversionStrategy:
 
         return trades
 
+    @timed("run_portfolio")
     def run_portfolio(self, tickers, params):
         all_trades = []
         fee = params.get('fee', 0.001)
 
-        print(f"\n--- Starte Backtest ---")
-        print(f"Strategie: Next-Day-Open Entry nach {params['drop']}% Drop.")
-        print(f"Kosten: {fee * 100:.2f}% pro Order (Spread+Gebühr).")
+        logger.debug("Starte Backtest: Next-Day-Open Entry nach %s%% Drop.", params['drop'])
+        logger.debug("Kosten: %.2f%% pro Order (Spread+Gebühr).", fee * 100)
 
         for ticker in tickers:
             trades = self.backtest(
@@ -156,84 +223,20 @@ class MeanReversionStrategy:
         return all_trades
 
 
-def plot_equity_curve(trades_df, initial_capital):
-    """
-    Erstellt ein Diagramm für den Verlauf des Portfolios
-    """
-    if trades_df.empty:
-        print("Keine Trades zum Plotten.")
-        return
-
-    df_sorted = trades_df.sort_values("sell_date")
-
-    df_sorted['cumulative_profit'] = df_sorted['profit_abs'].cumsum()
-
-    df_sorted['equity'] = initial_capital + df_sorted['cumulative_profit']
-
-    start_date = df_sorted['sell_date'].min() - pd.Timedelta(days=1)
-
-    plt.figure(figsize=(12, 6))
-
-    plt.plot(df_sorted['sell_date'], df_sorted['equity'], label="Portfolio Wert", color="blue")
-
-    plt.axhline(y=initial_capital, color='r', linestyle='--', label="Startkapital")
-
-    plt.title("Portfolio Performance (Equity Curve)")
-    plt.xlabel("Datum")
-    plt.ylabel("Kapital in €")
-    plt.legend()
-    plt.grid(True)
-    plt.tight_layout()
-    plt.show()
-
-
-def plot_trades_on_chart(ticker, strategy_instance, trades_df):
-    """
-    Zeigt den Aktienkurs und markiert die Käufe und Verkäufe
-    """
-    print(f"Lade Chart-Daten für {ticker}...")
-    df_prices = strategy_instance.load_and_clean_data(ticker)
-
-    if df_prices is None or df_prices.empty:
-        print(f"Keine Daten für {ticker} gefunden.")
-        return
-
-    ticker_trades = trades_df[trades_df['ticker'] == ticker]
-
-    if ticker_trades.empty:
-        print(f"Keine Trades für {ticker} gefunden.")
-        return
-
-    plt.figure(figsize=(14, 7))
-
-
-    start_plot = pd.to_datetime(ticker_trades['buy_date'].min()) - pd.Timedelta(days=30)
-    end_plot = pd.to_datetime(ticker_trades['sell_date'].max()) + pd.Timedelta(days=30)
-
-    mask = (df_prices.index >= start_plot) & (df_prices.index <= end_plot)
-    subset = df_prices.loc[mask]
-
-    plt.plot(subset.index, subset['Close'], label=f"{ticker} Kurs", color="gray", alpha=0.5)
-
-    plt.scatter(pd.to_datetime(ticker_trades['buy_date']),
-                ticker_trades['entry_price'],
-                color='green', marker='^', s=100, label='Kauf', zorder=5)
-
-
-    plt.scatter(pd.to_datetime(ticker_trades['sell_date']),
-                ticker_trades['exit_price'],
-                color='red', marker='v', s=100, label='Verkauf', zorder=5)
-
-    plt.title(f"Trade Analyse für {ticker}")
-    plt.xlabel("Datum")
-    plt.ylabel("Preis")
-    plt.legend()
-    plt.grid(True)
-    plt.show()
+def __getattr__(name):
+    # Die Plot-Funktionen liegen in plotting.py, matplotlib wird erst beim ersten Zugriff geladen
+    if name in ("plot_equity_curve", "plot_trades_on_chart"):
+        import plotting
+        return getattr(plotting, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 if __name__ == "__main__":
+    import pandas as pd
     from data_manager import DataManager
+    from plotting import plot_equity_curve, plot_trades_on_chart
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
 
 
     pd.set_option('display.max_rows', None)
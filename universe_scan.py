@@ -0,0 +1,251 @@
+# universe_scan.py
+"""
+Scan über große Ticker-Universen (z.B. alle Werte eines Index) mit begrenztem Speicher.
+
+Die Ticker laufen blockweise durch einen Generator: Ein Block wird geladen, ausgewertet und danach aus dem
+PriceStore entfernt. Pro Zelle bleiben nur die aufsummierten Kennzahlen (PortfolioAccumulator) im Speicher,
+am Ende die besten top_k Zellen. Die Kursdaten eines Blocks bleiben unter dem Speicherbudget, der Speicherbedarf
+hängt damit von der Anzahl Zellen und Handelstage ab, nicht von der Anzahl der Ticker.
+Trades werden nur auf Wunsch erzeugt und Ticker für Ticker in eine CSV-Datei geschrieben.
+"""
+import csv
+import glob
+import heapq
+import logging
+import os
+
+from feature_store import FEATURE_SUFFIX
+from grid_executor import GridExecutor
+from performance import PortfolioAccumulator, rank_score
+from price_store import BINARY_SUFFIX, get_price_store
+
+logger = logging.getLogger(__name__)
+
+
+# Budget für gleichzeitig geladene Kursdaten eines Blocks (Umgebungsvariable SCAN_MEMORY_MB)
+SCAN_MEMORY_MB = 64
+DEFAULT_TOP_K = 10
+
+# Ordner (im Speicherordner) für die ausgelagerten Trades
+SCAN_DIR = "scans"
+TRADE_FIELDS = (
+    "rank", "ticker", "buy_date", "sell_date", "days_held", "exit_reason",
+    "entry_price", "exit_price", "profit_pct", "profit_abs",
+)
+
+
+def default_memory_budget():
+    return int(os.environ.get("SCAN_MEMORY_MB", SCAN_MEMORY_MB)) * 1024 * 1024
+
+
+def cached_tickers(storage_path="data_cache"):
+    """
+    Alle Ticker mit Kursdaten im Speicherordner (CSV oder Binär-Cache), sortiert.
+    """
+    tickers = set()
+    for path in glob.glob(os.path.join(storage_path, "*.csv")):
+        tickers.add(os.path.basename(path)[:-len(".csv")])
+    for path in glob.glob(os.path.join(storage_path, f"*{BINARY_SUFFIX}")):
+        if not path.endswith(FEATURE_SUFFIX):
+            tickers.add(os.path.basename(path)[:-len(BINARY_SUFFIX)])
+    return sorted(tickers)
+
+
+def iter_ticker_chunks(tickers, load, memory_budget):
+    """
+    Generator: lädt die Ticker der Reihe nach mit load(ticker) und gibt Blöcke [(Ticker, PriceData)] zurück,
+    deren Kursdaten zusammen höchstens memory_budget Bytes belegen (mindestens ein Ticker pro Block).
+    Ticker ohne Daten kommen als (Ticker, None) im jeweiligen Block mit.
+    """
+    chunk = []
+    chunk_bytes = 0
+    for ticker in tickers:
+        data = load(ticker)
+        size = data.nbytes if data is not None else 0
+        if chunk and chunk_bytes + size > memory_budget:
+            yield chunk
+            chunk = []
+            chunk_bytes = 0
+        chunk.append((ticker, data))
+        chunk_bytes += size
+    if chunk:
+        yield chunk
+
+
+def top_cells(accumulators, initial_capital, rank_by="roi", top_k=DEFAULT_TOP_K):
+    """
+    Die besten top_k Zellen als [(cell_idx, metrics)], bei Gleichstand gewinnt die zuerst aufgezählte.
+    """
+    def scored():
+        for cell_idx, accumulator in enumerate(accumulators):
+            metrics = accumulator.metrics(initial_capital)
+            yield rank_score(metrics, rank_by), -cell_idx, metrics
+
+    best = heapq.nlargest(top_k, scored(), key=lambda item: (item[0], item[1]))
+    return [(-neg_idx, metrics) for _, neg_idx, metrics in best]
+
+
+def run_universe_scan(cells, tickers, initial_capital=10000, rank_by="roi", top_k=DEFAULT_TOP_K,
+                      memory_budget=None, executor=None, cache=None, load=None, storage_path="data_cache",
+                      progress=None):
+    """
+    Bewertet alle Zellen über alle Ticker blockweise.
+    load(ticker) liefert die PriceData (Standard: PriceStore, ohne Download), executor ist ein GridExecutor
+    (Standard: im aktuellen Prozess), cache ein optionaler ResultCache. progress(done, total) meldet die
+    fertigen Ticker nach jedem Block. Mit Pool geben auch die Worker die Kursdaten nach jedem Batch frei.
+    Gibt {top: [(cell_idx, metrics)], tickers_scanned, tickers_missing, chunks, peak_chunk_bytes} zurück.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    store = get_price_store(storage_path)
+    load = load or store.get
+    memory_budget = memory_budget or default_memory_budget()
+    owns_executor = executor is None
+    executor = executor or GridExecutor(storage_path, max_workers=1)
+    # Ticker, die schon vor dem Scan im Speicher lagen (z.B. vorgewärmt), bleiben dort
+    resident = {ticker for ticker in tickers if ticker in store}
+
+    accumulators = [PortfolioAccumulator() for _ in cells]
+    missing = []
+    scanned = 0
+    chunks = 0
+    peak_chunk_bytes = 0
+    try:
+        for chunk in iter_ticker_chunks(tickers, load, memory_budget):
+            chunk_tickers = [ticker for ticker, data in chunk if data is not None and len(data)]
+            missing.extend(ticker for ticker, data in chunk if data is None or not len(data))
+            peak_chunk_bytes = max(peak_chunk_bytes, sum(data.nbytes for _, data in chunk if data is not None))
+            chunks += 1
+            if chunk_tickers:
+                parts = executor.evaluate_parts(cells, chunk_tickers, initial_capital, cache=cache, release_tickers=True)
+                for cell_idx, _, stats in parts:
+                    accumulators[cell_idx].add(stats)
+                for accumulator in accumulators:
+                    accumulator.compact()
+            scanned += len(chunk_tickers)
+
+            # Kursdaten des Blocks freigeben, bevor der nächste geladen wird
+            del chunk
+            for ticker in chunk_tickers:
+                if ticker not in resident:
+                    store.invalidate(ticker)
+            if progress is not None:
+                progress(scanned + len(missing), len(tickers))
+    finally:
+        if owns_executor:
+            executor.shutdown()
+
+    logger.info("Scan über %d Ticker in %d Blöcken abgeschlossen (%d ohne Daten).", scanned, chunks, len(missing))
+    return {
+        "top": top_cells(accumulators, initial_capital, rank_by, top_k) if scanned else [],
+        "tickers_scanned": scanned,
+        "tickers_missing": missing,
+        "chunks": chunks,
+        "peak_chunk_bytes": peak_chunk_bytes,
+    }
+
+
+def scan_path(storage_path, scan_id):
+    return os.path.join(storage_path, SCAN_DIR, f"{scan_id}.csv")
+
+
+def spill_trades(path, ranked_params, tickers, initial_capital=10000, storage_path="data_cache"):
+    """
+    Schreibt die Trades der Parameter-Sets (Rang 1, 2, ...) für alle Ticker als CSV nach path.
+    Pro Ticker liegen nur dessen Trades im Speicher, danach wird der Ticker wieder freigegeben.
+    Gibt die Anzahl geschriebener Trades zurück.
+    """
+    from strategy import MeanReversionStrategy
+
+    bot = MeanReversionStrategy(initial_capital=initial_capital, data_path=storage_path)
+    store = get_price_store(storage_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    written = 0
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=TRADE_FIELDS)
+        writer.writeheader()
+        for ticker in dict.fromkeys(tickers):
+            resident = ticker in store
+            for rank, params in enumerate(ranked_params, start=1):
+                trades = bot.run_portfolio([ticker], params)
+                writer.writerows(dict(trade, rank=rank) for trade in trades)
+                written += len(trades)
+            if not resident:
+                store.invalidate(ticker)
+    os.replace(tmp_path, path)
+    return written
+
+
+# --- Testbereich ---
+if __name__ == "__main__":
+    import itertools
+    import shutil
+    import tempfile
+    import time
+    import tracemalloc
+
+    logging.basicConfig(level=logging.WARNING, format="%(message)s")
+
+    cells = [
+        {"lookback": lookback, "drop": drop, "hold": hold, "take_profit": tp, "fee": 0.001}
+        for lookback, drop, hold, tp in itertools.product([1, 3], [2.5, 5.0, 10.0], [5, 20, 40], [2.0, 4.0, 8.0])
+    ]
+    tickers = cached_tickers()
+
+    # Ergebnis des Scans (kleine Blöcke) gegen die Grid Search über alle Ticker auf einmal
+    with GridExecutor(max_workers=1) as executor:
+        expected = [None] * len(cells)
+        for cell_idx, metrics in executor.evaluate(cells, tickers, 10000):
+            expected[cell_idx] = metrics
+    result = run_universe_scan(cells, tickers, top_k=5, memory_budget=1)
+    assert result["chunks"] == len(tickers)
+    for cell_idx, metrics in result["top"]:
+        for key, value in expected[cell_idx].items():
+            assert value is None and metrics[key] is None or abs(metrics[key] - value) < 1e-6, key
+    order = sorted(range(len(cells)), key=lambda i: (-expected[i]["roi"], i))[:5]
+    assert [cell_idx for cell_idx, _ in result["top"]] == order
+    print(f"Top {len(order)} identisch mit der Grid Search: {[round(m['roi'], 2) for _, m in result['top']]}")
+
+    # Wie /scan mit dem Prozess-Pool: gleiches Ergebnis, danach keine Kursdaten mehr in den Workern
+    def worker_store():
+        time.sleep(0.05)
+        store = get_price_store("data_cache")
+        return os.getpid(), len(store._entries)
+
+    get_price_store().invalidate()
+    with GridExecutor(max_workers=2) as executor:
+        pooled = run_universe_scan(cells, tickers, top_k=5, memory_budget=1, executor=executor)
+        assert [cell_idx for cell_idx, _ in pooled["top"]] == order
+        probes = [executor._get_pool().submit(worker_store) for _ in range(8)]
+        resident = dict(probe.result() for probe in probes)
+    assert len(resident) == 2 and not any(resident.values()), resident
+    print(f"Pool-Scan identisch, Worker ohne Kursdaten: {resident}")
+
+    # Speicher-Peak bei wachsendem Universum (Kopien der vorhandenen Ticker unter neuen Namen)
+    tmp = tempfile.mkdtemp()
+    try:
+        sources = [t for t in tickers if os.path.isdir(os.path.join("data_cache", f"{t}{BINARY_SUFFIX}"))]
+        universe = []
+        for i in range(210):
+            source = sources[i % len(sources)]
+            ticker = f"T{i:03d}"
+            shutil.copytree(os.path.join("data_cache", f"{source}{BINARY_SUFFIX}"),
+                            os.path.join(tmp, f"{ticker}{BINARY_SUFFIX}"))
+            universe.append(ticker)
+        for size in (30, 90, 210):
+            tracemalloc.start()
+            start = time.perf_counter()
+            result = run_universe_scan(cells, universe[:size], memory_budget=2 * 1024 * 1024, storage_path=tmp)
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"{size:3d} Ticker: {result['chunks']} Blöcke, Peak {peak / 1e6:.1f} MB, {elapsed:.1f}s")
+
+        best = [cells[cell_idx] for cell_idx, _ in result["top"][:2]]
+        path = scan_path(tmp, "test")
+        written = spill_trades(path, best, universe[:20], storage_path=tmp)
+        with open(path, encoding="utf-8") as f:
+            assert sum(1 for _ in f) == written + 1
+        print(f"{written} Trades nach {path} geschrieben.")
+    finally:
+        shutil.rmtree(tmp)
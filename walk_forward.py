@@ -0,0 +1,290 @@
+# walk_forward.py
+"""
+Walk-Forward-Optimierung: Parameter auf einem Trainingsfenster wählen, auf dem direkt folgenden
+Out-of-Sample-Fenster bewerten, um die Länge des Testfensters weiterrollen. Die Testfenster schließen
+lückenlos aneinander an, ihre Trades ergeben die zusammengesetzte Out-of-Sample-Equity.
+
+Signale und Exits werden pro (Ticker, Zelle) einmal über die gesamte Historie berechnet. Ein Fenster
+schneidet daraus nur die Trades mit Einstieg im Fenster heraus (searchsorted über alle Zellen auf einmal,
+Kennzahlen aus Präfixsummen), pro Fenster läuft kein Backtest. Die Positionsfolge entspricht daher der
+über die volle Historie; Trades, die über das Ende eines Testfensters hinaus laufen, zählen am Exit-Tag.
+Im Trainingsfenster zählen nur Trades, die vor dem Testbeginn geschlossen sind, sonst hinge die Wahl der
+Parameter von Kursen des Testfensters ab.
+"""
+import numpy as np
+
+from backtest_engine import get_ticker_signals, net_returns
+from feature_store import load_features
+from performance import TradeStats, portfolio_metrics, rank_score
+from price_store import get_price_store
+
+
+# Schlüssel pro Trade: Zelle * KEY_STRIDE + Einstiegstag (Tage seit 1970), sortiert nach (Zelle, Tag)
+KEY_STRIDE = 1 << 20
+
+# Standard-Fensterlängen in Monaten
+TRAIN_MONTHS = 60
+TEST_MONTHS = 12
+
+_PREFIX_FIELDS = ("profit", "wins", "gross_profit", "gross_loss", "sum_return", "sum_return_sq", "held_bars")
+
+
+class TickerTrades:
+    """
+    Alle Trades eines Tickers für alle Zellen über die volle Historie, nach (Zelle, Einstiegstag) sortiert,
+    mit Präfixsummen der aufsummierbaren Größen aus TradeStats.
+    """
+
+    def __init__(self, data, cells, initial_capital, features=None):
+        n_cells = len(cells)
+        self.cell_base = np.arange(n_cells, dtype=np.int64) * KEY_STRIDE
+        if data is None or len(data) == 0:
+            self.bar_days = np.empty(0, dtype=np.int32)
+            self.keys = np.empty(0, dtype=np.int64)
+            self.exit_keys = np.empty(0, dtype=np.int64)
+            self.exit_days = np.empty(0, dtype=np.int32)
+            self.exit_profits = np.empty(0, dtype=np.float64)
+            self.prefix = {name: np.zeros(1) for name in _PREFIX_FIELDS}
+            return
+
+        signals = get_ticker_signals(data, features)
+        self.bar_days = signals.day_numbers
+
+        # Wie grid_executor.evaluate_group: eine Exit-Simulation pro (Lookback, Drop, Hold, TP), Gebühren teilen sie sich
+        by_exit = {}
+        for pos, params in enumerate(cells):
+            key = (params['lookback'], params['drop'], params['hold'], params['take_profit'])
+            by_exit.setdefault(key, []).append((pos, params.get('fee', 0.001)))
+
+        per_cell = [None] * n_cells
+        for (lookback, drop, hold, take_profit), fee_cells in by_exit.items():
+            entries, exit_idx, days_held, raw_exit = signals.exits(
+                drop_threshold_pct=drop,
+                lookback_days=lookback,
+                hold_days=hold,
+                take_profit_pct=take_profit,
+            )
+            entry_price = data.open[entries]
+            for pos, fee in fee_cells:
+                per_cell[pos] = (entries, exit_idx, days_held, net_returns(entry_price, raw_exit, fee))
+
+        counts = [len(trades[0]) for trades in per_cell]
+        entries, exit_idx, days_held, profit_pct = (np.concatenate(column) for column in zip(*per_cell))
+        cell_keys = np.repeat(self.cell_base, counts)
+        self.keys = cell_keys + self.bar_days[entries]
+        self.exit_days = self.bar_days[exit_idx]
+        # Positionen einer Zelle überlappen nicht, die Exit-Tage steigen daher wie die Einstiegstage
+        self.exit_keys = cell_keys + self.exit_days
+
+        profit_abs = np.round(initial_capital * profit_pct, 2)
+        self.exit_profits = profit_abs
+        values = {
+            "profit": profit_abs,
+            "wins": profit_abs > 0,
+            "gross_profit": np.where(profit_abs > 0, profit_abs, 0.0),
+            "gross_loss": np.where(profit_abs < 0, -profit_abs, 0.0),
+            "sum_return": profit_pct,
+            "sum_return_sq": profit_pct * profit_pct,
+            "held_bars": days_held + 1,
+        }
+        self.prefix = {name: np.concatenate(([0], np.cumsum(v))) for name, v in values.items()}
+
+    def window(self, start_day, end_day, closed=False):
+        """
+        Positionen [lo, hi) pro Zelle für die Trades mit Einstieg in [start_day, end_day).
+        closed=True lässt nur Trades zu, deren Exit ebenfalls vor end_day liegt (Trainingsfenster).
+        """
+        lo = np.searchsorted(self.keys, self.cell_base + start_day)
+        hi = np.searchsorted(self.keys, self.cell_base + end_day)
+        if closed:
+            hi = np.minimum(hi, np.searchsorted(self.exit_keys, self.cell_base + end_day))
+        return lo, hi
+
+    def bars(self, start_day, end_day):
+        return int(np.searchsorted(self.bar_days, end_day) - np.searchsorted(self.bar_days, start_day))
+
+    def profits(self, lo, hi):
+        return self.prefix["profit"][hi] - self.prefix["profit"][lo]
+
+    def stats(self, cell_pos, lo, hi, bars):
+        """
+        TradeStats einer Zelle im Fenster (Summen aus den Präfixsummen, Exit-Folge als Ausschnitt).
+        """
+        a, b = int(lo[cell_pos]), int(hi[cell_pos])
+        sums = {name: prefix[b] - prefix[a] for name, prefix in self.prefix.items()}
+        return TradeStats(
+            profit=round(float(sums["profit"]), 2),
+            wins=int(sums["wins"]),
+            count=b - a,
+            gross_profit=round(float(sums["gross_profit"]), 2),
+            gross_loss=round(float(sums["gross_loss"]), 2),
+            sum_return=float(sums["sum_return"]),
+            sum_return_sq=float(sums["sum_return_sq"]),
+            held_bars=int(sums["held_bars"]),
+            bars=bars,
+            exit_days=self.exit_days[a:b],
+            exit_profits=self.exit_profits[a:b],
+        )
+
+
+def window_bounds(first_day, last_day, train_months=TRAIN_MONTHS, test_months=TEST_MONTHS):
+    """
+    Fenster als (Trainingsbeginn, Testbeginn, Testende) in Tagen seit 1970, jeweils am Monatsersten.
+    Das Trainingsfenster endet am Testbeginn, das nächste Fenster beginnt test_months später.
+    """
+    month = np.datetime64(int(first_day), 'D').astype('datetime64[M]')
+    bounds = []
+    while True:
+        starts = (month, month + train_months, month + train_months + test_months)
+        train_start, test_start, test_end = (int(m.astype('datetime64[D]').astype(np.int64)) for m in starts)
+        if test_start > last_day:
+            return bounds
+        bounds.append((train_start, test_start, test_end))
+        month = month + test_months
+
+
+def _merge_stats(parts):
+    """
+    Fasst die TradeStats eines Tickers aus mehreren (disjunkten) Testfenstern zusammen.
+    """
+    merged = TradeStats(
+        profit=sum(p.profit for p in parts),
+        wins=sum(p.wins for p in parts),
+        count=sum(p.count for p in parts),
+        gross_profit=sum(p.gross_profit for p in parts),
+        gross_loss=sum(p.gross_loss for p in parts),
+        sum_return=sum(p.sum_return for p in parts),
+        sum_return_sq=sum(p.sum_return_sq for p in parts),
+        held_bars=sum(p.held_bars for p in parts),
+        bars=sum(p.bars for p in parts),
+    )
+    if parts:
+        # Trades mit langer Haltedauer können nach Exits des nächsten Fensters enden
+        days = np.concatenate([p.exit_days for p in parts])
+        order = np.argsort(days, kind="stable")
+        merged.exit_days = days[order]
+        merged.exit_profits = np.concatenate([p.exit_profits for p in parts])[order]
+    return merged
+
+
+def _day_string(day):
+    return str(np.datetime64(int(day), 'D'))
+
+
+def run_walk_forward(cells, tickers, initial_capital=10000, train_months=TRAIN_MONTHS, test_months=TEST_MONTHS,
+                     rank_by="roi", storage_path="data_cache"):
+    """
+    Walk-Forward über alle Zellen (Parameter-Dicts). Pro Fenster gewinnt die Zelle mit dem besten rank_by
+    im Trainingsfenster (bei Gleichstand die zuerst aufgezählte), bewertet wird sie im Testfenster.
+    Gibt ein Dict mit den Fenstern, den Out-of-Sample-Kennzahlen (performance.portfolio_metrics)
+    und der realisierten Out-of-Sample-Equity pro Exit-Tag zurück.
+    """
+    store = get_price_store(storage_path)
+    indexes = []
+    for ticker in tickers:
+        data = store.get(ticker)
+        indexes.append(TickerTrades(data, cells, initial_capital, load_features(storage_path, data)))
+
+    loaded = [idx.bar_days for idx in indexes if len(idx.bar_days)]
+    bounds = []
+    if loaded and cells:
+        first_day = min(int(days[0]) for days in loaded)
+        last_day = max(int(days[-1]) for days in loaded)
+        bounds = window_bounds(first_day, last_day, train_months, test_months)
+
+    windows = []
+    oos_parts = [[] for _ in tickers]
+    for train_start, test_start, test_end in bounds:
+        train = [idx.window(train_start, test_start, closed=True) for idx in indexes]
+        if rank_by == "roi":
+            # Gewinne sind Cent-Beträge, Runden entfernt das Rauschen der Präfix-Differenzen (Gleichstand bleibt Gleichstand)
+            profits = np.round(sum(idx.profits(lo, hi) for idx, (lo, hi) in zip(indexes, train)), 2)
+            best = int(np.argmax(profits))
+            train_metrics = {"roi": float(profits[best]) / initial_capital * 100}
+        else:
+            bars = [idx.bars(train_start, test_start) for idx in indexes]
+            best, train_metrics = None, None
+            for pos in range(len(cells)):
+                parts = [idx.stats(pos, lo, hi, n) for idx, (lo, hi), n in zip(indexes, train, bars)]
+                metrics = portfolio_metrics(parts, initial_capital)
+                if best is None or rank_score(metrics, rank_by) > rank_score(train_metrics, rank_by):
+                    best, train_metrics = pos, metrics
+
+        test_parts = []
+        for ticker_pos, idx in enumerate(indexes):
+            lo, hi = idx.window(test_start, test_end)
+            stats = idx.stats(best, lo, hi, idx.bars(test_start, test_end))
+            test_parts.append(stats)
+            oos_parts[ticker_pos].append(stats)
+
+        windows.append({
+            "train_start": _day_string(train_start),
+            "test_start": _day_string(test_start),
+            "test_end": _day_string(test_end - 1),
+            "params": cells[best],
+            "train_roi": train_metrics["roi"],
+            "test": portfolio_metrics(test_parts, initial_capital),
+        })
+
+    merged = [_merge_stats(parts) for parts in oos_parts]
+    days = np.concatenate([p.exit_days for p in merged]) if merged else np.empty(0, dtype=np.int32)
+    profits = np.concatenate([p.exit_profits for p in merged]) if merged else np.empty(0)
+    order = np.argsort(days, kind="stable")
+    days, profits = days[order], profits[order]
+    day_ends = np.flatnonzero(np.append(days[1:] != days[:-1], True)) if len(days) else np.empty(0, dtype=np.int64)
+
+    return {
+        "windows": windows,
+        "metrics": portfolio_metrics(merged, initial_capital),
+        "equity_days": days[day_ends].astype("datetime64[D]"),
+        "equity": initial_capital + np.cumsum(profits)[day_ends],
+    }
+
+
+# --- Testbereich ---
+if __name__ == "__main__":
+    import itertools
+    import time
+    from grid_executor import evaluate_group
+
+    tickers = ["^GDAXI", "^GSPC", "MSFT", "IBM", "SIE.DE", "NVDA", "TSLA"]
+    cells = [
+        {"lookback": 3, "drop": drop, "hold": hold, "take_profit": tp, "fee": 0.001}
+        for drop, hold, tp in itertools.product([2.5, 3.0, 4.0, 5.0, 6.0, 8.0, 10.0, 12.0], [5, 10, 20, 40], [2.0, 4.0, 6.0, 8.0])
+    ]
+
+    # Ein Fenster über die ganze Historie muss exakt die Grid-Kennzahlen ergeben
+    store = get_price_store()
+    for ticker in tickers:
+        idx = TickerTrades(store.get(ticker), cells, 10000)
+        lo, hi = idx.window(0, KEY_STRIDE - 1)
+        for cell_idx, expected in evaluate_group("data_cache", ticker, list(enumerate(cells)), 10000):
+            actual = idx.stats(cell_idx, lo, hi, len(idx.bar_days))
+            assert (actual.count, actual.wins, actual.held_bars) == (expected.count, expected.wins, expected.held_bars)
+            assert abs(actual.profit - expected.profit) < 1e-6
+            assert np.array_equal(actual.exit_days, expected.exit_days)
+    print("Ausschnitt über die volle Historie entspricht der Grid Search.")
+
+    # Ein Trade, der vor einer Grenze einsteigt und danach aussteigt, gehört nicht ins Trainingsfenster
+    idx = TickerTrades(store.get("MSFT"), cells, 10000)
+    lo, hi = idx.window(0, KEY_STRIDE - 1)
+    entry_days = idx.keys - np.repeat(idx.cell_base, hi - lo)
+    spanning = int(np.flatnonzero(idx.exit_days > entry_days)[0])
+    cell_pos = int(np.searchsorted(hi, spanning, side="right"))
+    boundary = int(idx.exit_days[spanning])
+    lo, hi = idx.window(0, boundary, closed=True)
+    assert hi[cell_pos] == spanning and lo[cell_pos] <= spanning
+    assert np.all(idx.exit_days[lo[cell_pos]:hi[cell_pos]] < boundary)
+    assert idx.window(0, boundary)[1][cell_pos] == spanning + 1
+    print("Trades über die Grenze zum Testfenster zählen nicht im Training.")
+
+    for test_months in (12, 1):
+        start = time.perf_counter()
+        result = run_walk_forward(cells, tickers, train_months=60, test_months=test_months)
+        elapsed = time.perf_counter() - start
+        metrics = result["metrics"]
+        print(
+            f"Test {test_months:2d} Monat(e): {len(result['windows'])} Fenster, OOS-ROI {metrics['roi']:.2f}%, "
+            f"{metrics['trades']} Trades, Max Drawdown {metrics['max_drawdown']:.2f}% ({elapsed:.2f}s)"
+        )
+    assert abs(result["equity"][-1] - 10000 - metrics["profit"]) < 1e-6